@@ -0,0 +1,232 @@
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import kompilator
+from core.LangTables import LangTables
+from core.LangCompilationCache import LangCompilationCache
+from core.LangCompiler import LangCompiler
+from core.LangCompileServer import LangCompileServer
+from core.LangVirtualMachine import LangVirtualMachine
+from model.errors import MachineError
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+PROGRAMS_DIR = os.path.join(BENCHMARKS_DIR, "programs")
+INPUTS_DIR = os.path.join(BENCHMARKS_DIR, "inputs")
+BASELINE_FILE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+COMPILER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kompilator.py")
+CLIENT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kompilator_client.py")
+
+# figures of generated code are deterministic, so any growth is a regression; compile time and memory are only
+# reported, as they depend on the machine running the benchmark
+CHECKED_FIGURES = ("t", "io", "instructions")
+
+
+def compile_program(source_file: str, destination_file: str):
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            kompilator.main(["kompilator.py", source_file, destination_file])
+    except SystemExit as e:
+        if e.code:
+            raise RuntimeError(output.getvalue().strip())
+
+
+def measure_compilation(source_file: str, destination_file: str, repeats: int):
+    wall_time = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        compile_program(source_file, destination_file)
+        elapsed = time.perf_counter() - start
+        wall_time = elapsed if wall_time is None else min(wall_time, elapsed)
+
+    tracemalloc.start()
+    compile_program(source_file, destination_file)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    with open(destination_file, "r") as f:
+        return f.read(), wall_time, peak
+
+
+def read_numbers(path: str) -> list:
+    with open(path, "r") as f:
+        return [int(word) for word in f.read().split()]
+
+
+def run_benchmark(name: str, directory: str, repeats: int) -> dict:
+    destination_file = os.path.join(directory, name + ".mr")
+    assembly, wall_time, peak = measure_compilation(os.path.join(PROGRAMS_DIR, name + ".imp"), destination_file,
+                                                    repeats)
+    machine = LangVirtualMachine(assembly)
+
+    results = dict()
+    input_dir = os.path.join(INPUTS_DIR, name)
+    for input_name in sorted(f for f in os.listdir(input_dir) if f.startswith("input")):
+        expected = read_numbers(os.path.join(input_dir, input_name.replace("input", "output")))
+        try:
+            result = machine.run(read_numbers(os.path.join(input_dir, input_name)), seed=0)
+            passed = result.outputs == expected
+            t, io_cost = result.t, result.io
+        except MachineError as e:
+            print("{} ({}): {}".format(name, input_name, e))
+            passed = False
+            t, io_cost = None, None
+        results[input_name] = {
+            "passed": passed,
+            "t": t,
+            "io": io_cost,
+            "instructions": len(machine),
+            "compile_ms": round(wall_time * 1000, 2),
+            "peak_kib": round(peak / 1024, 1)
+        }
+    return results
+
+
+# instructions and cycles removed from the generated code by every rule of the peephole optimizer
+def peephole_savings(name: str) -> dict:
+    with open(os.path.join(PROGRAMS_DIR, name + ".imp"), "r") as f:
+        source = f.read()
+    compiler = LangCompiler()
+    translator = LangCompiler.create_translator()
+    translator.translate_program(compiler.parser.parse(compiler.lexer.tokenize(source)))
+    return translator.peephole_savings
+
+
+def print_peephole_savings(names: list):
+    savings = dict()
+    for name in names:
+        for rule, (instructions, cycles) in peephole_savings(name).items():
+            total = savings.setdefault(rule, [0, 0])
+            total[0] += instructions
+            total[1] += cycles
+    print("{:<24} {:>7} {:>9}".format("peephole rule", "instr", "cycles"))
+    for rule, (instructions, cycles) in savings.items():
+        print("{:<24} {:>7} {:>9}".format(rule, instructions, cycles))
+
+
+def measure_process(command: list, cache_dir: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, env=dict(os.environ, **{LangTables.CACHE_DIR_VARIABLE: cache_dir}), check=True,
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+# wall time of whole compiler processes (median of N runs), with parse tables built by every process and read from a
+# cache filled by an earlier one, and of client processes of a compile server; the interpreter starting alone is
+# measured for reference
+def measure_startup(name: str, directory: str, socket_path: str, repeats: int) -> tuple:
+    files = [os.path.join(PROGRAMS_DIR, name + ".imp"), os.path.join(directory, name + ".mr")]
+    command = [sys.executable, COMPILER_FILE] + files
+    client_command = [sys.executable, CLIENT_FILE, socket_path] + files
+    cache_dir = os.path.join(directory, "cache")
+    measure_process(command, cache_dir)
+    # runs of all kinds are interleaved, so that the load of the machine changing meanwhile affects all of them
+    times = [[], [], [], []]
+    for run in range(repeats):
+        times[0].append(measure_process([sys.executable, "-c", "pass"], cache_dir))
+        times[1].append(measure_process(command, os.path.join(directory, "{}-{}".format(name, run))))
+        times[2].append(measure_process(command, cache_dir))
+        times[3].append(measure_process(client_command, cache_dir))
+    return tuple(statistics.median(kind_times) for kind_times in times)
+
+
+def print_startup(names: list, repeats: int):
+    print("{:<24} {:>14} {:>11} {:>9} {:>9} {:>9}".format("program", "interpreter ms", "uncached ms", "cached ms",
+                                                           "change", "client ms"))
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "server.sock")
+        with LangCompileServer(socket_path) as server:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            for name in names:
+                interpreter, uncached, cached, client = measure_startup(name, directory, socket_path, repeats)
+                print("{:<24} {:>14.1f} {:>11.1f} {:>9.1f} {:>9} {:>9.1f}".format(
+                    name, interpreter * 1000, uncached * 1000, cached * 1000, format_change(cached, uncached),
+                    client * 1000))
+            server.shutdown()
+
+
+def format_change(current, previous) -> str:
+    if previous is None or current is None:
+        return ""
+    if current == previous:
+        return "="
+    return "{:+.2%}".format((current - previous) / previous) if previous else "{:+}".format(current - previous)
+
+
+def main(argv):
+    # compile times are measured, so programs are not to be taken from a compile cache
+    os.environ.pop(LangCompilationCache.DIR_VARIABLE, None)
+    update = "--update" in argv
+    names = [arg for arg in argv[1:] if not arg.startswith("--")]
+    repeats = 3
+    for arg in argv[1:]:
+        if arg.startswith("--repeat="):
+            repeats = int(arg[len("--repeat="):])
+    if not names:
+        names = sorted(f[:-len(".imp")] for f in os.listdir(PROGRAMS_DIR) if f.endswith(".imp"))
+
+    if "--startup" in argv:
+        print_startup(names, repeats)
+        return
+
+    baseline = dict()
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r") as f:
+            baseline = json.load(f)
+
+    current = dict()
+    with tempfile.TemporaryDirectory() as directory:
+        for name in names:
+            current[name] = run_benchmark(name, directory, repeats)
+
+    failures = 0
+    regressions = 0
+    print("{:<18} {:<11} {:>4} {:>14} {:>9} {:>7} {:>11} {:>10} {:>11} {:>11}".format(
+        "program", "input", "ok", "t", "io", "instr", "compile ms", "peak KiB", "t change", "instr change"))
+    for name in names:
+        for input_name, figures in current[name].items():
+            previous = baseline.get(name, dict()).get(input_name, dict())
+            failures += not figures["passed"]
+            regressions += any(previous.get(figure) is not None and figures[figure] is not None and
+                               figures[figure] > previous[figure] for figure in CHECKED_FIGURES)
+            print("{:<18} {:<11} {:>4} {:>14} {:>9} {:>7} {:>11} {:>10} {:>11} {:>11}".format(
+                name, input_name, "ok" if figures["passed"] else "FAIL", str(figures["t"]), str(figures["io"]),
+                figures["instructions"], figures["compile_ms"], figures["peak_kib"],
+                format_change(figures["t"], previous.get("t")),
+                format_change(figures["instructions"], previous.get("instructions"))))
+
+    if "--peephole" in argv:
+        print()
+        print_peephole_savings(names)
+        print()
+
+    total_t = sum(f["t"] or 0 for results in current.values() for f in results.values())
+    total_previous = sum(baseline.get(name, dict()).get(input_name, dict()).get("t") or 0
+                         for name in names for input_name in current[name])
+    print("total t: {} (baseline {}, {})".format(total_t, total_previous, format_change(total_t, total_previous)))
+
+    if update:
+        baseline.update(current)
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("Baseline updated.")
+
+    if failures:
+        print("{} run(s) produced wrong output.".format(failures))
+    if regressions and not update:
+        print("{} run(s) regressed against the baseline.".format(regressions))
+    if failures or (regressions and not update):
+        exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,13 +1,23 @@
 from core.LangVariableTable import LangVariableTable
 from core.LangRegisterMachine import LangRegisterMachine
 from core.GenericTranslator import GenericTranslator
+from core.LangCostModel import LangCostModel
+from core.LangRanges import LangRanges
+from model.internal.Code import Code
+from model.internal.Label import Label
 from model.nonterminals.Value import Value
 
 
 class ConditionTranslator:
 
-    EQUALITY_SWITCH_THRESHOLD = 12
-    SUPERIORITY_SWITCH_THRESHOLD = 4
+    NEGATIONS = {
+        "=": "!=",
+        "!=": "=",
+        "<": ">=",
+        ">": "<=",
+        "<=": ">",
+        ">=": "<"
+    }
 
     def __init__(self, variable_table: LangVariableTable, register_machine: LangRegisterMachine,
                  generic_translator: GenericTranslator):
@@ -15,27 +25,68 @@ class ConditionTranslator:
         self.register_machine = register_machine
         self.generic_translator = generic_translator
 
-    def perform_comparison(self, left_val: Value, right_val: Value, comparison: str) -> str:
-        if comparison == "=":
-            return self.__perform_equality(left_val, right_val)
+    # generated code falls through when the condition is met and jumps to false_label otherwise
+    def perform_comparison(self, left_val: Value, right_val: Value, comparison: str, false_label: Label) -> Code:
+        met = self.decide(left_val, right_val, comparison)
+        if met is not None:
+            return self.__perform_constant(met, false_label)
+        elif comparison == "=":
+            return self.__perform_equality(left_val, right_val, false_label)
         elif comparison == "!=":
-            return self.__perform_inequality(left_val, right_val)
+            return self.__perform_inequality(left_val, right_val, false_label)
         elif comparison == "<":
-            return self.__perform_less(left_val, right_val)
+            return self.__perform_less(left_val, right_val, false_label)
         elif comparison == ">":
-            return self.__perform_more(left_val, right_val)
+            return self.__perform_more(left_val, right_val, false_label)
         elif comparison == "<=":
-            return self.__perform_less_equal(left_val, right_val)
+            return self.__perform_less_equal(left_val, right_val, false_label)
         else:
-            return self.__perform_more_equal(left_val, right_val)
+            return self.__perform_more_equal(left_val, right_val, false_label)
 
-    def __perform_equality(self, left_val: Value, right_val: Value):
+    # generated code jumps to true_label when the condition is met and falls through otherwise
+    def perform_inverted_comparison(self, left_val: Value, right_val: Value, comparison: str,
+                                    true_label: Label) -> Code:
+        return self.perform_comparison(left_val, right_val, ConditionTranslator.NEGATIONS[comparison], true_label)
+
+    # True or False if ranges of the values decide the condition at compile time, None otherwise
+    def decide(self, left_val: Value, right_val: Value, comparison: str):
+        return LangRanges.compare(self.generic_translator.get_range(left_val),
+                                  self.generic_translator.get_range(right_val), comparison)
+
+    # a chain of decrements costs at least a cycle per unit of the constant, while comparing with the constant in
+    # a register costs its generation and two subtractions at most; longer chains could never be cheaper
+    @staticmethod
+    def __is_chain_feasible(num: int) -> bool:
+        return num <= LangCostModel.estimate(GenericTranslator.generate_constant(num, "a")) + \
+            2 * LangCostModel.instruction_cost("SUB")
+
+    def __choose_comparison(self, chain, general, num: int) -> Code:
+        if ConditionTranslator.__is_chain_feasible(num):
+            return self.generic_translator.choose_cheapest([chain, general])
+        return general()
+
+    # decrements the register num times, jumping to the label once it reaches zero; it is not checked while the value
+    # is still above zero for every value in the range
+    def __count_down(self, val: Value, reg, num: int, label: Label) -> Code:
+        low = self.generic_translator.get_range(val)[0]
+        code = Code()
+        for step in range(num):
+            if step >= low:
+                code.add("JZERO", reg, label)
+            code.add("DEC", reg)
+        return code
+
+    @staticmethod
+    def __perform_constant(met: bool, false_label: Label) -> Code:
+        if met:
+            end = Label("cond_end")
+            return Code().add("JUMP", end).mark(end)
+        else:
+            return Code().add("JUMP", false_label)
+
+    def __perform_equality(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         if left_val.is_int() and right_val.is_int():
-            met = left_val.core == right_val.core
-            if met:
-                code = "JUMP 1"
-            else:
-                code = "JUMP {}"
+            code = self.__perform_constant(left_val.core == right_val.core, false_label)
         elif left_val.is_int() or right_val.is_int():
             if left_val.is_int():
                 num = left_val.core
@@ -44,45 +95,49 @@ class ConditionTranslator:
                 num = right_val.core
                 val = left_val
 
-            if num <= ConditionTranslator.EQUALITY_SWITCH_THRESHOLD:
-                reg = self.register_machine.fetch_register()
-                code = self.generic_translator.put_value_to_register(val, reg)
-                while num > 0:
-                    code += "\nJZERO {} {}".format(reg, 2 * num + 1)
-                    code += "\nDEC {}".format(reg)
-                    num -= 1
-                code += "\nJZERO {} 2".format(reg)
-                code += "\nJUMP {}"
-            else:
-                code = self.__perform_equality_2i(left_val, right_val)
+            code = self.__choose_comparison(lambda: self.__perform_equality_chain(val, num, false_label),
+                                            lambda: self.__perform_equality_2i(left_val, right_val, false_label), num)
         else:
-            code = self.__perform_equality_2i(left_val, right_val)
+            code = self.__perform_equality_2i(left_val, right_val, false_label)
+        return code
+
+    def __perform_equality_chain(self, val: Value, num: int, false_label: Label) -> Code:
+        reg = self.register_machine.fetch_register()
+        fail = Label("cond_fail")
+        end = Label("cond_end")
+        code = self.generic_translator.put_value_to_register(val, reg)
+        code += self.__count_down(val, reg, num, fail)
+        code.add("JZERO", reg, end)
+        code.mark(fail)
+        code.add("JUMP", false_label)
+        code.mark(end)
         return code
 
-    def __perform_equality_2i(self, left_val: Value, right_val: Value):
+    def __perform_equality_2i(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         reg1 = self.register_machine.fetch_register()
         reg2 = self.register_machine.fetch_register()
         condition_reg = self.register_machine.borrow_register()
+        second_check = Label("cond_second_check")
+        fail = Label("cond_fail")
+        end = Label("cond_end")
 
         code = self.generic_translator.put_value_to_register(left_val, reg1)
-        code += "\n" + self.generic_translator.put_value_to_register(right_val, reg2)
-        code += "\n" + self.generic_translator.copy_register(reg1, condition_reg)
-        code += "\nSUB {} {}".format(condition_reg, reg2)
-        code += "\nJZERO {} 2".format(condition_reg)
-        code += "\nJUMP 3"
-        code += "\nSUB {} {}".format(reg2, reg1)
-        code += "\nJZERO {} 2".format(reg2)
-        code += "\nJUMP {}"
-
+        code += self.generic_translator.put_value_to_register(right_val, reg2)
+        code += self.generic_translator.copy_register(reg1, condition_reg)
+        code.add("SUB", condition_reg, reg2)
+        code.add("JZERO", condition_reg, second_check)
+        code.add("JUMP", fail)
+        code.mark(second_check)
+        code.add("SUB", reg2, reg1)
+        code.add("JZERO", reg2, end)
+        code.mark(fail)
+        code.add("JUMP", false_label)
+        code.mark(end)
         return code
 
-    def __perform_inequality(self, left_val: Value, right_val: Value):
+    def __perform_inequality(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         if left_val.is_int() and right_val.is_int():
-            met = left_val.core != right_val.core
-            if met:
-                code = "JUMP 1"
-            else:
-                code = "JUMP {}"
+            code = self.__perform_constant(left_val.core != right_val.core, false_label)
         elif left_val.is_int() or right_val.is_int():
             if left_val.is_int():
                 num = left_val.core
@@ -91,167 +146,183 @@ class ConditionTranslator:
                 num = right_val.core
                 val = left_val
 
-            if num <= ConditionTranslator.EQUALITY_SWITCH_THRESHOLD:
-                reg = self.register_machine.fetch_register()
-                code = self.generic_translator.put_value_to_register(val, reg)
-                while num > 0:
-                    code += "\nJZERO {} {}".format(reg, 2 * num + 3)
-                    code += "\nDEC {}".format(reg)
-                    num -= 1
-                code += "\nJZERO {} 2".format(reg)
-                code += "\nJUMP 2"
-                code += "\nJUMP {}"
-            else:
-                code = self.__perform_inequality_2i(left_val, right_val)
+            code = self.__choose_comparison(lambda: self.__perform_inequality_chain(val, num, false_label),
+                                            lambda: self.__perform_inequality_2i(left_val, right_val, false_label),
+                                            num)
         else:
-            code = self.__perform_inequality_2i(left_val, right_val)
+            code = self.__perform_inequality_2i(left_val, right_val, false_label)
         return code
 
-    def __perform_inequality_2i(self, left_val: Value, right_val: Value):
+    def __perform_inequality_chain(self, val: Value, num: int, false_label: Label) -> Code:
+        reg = self.register_machine.fetch_register()
+        fail = Label("cond_fail")
+        end = Label("cond_end")
+        code = self.generic_translator.put_value_to_register(val, reg)
+        code += self.__count_down(val, reg, num, end)
+        code.add("JZERO", reg, fail)
+        code.add("JUMP", end)
+        code.mark(fail)
+        code.add("JUMP", false_label)
+        code.mark(end)
+        return code
+
+    def __perform_inequality_2i(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         reg1 = self.register_machine.fetch_register()
         reg2 = self.register_machine.fetch_register()
         condition_reg = self.register_machine.borrow_register()
+        second_check = Label("cond_second_check")
+        fail = Label("cond_fail")
+        end = Label("cond_end")
 
         code = self.generic_translator.put_value_to_register(left_val, reg1)
-        code += "\n" + self.generic_translator.put_value_to_register(right_val, reg2)
-        code += "\n" + self.generic_translator.copy_register(reg1, condition_reg)
-        code += "\nSUB {} {}".format(condition_reg, reg2)
-        code += "\nJZERO {} 2".format(condition_reg)
-        code += "\nJUMP 5"
-        code += "\nSUB {} {}".format(reg2, reg1)
-        code += "\nJZERO {} 2".format(reg2)
-        code += "\nJUMP 2"
-        code += "\nJUMP {}"
+        code += self.generic_translator.put_value_to_register(right_val, reg2)
+        code += self.generic_translator.copy_register(reg1, condition_reg)
+        code.add("SUB", condition_reg, reg2)
+        code.add("JZERO", condition_reg, second_check)
+        code.add("JUMP", end)
+        code.mark(second_check)
+        code.add("SUB", reg2, reg1)
+        code.add("JZERO", reg2, fail)
+        code.add("JUMP", end)
+        code.mark(fail)
+        code.add("JUMP", false_label)
+        code.mark(end)
         return code
 
-    def __perform_less(self, left_val: Value, right_val: Value):
+    def __perform_less(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         if left_val.is_int() and right_val.is_int():
-            met = left_val.core < right_val.core
-            if met:
-                code = "JUMP 1"
-            else:
-                code = "JUMP {}"
+            code = self.__perform_constant(left_val.core < right_val.core, false_label)
         elif left_val.is_int():
-            code = self.__perform_more(right_val, left_val)
-        elif right_val.is_int() and right_val.core <= ConditionTranslator.SUPERIORITY_SWITCH_THRESHOLD:
-            num = right_val.core
-            reg = self.register_machine.fetch_register()
-            code = self.generic_translator.put_value_to_register(left_val, reg)
-            while num > 0:
-                code += "\nJZERO {} {}".format(reg, 2 * num + 1)
-                code += "\nDEC {}".format(reg)
-                num -= 1
-            code += "\nJUMP {}"
+            code = self.__perform_more(right_val, left_val, false_label)
+        elif right_val.is_int():
+            code = self.__choose_comparison(lambda: self.__perform_less_chain(left_val, right_val.core, false_label),
+                                            lambda: self.__perform_less_2i(left_val, right_val, false_label),
+                                            right_val.core)
         else:
-            code = self.__perform_less_2i(left_val, right_val)
+            code = self.__perform_less_2i(left_val, right_val, false_label)
         return code
 
-    def __perform_less_2i(self, left_val: Value, right_val: Value):
+    def __perform_less_chain(self, left_val: Value, num: int, false_label: Label) -> Code:
+        reg = self.register_machine.fetch_register()
+        end = Label("cond_end")
+        code = self.generic_translator.put_value_to_register(left_val, reg)
+        code += self.__count_down(left_val, reg, num, end)
+        code.add("JUMP", false_label)
+        code.mark(end)
+        return code
+
+    def __perform_less_2i(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         reg1 = self.register_machine.fetch_register()
         reg2 = self.register_machine.fetch_register()
 
         code = self.generic_translator.put_value_to_register(left_val, reg1)
-        code += "\n" + self.generic_translator.put_value_to_register(right_val, reg2)
-        code += "\nSUB {} {}".format(reg2, reg1)
-        code += "\nJZERO {}".format(reg2) + " {}"
+        code += self.generic_translator.put_value_to_register(right_val, reg2)
+        code.add("SUB", reg2, reg1)
+        code.add("JZERO", reg2, false_label)
         return code
 
-    def __perform_more(self, left_val: Value, right_val: Value):
+    def __perform_more(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         if left_val.is_int() and right_val.is_int():
-            met = left_val.core > right_val.core
-            if met:
-                code = "JUMP 1"
-            else:
-                code = "JUMP {}"
+            code = self.__perform_constant(left_val.core > right_val.core, false_label)
         elif left_val.is_int():
-            code = self.__perform_less(right_val, left_val)
-        elif right_val.is_int() and right_val.core <= ConditionTranslator.SUPERIORITY_SWITCH_THRESHOLD:
-            num = right_val.core
-            reg = self.register_machine.fetch_register()
-            code = self.generic_translator.put_value_to_register(left_val, reg)
-            while num > 0:
-                code += "\nJZERO {} {}".format(reg, 2 * num)
-                code += "\nDEC {}".format(reg)
-                num -= 1
-            code += "\nJZERO {}".format(reg) + " {}"
+            code = self.__perform_less(right_val, left_val, false_label)
+        elif right_val.is_int():
+            code = self.__choose_comparison(lambda: self.__perform_more_chain(left_val, right_val.core, false_label),
+                                            lambda: self.__perform_more_2i(left_val, right_val, false_label),
+                                            right_val.core)
         else:
-            code = self.__perform_more_2i(left_val, right_val)
+            code = self.__perform_more_2i(left_val, right_val, false_label)
+        return code
+
+    def __perform_more_chain(self, left_val: Value, num: int, false_label: Label) -> Code:
+        reg = self.register_machine.fetch_register()
+        fail = Label("cond_fail")
+        code = self.generic_translator.put_value_to_register(left_val, reg)
+        code += self.__count_down(left_val, reg, num, fail)
+        code.mark(fail)
+        code.add("JZERO", reg, false_label)
         return code
 
-    def __perform_more_2i(self, left_val: Value, right_val: Value):
+    def __perform_more_2i(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         reg1 = self.register_machine.fetch_register()
         reg2 = self.register_machine.fetch_register()
 
         code = self.generic_translator.put_value_to_register(left_val, reg1)
-        code += "\n" + self.generic_translator.put_value_to_register(right_val, reg2)
-        code += "\nSUB {} {}".format(reg1, reg2)
-        code += "\nJZERO {}".format(reg1) + " {}"
+        code += self.generic_translator.put_value_to_register(right_val, reg2)
+        code.add("SUB", reg1, reg2)
+        code.add("JZERO", reg1, false_label)
         return code
 
-    def __perform_less_equal(self, left_val: Value, right_val: Value):
+    def __perform_less_equal(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         if left_val.is_int() and right_val.is_int():
-            met = left_val.core <= right_val.core
-            if met:
-                code = "JUMP 1"
-            else:
-                code = "JUMP {}"
+            code = self.__perform_constant(left_val.core <= right_val.core, false_label)
         elif left_val.is_int():
-            code = self.__perform_more_equal(right_val, left_val)
-        elif right_val.is_int() and right_val.core <= ConditionTranslator.SUPERIORITY_SWITCH_THRESHOLD:
-            num = right_val.core
-            reg = self.register_machine.fetch_register()
-            code = self.generic_translator.put_value_to_register(left_val, reg)
-            while num > 0:
-                code += "\nJZERO {} {}".format(reg, 2 * num + 2)
-                code += "\nDEC {}".format(reg)
-                num -= 1
-            code += "\nJZERO {} 2".format(reg)
-            code += "\nJUMP {}"
+            code = self.__perform_more_equal(right_val, left_val, false_label)
+        elif right_val.is_int():
+            code = self.__choose_comparison(
+                lambda: self.__perform_less_equal_chain(left_val, right_val.core, false_label),
+                lambda: self.__perform_less_equal_2i(left_val, right_val, false_label), right_val.core)
         else:
-            code = self.__perform_less_equal_2i(left_val, right_val)
+            code = self.__perform_less_equal_2i(left_val, right_val, false_label)
+        return code
+
+    def __perform_less_equal_chain(self, left_val: Value, num: int, false_label: Label) -> Code:
+        reg = self.register_machine.fetch_register()
+        end = Label("cond_end")
+        code = self.generic_translator.put_value_to_register(left_val, reg)
+        code += self.__count_down(left_val, reg, num, end)
+        code.add("JZERO", reg, end)
+        code.add("JUMP", false_label)
+        code.mark(end)
         return code
 
-    def __perform_less_equal_2i(self, left_val: Value, right_val: Value):
+    def __perform_less_equal_2i(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         reg1 = self.register_machine.fetch_register()
         reg2 = self.register_machine.fetch_register()
+        end = Label("cond_end")
 
         code = self.generic_translator.put_value_to_register(left_val, reg1)
-        code += "\n" + self.generic_translator.put_value_to_register(right_val, reg2)
-        code += "\nSUB {} {}".format(reg1, reg2)
-        code += "\nJZERO {} 2".format(reg1)
-        code += "\nJUMP {}"
+        code += self.generic_translator.put_value_to_register(right_val, reg2)
+        code.add("SUB", reg1, reg2)
+        code.add("JZERO", reg1, end)
+        code.add("JUMP", false_label)
+        code.mark(end)
         return code
 
-    def __perform_more_equal(self, left_val: Value, right_val: Value):
+    def __perform_more_equal(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         if left_val.is_int() and right_val.is_int():
-            met = left_val.core >= right_val.core
-            if met:
-                code = "JUMP 1"
-            else:
-                code = "JUMP {}"
+            code = self.__perform_constant(left_val.core >= right_val.core, false_label)
         elif left_val.is_int():
-            code = self.__perform_less_equal(right_val, left_val)
-        elif right_val.is_int() and right_val.core <= ConditionTranslator.SUPERIORITY_SWITCH_THRESHOLD:
-            num = right_val.core
-            reg = self.register_machine.fetch_register()
-            code = self.generic_translator.put_value_to_register(left_val, reg)
-            while num > 0:
-                code += "\nJZERO {} {}".format(reg, 2 * num + 1)
-                code += "\nDEC {}".format(reg)
-                num -= 1
-            code += "\nJUMP 2"
-            code += "\nJUMP {}"
+            code = self.__perform_less_equal(right_val, left_val, false_label)
+        elif right_val.is_int():
+            code = self.__choose_comparison(
+                lambda: self.__perform_more_equal_chain(left_val, right_val.core, false_label),
+                lambda: self.__perform_more_equal2i(left_val, right_val, false_label), right_val.core)
         else:
-            code = self.__perform_more_equal2i(left_val, right_val)
+            code = self.__perform_more_equal2i(left_val, right_val, false_label)
+        return code
+
+    def __perform_more_equal_chain(self, left_val: Value, num: int, false_label: Label) -> Code:
+        reg = self.register_machine.fetch_register()
+        fail = Label("cond_fail")
+        end = Label("cond_end")
+        code = self.generic_translator.put_value_to_register(left_val, reg)
+        code += self.__count_down(left_val, reg, num, fail)
+        code.add("JUMP", end)
+        code.mark(fail)
+        code.add("JUMP", false_label)
+        code.mark(end)
         return code
 
-    def __perform_more_equal2i(self, left_val: Value, right_val: Value):
+    def __perform_more_equal2i(self, left_val: Value, right_val: Value, false_label: Label) -> Code:
         reg1 = self.register_machine.fetch_register()
         reg2 = self.register_machine.fetch_register()
+        end = Label("cond_end")
 
         code = self.generic_translator.put_value_to_register(left_val, reg1)
-        code += "\n" + self.generic_translator.put_value_to_register(right_val, reg2)
-        code += "\nSUB {} {}".format(reg2, reg1)
-        code += "\nJZERO {} 2".format(reg2)
-        code += "\nJUMP {}"
+        code += self.generic_translator.put_value_to_register(right_val, reg2)
+        code.add("SUB", reg2, reg1)
+        code.add("JZERO", reg2, end)
+        code.add("JUMP", false_label)
+        code.mark(end)
         return code
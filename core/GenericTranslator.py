@@ -1,96 +1,170 @@
 from core.LangVariableTable import LangVariableTable
 from core.LangRegisterMachine import LangRegisterMachine
+from core.LangCostModel import LangCostModel
+from core.LangConstantSynthesizer import LangConstantSynthesizer
+from core.LangRanges import LangRanges
+from model.internal.Code import Code
+from model.internal.Feedback import Feedback
 from model.nonterminals.Value import Value
 from model.nonterminals.Identifier import Identifier
 
 
 class GenericTranslator:
 
-    KNOWN_VARIABLE_LOAD_THRESHOLD = 100_000
+    # known values are folded into constants only up to this size, so that compile time stays bounded
+    REFLECTED_VALUE_BIT_LIMIT = 256
 
     def __init__(self, variable_table: LangVariableTable, register_machine: LangRegisterMachine):
         self.variable_table = variable_table
         self.register_machine = register_machine
+        self.__pointers = dict()
 
-    @staticmethod
-    def line_count(text: str) -> int:
-        return text.count("\n") + 1
-
-    def put_value_to_register(self, val: Value, register, ignore_iterator=None) -> str:
+    # helper is a register free for the time of generating a constant
+    def put_value_to_register(self, val: Value, register, ignore_iterator=None, helper=None) -> Code:
         if val.is_int():
-            return self.generate_constant(val.core, register)
+            if val.origin is not None and \
+                    not self.is_constant_cheaper(val.core, self.__load_code(val.origin, ignore_iterator)):
+                return self.__load(val.origin, register, ignore_iterator)
+            return self.generate_constant(val.core, register, helper)
         else:
             idd = val.core
             idd_val = self.variable_table.get_value(idd.name, idd.offset)
-            if idd_val is not None and idd_val < GenericTranslator.KNOWN_VARIABLE_LOAD_THRESHOLD:
-                code = self.generate_constant(idd_val, register)
+            if idd_val is not None and self.is_constant_cheaper(idd_val, self.__load_code(idd, ignore_iterator)):
+                code = self.generate_constant(idd_val, register, helper)
                 return code
             else:
-                code = self.put_address_to_register(val.core, register, ignore_iterator=ignore_iterator)
-                code += "\nLOAD {} {}".format(register, register)
-                return code
-
-    def put_address_to_register(self, idd: Identifier, register, initialize=False, ignore_iterator=None) -> str:
+                return self.__load(idd, register, ignore_iterator)
+
+    def __load(self, idd: Identifier, register, ignore_iterator=None) -> Code:
+        bound_register = self.get_bound_register(idd, ignore_iterator)
+        if bound_register == register:
+            return Code()
+        elif bound_register is not None:
+            return self.copy_register(source_reg=bound_register, dest_reg=register)
+        address_register = self.get_address_register(idd, ignore_iterator=ignore_iterator)
+        if address_register is not None:
+            return Code().add("LOAD", register, address_register)
+        code = self.put_address_to_register(idd, register, ignore_iterator=ignore_iterator)
+        code.add("LOAD", register, register)
+        return code
+
+    def get_bound_register(self, idd: Identifier, ignore_iterator=None):
+        if idd.offset is not None or idd.name == ignore_iterator:
+            return None
+        return self.register_machine.get_binding(idd.name)
+
+    def store_bindings(self, bindings: dict, register) -> Code:
+        code = Code()
+        for name, bound_register in bindings.items():
+            code += self.put_address_to_register(Identifier(name), register)
+            code.add("STORE", bound_register, register)
+        return code
+
+    def load_bindings(self, bindings: dict, register) -> Code:
+        code = Code()
+        for name, bound_register in bindings.items():
+            code += self.put_address_to_register(Identifier(name), register)
+            code.add("LOAD", bound_register, register)
+        return code
+
+    def put_address_to_register(self, idd: Identifier, register, initialize=False, ignore_iterator=None) -> Code:
         if idd.offset is None or type(idd.offset) == int:
             address = self.variable_table.get_address(idd.name, idd.offset, initialize, ignore_iterator=ignore_iterator)
             code = self.generate_constant(address, register)
             return code
         else:
+            address_register = self.get_address_register(idd, initialize, ignore_iterator)
+            if address_register == register:
+                return Code()
+            elif address_register is not None:
+                return self.copy_register(source_reg=address_register, dest_reg=register)
             bias = self.variable_table.get_bias(idd.name)
             address = self.variable_table.get_address(idd.name, bias, initialize, ignore_iterator)
-            reg = self.register_machine.borrow_register()
 
-            code = self.generate_constant(address, register)
-            code += "\n" + self.put_value_to_register(Value(Identifier(idd.offset)), reg,
-                                                      ignore_iterator=ignore_iterator)
-            code += "\nADD {} {}".format(register, reg)
-            code += "\n" + self.put_value_to_register(Value(bias), reg, ignore_iterator=ignore_iterator)
-            code += "\nSUB {} {}".format(register, reg)
+            # only the distance between the address of the array and its first index is generated
+            code = self.put_value_to_register(Value(Identifier(idd.offset)), register, ignore_iterator=ignore_iterator)
+            if address >= bias:
+                code += self.__add_constant(register, address - bias, "INC", "ADD")
+            else:
+                code += self.__add_constant(register, bias - address, "DEC", "SUB")
             return code
 
-    @staticmethod
-    def copy_register(source_reg: str, dest_reg: str):
-        return "RESET {}\nADD {} {}".format(dest_reg, dest_reg, source_reg)
+    # register already holding the address of an array element: a pointer stepped along with the iterator indexing
+    # the array, or the index itself if the address of the array is equal to its first index
+    def get_address_register(self, idd: Identifier, initialize=False, ignore_iterator=None):
+        if idd.offset is None or type(idd.offset) == int or idd.offset == ignore_iterator:
+            return None
+        bias = self.variable_table.get_bias(idd.name)
+        address = self.variable_table.get_address(idd.name, bias, initialize, ignore_iterator)
+        pointer = self.__pointers.get((idd.name, idd.offset))
+        if pointer is not None and self.register_machine.get_binding(pointer) is not None:
+            return self.register_machine.get_binding(pointer)
+        elif address == bias:
+            return self.get_bound_register(Identifier(idd.offset))
+        return None
+
+    # pointers map pairs of an array and an iterator to the helper variable holding the address of the element
+    def get_pointers(self) -> dict:
+        return dict(self.__pointers)
+
+    def set_pointers(self, pointers: dict):
+        self.__pointers = dict(pointers)
+
+    def __add_constant(self, register, num: int, step_opcode: str, combining_opcode: str) -> Code:
+        reg = self.register_machine.borrow_register()
+        code = self.generate_constant(num, reg)
+        code.add(combining_opcode, register, reg)
+        if num * LangCostModel.instruction_cost(step_opcode) > LangCostModel.estimate(code):
+            return code
+        code = Code()
+        for _ in range(num):
+            code.add(step_opcode, register)
+        return code
 
     @staticmethod
-    def generate_constant(value: int, register) -> str:
-        if value < 0:
-            raise ValueError("Stuck upon negative value; please report this error along with stacktrace.")
+    def copy_register(source_reg: str, dest_reg: str) -> Code:
+        return Code().add("RESET", dest_reg).add("ADD", dest_reg, source_reg)
 
-        value2 = value
-
-        commands = []
-        while value:
-            if value % 2:
-                commands.append("INC {}".format(register))
-                value -= 1
-            else:
-                commands.append("SHL {}".format(register))
-                value //= 2
-        commands.append("RESET {}".format(register))
-
-        commands_alt = []
-        while value2 > 1:
-            if value2 % 2:
-                commands_alt.append("DEC {}".format(register))
-                value2 += 1
-            else:
-                commands_alt.append("SHL {}".format(register))
-                value2 //= 2
-        commands_alt.append("INC {}".format(register))
-        commands_alt.append("RESET {}".format(register))
-
-        return "\n".join(commands[::-1]) if len(commands) <= len(commands_alt) else "\n".join(commands_alt[::-1])
+    @staticmethod
+    def generate_constant(value: int, register, helper=None) -> Code:
+        return LangConstantSynthesizer.synthesize(value, register, helper)
+
+    def is_constant_cheaper(self, value: int, load_code: Code) -> bool:
+        load_cost = LangCostModel.estimate(load_code)
+        # generating a constant takes at least one instruction per bit
+        return value.bit_length() <= load_cost and \
+            LangCostModel.estimate(self.generate_constant(value, "a")) <= load_cost
+
+    def __load_code(self, idd: Identifier, ignore_iterator=None) -> Code:
+        return self.__load(idd, "a", ignore_iterator)
+
+    # every candidate is generated from the same register state, the state left by the cheapest one is kept
+    def choose_cheapest(self, candidates: list):
+        state = self.register_machine.get_state()
+        results = []
+        for candidate in candidates:
+            self.register_machine.set_state(state)
+            results.append((candidate(), self.register_machine.get_state()))
+        result, result_state = min(results, key=lambda r: LangCostModel.estimate(
+            r[0].code if type(r[0]) == Feedback else r[0]))
+        self.register_machine.set_state(result_state)
+        return result
 
     def reflect_on_value(self, val: Value):
         if not val.is_int():
             name = val.core.name
             offset = val.core.offset
             reflected_value = self.variable_table.get_value(name, offset)
-            if reflected_value is not None and reflected_value < GenericTranslator.KNOWN_VARIABLE_LOAD_THRESHOLD:
-                return Value(reflected_value)
+            if reflected_value is not None and \
+                    reflected_value.bit_length() <= GenericTranslator.REFLECTED_VALUE_BIT_LIMIT:
+                return Value(reflected_value, origin=val.core)
         return val
 
+    def get_range(self, val: Value) -> tuple:
+        if val.is_int():
+            return LangRanges.point(val.core)
+        return self.variable_table.get_range(val.core.name, val.core.offset)
+
     @staticmethod
     def get_changed_identifiers(commands):
         changed_identifiers = []
@@ -0,0 +1,56 @@
+from model.internal.Code import Code
+from model.internal.Instruction import Instruction
+from model.internal.Label import Label
+
+
+class LangAssembler:
+
+    # jumps onto themselves, left by loops doing nothing but checking a condition, are made into loops of jumps by
+    # other offsets, as the machine reads no offset of 0
+    @staticmethod
+    def assemble(code: Code) -> str:
+        code = LangAssembler.unfold_self_jumps(code)
+        instructions = []
+        addresses = dict()
+        for item in code:
+            if type(item) == Label:
+                if item in addresses:
+                    raise ValueError("Label {} placed twice; please report this error along with stacktrace."
+                                     .format(item))
+                addresses[item] = len(instructions)
+            else:
+                instructions.append(item)
+
+        lines = []
+        for index, instruction in enumerate(instructions):
+            if instruction.is_jump():
+                offset = addresses[instruction.get_label()] - index
+                lines.append(instruction.to_assembly(offset))
+            else:
+                lines.append(instruction.to_assembly())
+        return "\n".join(lines)
+
+    # an unconditional jump onto itself jumps to the next instruction, which jumps back; a conditional one jumps over
+    # the jump leaving the loop to the jump back
+    @staticmethod
+    def unfold_self_jumps(code: Code) -> Code:
+        unfolded = Code()
+        labels = []
+        for item in code:
+            if type(item) == Label:
+                labels.append(item)
+                unfolded.mark(item)
+                continue
+            if type(item) == Instruction and item.is_jump() and item.get_label() in labels:
+                back = Label("back")
+                end = Label("end")
+                unfolded.place(item.with_label(back))
+                if item.opcode != "JUMP":
+                    unfolded.place(item.derive("JUMP", end))
+                unfolded.mark(back)
+                unfolded.place(item.derive("JUMP", item.get_label()))
+                unfolded.mark(end)
+            else:
+                unfolded.place(item)
+            labels = []
+        return unfolded
@@ -0,0 +1,127 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.util import Finalize
+from core.LangCompiler import LangCompiler
+from core.LangCompilationCache import LangCompilationCache
+from model.errors import CodeException
+
+
+class LangBatchCompiler:
+
+    SOURCE_EXTENSION = ".imp"
+    DESTINATION_EXTENSION = ".mr"
+
+    # compiler and compile cache of the process, set up once by every worker before it takes any file
+    process_compiler = None
+    process_cache = None
+
+    def __init__(self, jobs: int):
+        self.jobs = jobs
+
+    # pairs of source and destination files; an argument is either a source file, a directory whose source files are
+    # all taken, or a manifest preceded by "@", listing a source file, optionally followed by its destination file, in
+    # every line; destination files not given are put next to their sources, or into the output directory
+    @staticmethod
+    def collect_files(arguments: list, output_dir=None) -> list:
+        files = []
+        for argument in arguments:
+            if argument.startswith("@"):
+                files += LangBatchCompiler.__read_manifest(argument[1:])
+            elif os.path.isdir(argument):
+                files += [(os.path.join(argument, name), None) for name in sorted(os.listdir(argument))
+                          if name.endswith(LangBatchCompiler.SOURCE_EXTENSION)]
+            else:
+                files.append((argument, None))
+        return [(source_file, destination_file or LangBatchCompiler.__destination(source_file, output_dir))
+                for source_file, destination_file in files]
+
+    # results are passed to the callback as they come, and returned in the order of the files; a single job compiles
+    # the files one after another, without starting any process; a file whose worker fails, or dies, is reported as
+    # failed like any other, and once the pool is broken so are the files it has not compiled yet
+    def compile(self, files: list, on_result) -> list:
+        if self.jobs == 1:
+            LangBatchCompiler.start_process()
+            results = []
+            for source_file, destination_file in files:
+                results.append(LangBatchCompiler.compile_file(source_file, destination_file))
+                on_result(results[-1])
+            return results
+
+        results = [None] * len(files)
+        with ProcessPoolExecutor(max_workers=self.jobs, initializer=LangBatchCompiler.start_process) as executor:
+            futures = {executor.submit(LangBatchCompiler.compile_file, source_file, destination_file): index
+                       for index, (source_file, destination_file) in enumerate(files)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    results[index] = LangBatchCompiler.__result(*files[index])
+                    results[index]["error"] = "internal error: {}".format(str(e) or type(e).__name__)
+                on_result(results[index])
+        return results
+
+    # translator modules are imported up front, so that the first file does not pay for them; workers of a pool leave
+    # without running exit handlers, so hits and misses of their cache are written by a finalizer instead
+    @staticmethod
+    def start_process():
+        LangBatchCompiler.process_compiler = LangCompiler()
+        LangBatchCompiler.process_cache = LangCompilationCache.from_environment()
+        if LangBatchCompiler.process_cache is not None:
+            Finalize(LangBatchCompiler.process_cache, LangBatchCompiler.process_cache.flush, exitpriority=0)
+        LangCompiler.create_translator()
+
+    # errors other than errors in the program are reported as well, so that they do not stop the remaining files
+    @staticmethod
+    def compile_file(source_file: str, destination_file: str) -> dict:
+        result = LangBatchCompiler.__result(source_file, destination_file)
+        cache = LangBatchCompiler.process_cache
+        start = time.perf_counter()
+        try:
+            with open(source_file, "r") as f:
+                source = f.read()
+            key = LangCompilationCache.key(source) if cache is not None else None
+            assembly = cache.get(key) if cache is not None else None
+            result["cached"] = assembly is not None
+            if assembly is None:
+                assembly = LangBatchCompiler.process_compiler.compile(source)
+                if cache is not None:
+                    cache.put(key, assembly)
+            with open(destination_file, "w") as f:
+                f.write(assembly)
+        except (CodeException, OSError) as e:
+            result["error"] = str(e)
+        except Exception as e:
+            result["error"] = "internal error: {}".format(e)
+        else:
+            result["ok"] = True
+            result["instructions"] = assembly.count("\n") + 1
+            result["bytes"] = len(assembly.encode())
+        result["compile_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
+    @staticmethod
+    def __result(source_file: str, destination_file: str) -> dict:
+        return {"source": source_file, "destination": destination_file, "ok": False, "cached": False,
+                "compile_ms": None, "instructions": None, "bytes": None, "error": None}
+
+    # paths in a manifest are relative to the directory of the manifest; empty lines and lines starting with "#" are
+    # skipped
+    @staticmethod
+    def __read_manifest(manifest_file: str) -> list:
+        directory = os.path.dirname(manifest_file)
+        files = []
+        with open(manifest_file, "r") as f:
+            for line in f:
+                words = line.split()
+                if not words or words[0].startswith("#"):
+                    continue
+                paths = [os.path.join(directory, word) for word in words[:2]]
+                files.append((paths[0], paths[1] if len(paths) > 1 else None))
+        return files
+
+    @staticmethod
+    def __destination(source_file: str, output_dir) -> str:
+        base = os.path.splitext(source_file)[0] + LangBatchCompiler.DESTINATION_EXTENSION
+        return base if output_dir is None else os.path.join(output_dir, os.path.basename(base))
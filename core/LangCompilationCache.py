@@ -0,0 +1,181 @@
+import atexit
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+
+
+class LangCompilationCache:
+
+    DIR_VARIABLE = "KOMPILATOR_COMPILE_CACHE"
+    SIZE_VARIABLE = "KOMPILATOR_COMPILE_CACHE_SIZE"
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+    # entries are evicted down to this part of the size limit at once, so that eviction is not repeated by every entry
+    # stored once the cache is full
+    EVICTION_TARGET = 0.9
+
+    # packages whose sources generate the code; any change to them gives the compiler a new version
+    COMPILER_PACKAGES = ("core", "model")
+
+    ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    # digest of the sources of the compiler, computed once per process
+    compiler_version = None
+
+    # entries are files named after the digest of everything the generated code depends on, so an entry is never
+    # changed once written; the least recently used entries are evicted first, as every hit refreshes the modification
+    # time of its entry; statistics are shared by all compilers using the cache, under a lock; hits and misses are
+    # counted by the process and written with the next entry stored, or when the process exits, so that lookups take
+    # no lock
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.__entries_dir = os.path.join(directory, "entries")
+        self.__stats_file = os.path.join(directory, "stats.json")
+        self.__lock_file = os.path.join(directory, "lock")
+        self.__lookups = {"hits": 0, "misses": 0}
+        os.makedirs(self.__entries_dir, exist_ok=True)
+        atexit.register(self.flush)
+
+    # None unless a directory for the cache is given by the environment; a cache which cannot be used is never an
+    # error, as programs are then compiled as if there was no cache
+    @staticmethod
+    def from_environment():
+        directory = os.environ.get(LangCompilationCache.DIR_VARIABLE)
+        if not directory:
+            return None
+        max_size = os.environ.get(LangCompilationCache.SIZE_VARIABLE, "")
+        try:
+            return LangCompilationCache(directory, int(max_size) if max_size.isdigit() else
+                                        LangCompilationCache.DEFAULT_MAX_SIZE)
+        except OSError:
+            return None
+
+    # options are the ones given to the translator; their defaults belong to the version of the compiler
+    @staticmethod
+    def key(source: str, options=None) -> str:
+        if LangCompilationCache.compiler_version is None:
+            LangCompilationCache.compiler_version = LangCompilationCache.__digest_compiler()
+        content = json.dumps([LangCompilationCache.compiler_version, options or dict(), source], sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    # None on a miss
+    def get(self, key: str):
+        path = self.__entry_path(key)
+        try:
+            with open(path, "r") as f:
+                assembly = f.read()
+        except OSError:
+            self.__lookups["misses"] += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.__lookups["hits"] += 1
+        return assembly
+
+    # entries are written to a temporary file first and then put in place at once, so that compilers reading the
+    # cache meanwhile never see them half written; code which would leave no room for other entries is not stored
+    def put(self, key: str, assembly: str):
+        path = self.__entry_path(key)
+        if os.path.exists(path) or len(assembly) > self.max_size * LangCompilationCache.EVICTION_TARGET:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(descriptor, "w") as f:
+                f.write(assembly)
+            os.replace(temporary_path, path)
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        self.__update_stats(stored=1, size=size)
+
+    # hits and misses of the process are written, unless there are none; processes which leave without running exit
+    # handlers have to call it themselves
+    def flush(self):
+        if any(self.__lookups.values()):
+            self.__update_stats()
+
+    # hits and misses of the process not written yet are counted as well
+    def get_stats(self) -> dict:
+        with open(self.__lock_file, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            stats = self.__read_stats()
+        for name, count in self.__lookups.items():
+            stats[name] += count
+        return stats
+
+    def __entry_path(self, key: str) -> str:
+        return os.path.join(self.__entries_dir, key[:2], key)
+
+    # counters, together with hits and misses of the process, are added to the ones stored; the size of the entries is
+    # recounted whenever it exceeds the limit, and entries are evicted if it still does
+    def __update_stats(self, **changes):
+        try:
+            with open(self.__lock_file, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                stats = self.__read_stats()
+                for name, change in list(changes.items()) + list(self.__lookups.items()):
+                    stats[name] += change
+                if stats["size"] > self.max_size:
+                    stats["size"], evicted = self.__evict()
+                    stats["evicted"] += evicted
+                descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(descriptor, "w") as f:
+                    json.dump(stats, f)
+                os.replace(temporary_path, self.__stats_file)
+        except OSError:
+            return
+        self.__lookups = dict.fromkeys(self.__lookups, 0)
+
+    def __read_stats(self) -> dict:
+        stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "size": 0}
+        try:
+            with open(self.__stats_file, "r") as f:
+                stats.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        return stats
+
+    # returns the size of entries left and the number of entries evicted; files still being written are left alone
+    def __evict(self) -> tuple:
+        entries = []
+        for directory, _, names in os.walk(self.__entries_dir):
+            for name in [name for name in names if not name.endswith(".tmp")]:
+                path = os.path.join(directory, name)
+                try:
+                    status = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((status.st_mtime, status.st_size, path))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        evicted = 0
+        if size <= self.max_size:
+            return size, evicted
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size * LangCompilationCache.EVICTION_TARGET:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+            evicted += 1
+        return size, evicted
+
+    @staticmethod
+    def __digest_compiler() -> str:
+        digest = hashlib.sha256()
+        for package in LangCompilationCache.COMPILER_PACKAGES:
+            for directory, directories, names in os.walk(os.path.join(LangCompilationCache.ROOT_DIR, package)):
+                directories[:] = sorted(name for name in directories if name != "__pycache__")
+                for name in sorted(name for name in names if name.endswith(".py")):
+                    path = os.path.join(directory, name)
+                    digest.update(os.path.relpath(path, LangCompilationCache.ROOT_DIR).encode())
+                    with open(path, "rb") as f:
+                        digest.update(f.read())
+        return digest.hexdigest()
@@ -0,0 +1,33 @@
+import json
+import socket
+
+
+class LangCompileClient:
+
+    def __init__(self, socket_path: str):
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.__socket.connect(socket_path)
+        except OSError:
+            self.__socket.close()
+            raise
+        self.__file = self.__socket.makefile("rwb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # answer of the server, as described by LangCompileServer.respond
+    def compile(self, source: str, options=None) -> dict:
+        self.__file.write(json.dumps({"source": source, "options": options or dict()}).encode() + b"\n")
+        self.__file.flush()
+        line = self.__file.readline()
+        if not line:
+            raise ConnectionError("compile server closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self.__file.close()
+        self.__socket.close()
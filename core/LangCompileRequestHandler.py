@@ -0,0 +1,10 @@
+import json
+import socketserver
+
+
+class LangCompileRequestHandler(socketserver.StreamRequestHandler):
+
+    # a connection may carry any number of requests, one per line, every one answered by a line in the same order
+    def handle(self):
+        for line in self.rfile:
+            self.wfile.write(json.dumps(self.server.respond(line)).encode() + b"\n")
@@ -0,0 +1,65 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import time
+from core.LangCompiler import LangCompiler
+from core.LangCompileRequestHandler import LangCompileRequestHandler
+from model.errors import CodeException
+
+
+class LangCompileServer(socketserver.UnixStreamServer):
+
+    # requests are served one at a time, as all of them share the lexer and the parser of the compiler; translator
+    # modules are imported up front, so that the first request does not pay for them
+    def __init__(self, socket_path: str):
+        LangCompileServer.__remove_stale_socket(socket_path)
+        self.socket_path = socket_path
+        self.compiler = LangCompiler()
+        LangCompiler.create_translator()
+        super().__init__(socket_path, LangCompileRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    # a request is an object holding the source and, optionally, options of the translator; the answer holds either
+    # the assembly along with the time taken to compile it, or the type and the message of the error; errors other
+    # than errors in the program are answered as well, so that they do not bring the server down
+    def respond(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+            source, options = request["source"], request.get("options", dict())
+        except (ValueError, KeyError, TypeError, AttributeError):
+            source, options = None, None
+        if type(source) != str or type(options) != dict:
+            return LangCompileServer.__error("BadRequestError",
+                                             "error: request must be an object with source text and options")
+
+        start = time.perf_counter()
+        try:
+            assembly = self.compiler.compile(source, options)
+        except CodeException as e:
+            return LangCompileServer.__error(type(e).__name__, str(e))
+        except Exception as e:
+            return LangCompileServer.__error(type(e).__name__, "internal error: {}".format(e))
+        return {"ok": True, "assembly": assembly, "compile_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+    @staticmethod
+    def __error(error_type: str, message: str) -> dict:
+        return {"ok": False, "error": {"type": error_type, "message": message}}
+
+    # a socket left behind by a server which is gone is replaced, while one still accepting connections is not
+    @staticmethod
+    def __remove_stale_socket(socket_path: str):
+        if not os.path.exists(socket_path) or not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+            except ConnectionRefusedError:
+                os.remove(socket_path)
+                return
+        raise OSError("socket {} is in use by another server".format(socket_path))
@@ -0,0 +1,45 @@
+from core.LangLexer import LangLexer
+from core.LangParser import LangParser
+
+
+class LangCompiler:
+
+    # the lexer and the parser keep nothing between programs, so they are built once and reused, while every program
+    # gets a translator of its own
+    def __init__(self):
+        self.lexer = LangLexer()
+        self.parser = LangParser()
+
+    # options override settings of the translator, see LangTranslator.OPTIONS
+    def compile(self, source: str, options=None) -> str:
+        program = self.parser.parse(self.lexer.tokenize(source))
+        return LangCompiler.create_translator(options).translate_program(program)
+
+    # source map of the assembly, see LangSourceMap
+    def compile_with_source_map(self, source: str, options=None) -> tuple:
+        program = self.parser.parse(self.lexer.tokenize(source))
+        translator = LangCompiler.create_translator(options)
+        translator.record_source_map = True
+        return translator.translate_program(program), translator.source_map
+
+    # translator modules are imported only once a program is to be translated, so that compilations ending earlier do
+    # not pay for them
+    @staticmethod
+    def create_translator(options=None):
+        from core.LangTranslator import LangTranslator
+        from core.LangRegisterMachine import LangRegisterMachine
+        from core.LangVariableTable import LangVariableTable
+        from core.GenericTranslator import GenericTranslator
+        from core.OperationTranslator import OperationTranslator
+        from core.ConditionTranslator import ConditionTranslator
+
+        variable_table = LangVariableTable()
+        register_machine = LangRegisterMachine()
+        generic_translator = GenericTranslator(variable_table, register_machine)
+        operation_translator = OperationTranslator(variable_table, register_machine, generic_translator)
+        condition_translator = ConditionTranslator(variable_table, register_machine, generic_translator)
+        translator = LangTranslator(variable_table, register_machine, operation_translator, condition_translator,
+                                    generic_translator)
+        for name, value in (options or dict()).items():
+            translator.set_option(name, value)
+        return translator
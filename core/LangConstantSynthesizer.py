@@ -0,0 +1,85 @@
+from functools import lru_cache
+from core.LangCostModel import LangCostModel
+from model.internal.Code import Code
+
+
+class LangConstantSynthesizer:
+
+    # sequences are memoised per value and per whether a helper register is available
+    CACHE_SIZE = 4096
+
+    @staticmethod
+    def synthesize(value: int, register, helper=None) -> Code:
+        if value < 0:
+            raise ValueError("Stuck upon negative value; please report this error along with stacktrace.")
+        code = Code().add("RESET", register)
+        for opcode, target in LangConstantSynthesizer.__sequence(value, helper is not None):
+            if opcode == "COPY":
+                code.add("RESET", helper)
+                code.add("ADD", helper, register)
+            elif opcode == "ADD":
+                code.add("ADD", register, helper)
+            else:
+                code.add(opcode, register)
+        return code
+
+    # steps following RESET; with a helper register, a value divisible by 2^k + 1 may also be built as its factor added
+    # to a copy of itself shifted by k
+    @staticmethod
+    @lru_cache(maxsize=CACHE_SIZE)
+    def __sequence(value: int, with_helper: bool) -> tuple:
+        steps = tuple((opcode, None) for opcode in LangConstantSynthesizer.__steps(value))
+        if not with_helper or value < 2:
+            return steps
+
+        cost = len(steps)
+        copy_cost = LangCostModel.instruction_cost("RESET") + 2 * LangCostModel.instruction_cost("ADD")
+        for shift in range(1, value.bit_length()):
+            if copy_cost + shift >= cost:
+                break
+            divisor = (1 << shift) + 1
+            if value % divisor:
+                continue
+            factor_steps = LangConstantSynthesizer.__steps(value // divisor)
+            if len(factor_steps) + copy_cost + shift < cost:
+                steps = tuple((opcode, None) for opcode in factor_steps) + (("COPY", None),) + \
+                    (("SHL", None),) * shift + (("ADD", None),)
+                cost = len(factor_steps) + copy_cost + shift
+        return steps
+
+    # cheapest INC, DEC and SHL steps building the value from zero; the value is reached through its binary prefixes,
+    # each of them either exactly or exceeded by one, so only two candidates are kept per prefix length; a candidate is
+    # its cost, the candidate of the shorter prefix it is built from and the steps added
+    @staticmethod
+    def __steps(value: int) -> list:
+        if value == 0:
+            return []
+        low, high = (1, None, ("INC",)), (2, None, ("INC", "INC"))
+        first_level = (low, high)
+        levels = []
+        for shift in range(value.bit_length() - 2, -1, -1):
+            if value >> shift & 1:
+                new_low = min([(low[0] + 2, "low", ("SHL", "INC")), (high[0] + 2, "high", ("SHL", "DEC"))],
+                              key=lambda candidate: candidate[0])
+                new_high = min([(high[0] + 1, "high", ("SHL",)), (low[0] + 3, "low", ("SHL", "INC", "INC"))],
+                               key=lambda candidate: candidate[0])
+            else:
+                new_low = min([(low[0] + 1, "low", ("SHL",)), (high[0] + 3, "high", ("SHL", "DEC", "DEC"))],
+                              key=lambda candidate: candidate[0])
+                new_high = min([(low[0] + 2, "low", ("SHL", "INC")), (high[0] + 2, "high", ("SHL", "DEC"))],
+                               key=lambda candidate: candidate[0])
+            if new_low[0] + 1 < new_high[0]:
+                new_high = (new_low[0] + 1, new_low[1], new_low[2] + ("INC",))
+            elif new_high[0] + 1 < new_low[0]:
+                new_low = (new_high[0] + 1, new_high[1], new_high[2] + ("DEC",))
+            levels.append((new_low, new_high))
+            low, high = new_low, new_high
+
+        steps = []
+        candidate = "low"
+        for new_low, new_high in reversed(levels):
+            chosen = new_low if candidate == "low" else new_high
+            steps.append(chosen[2])
+            candidate = chosen[1]
+        steps.append(first_level[0][2] if candidate == "low" else first_level[1][2])
+        return [opcode for level_steps in reversed(steps) for opcode in level_steps]
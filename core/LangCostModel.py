@@ -0,0 +1,68 @@
+from model.internal.Code import Code
+from model.internal.Instruction import Instruction
+
+
+class LangCostModel:
+
+    # cycle costs charged by the virtual machine (mw-cln.cc); GET and PUT are charged IO_COST as i/o instead
+    INSTRUCTION_COSTS = {
+        "GET": 0,
+        "PUT": 0,
+        "LOAD": 20,
+        "STORE": 20,
+        "ADD": 5,
+        "SUB": 5,
+        "RESET": 1,
+        "INC": 1,
+        "DEC": 1,
+        "SHR": 1,
+        "SHL": 1,
+        "JUMP": 1,
+        "JZERO": 1,
+        "JODD": 1,
+        "HALT": 0
+    }
+
+    IO_COST = 100
+
+    @staticmethod
+    def instruction_cost(opcode: str) -> int:
+        cost = LangCostModel.INSTRUCTION_COSTS[opcode]
+        return cost + LangCostModel.IO_COST if opcode in ("GET", "PUT") else cost
+
+    # cost of the most expensive path through code; the number of iterations of a loop cannot be told statically,
+    # so code containing a backward jump is estimated as infinitely expensive
+    @staticmethod
+    def estimate(code: Code) -> int:
+        instructions = []
+        positions = dict()
+        for item in code:
+            if type(item) == Instruction:
+                instructions.append(item)
+            else:
+                positions[item] = len(instructions)
+
+        reach = [None] * (len(instructions) + 1)
+        reach[0] = 0
+        worst = 0
+        for index, instruction in enumerate(instructions):
+            if reach[index] is None:
+                continue
+            cost = reach[index] + LangCostModel.instruction_cost(instruction.opcode)
+            if instruction.is_jump():
+                target = positions.get(instruction.get_label())
+                if target is None:
+                    worst = max(worst, cost)
+                elif target <= index:
+                    return float("inf")
+                elif reach[target] is None or reach[target] < cost:
+                    reach[target] = cost
+            if instruction.opcode != "JUMP" and (reach[index + 1] is None or reach[index + 1] < cost):
+                reach[index + 1] = cost
+        if reach[-1] is not None:
+            worst = max(worst, reach[-1])
+        return worst
+
+    @staticmethod
+    def cheapest(candidates: list):
+        return min(candidates, key=lambda candidate: LangCostModel.estimate(candidate))
@@ -0,0 +1,170 @@
+from core.GenericTranslator import GenericTranslator
+from core.LangVariableTable import LangVariableTable
+from model.nonterminals.Value import Value
+from model.nonterminals.Identifier import Identifier
+from model.nonterminals.Condition import Condition
+from model.commands.Assign import Assign
+from model.commands.ForDownto import ForDownto
+from model.commands.ForTo import ForTo
+from model.commands.If import If
+from model.commands.IfElse import IfElse
+from model.commands.RepeatUntil import RepeatUntil
+from model.commands.While import While
+from model.commands.Write import Write
+from model.errors import CodeException, EvaluationError
+
+
+class LangEvaluator:
+
+    # number of commands and loop condition checks executed before evaluation is given up; it is counted in steps
+    # rather than time, so that the code does not depend on the machine compiling it
+    STEP_BUDGET = 250000
+
+    # values longer than that would not be put into registers as constants anyway, and computing them may take
+    # longer than any budget, as every multiplication doubles their length
+    VALUE_BIT_LIMIT = GenericTranslator.REFLECTED_VALUE_BIT_LIMIT
+
+    # commands are executed on values known to the variable table, which is not changed; evaluation is given up on
+    # reading a value unknown at compile time, reading input, computing a value too long and exceeding the step budget
+    def __init__(self, variable_table: LangVariableTable, step_budget=STEP_BUDGET):
+        self.__variable_table = variable_table
+        self.__steps_left = step_budget
+        self.out_of_steps = False
+        self.__values = dict()
+        self.__iterators = dict()
+        self.__outputs = []
+
+    # returns values written by the commands and values left in variables and array elements they changed, keyed by
+    # pairs of name and index, which is None for variables; None if the commands cannot be evaluated
+    def evaluate(self, commands: list):
+        try:
+            self.__execute(commands)
+        except EvaluationError:
+            return None
+        return self.__outputs, self.__values
+
+    def __step(self):
+        self.__steps_left -= 1
+        self.__require_steps(0)
+
+    def __require_steps(self, steps: int):
+        if steps > self.__steps_left:
+            self.out_of_steps = True
+            raise EvaluationError(ref="step budget exceeded")
+
+    def __execute(self, commands: list):
+        for command in commands:
+            self.__step()
+            if type(command) == Assign:
+                self.__assign(command.changed_identifier, command.assigned_expression)
+            elif type(command) == If:
+                if self.__check(command.condition):
+                    self.__execute(command.commands)
+            elif type(command) == IfElse:
+                if self.__check(command.condition):
+                    self.__execute(command.positive_commands)
+                else:
+                    self.__execute(command.negative_commands)
+            elif type(command) == While:
+                while self.__check(command.condition):
+                    self.__execute(command.commands)
+                    self.__step()
+            elif type(command) == RepeatUntil:
+                self.__execute(command.commands)
+                while not self.__check(command.condition):
+                    self.__step()
+                    self.__execute(command.commands)
+            elif type(command) == ForTo:
+                self.__for(command.idd, self.__get(command.from_value), self.__get(command.to_value), 1,
+                           command.commands)
+            elif type(command) == ForDownto:
+                self.__for(command.idd, self.__get(command.from_value), self.__get(command.downto_value), -1,
+                           command.commands)
+            elif type(command) == Write:
+                self.__outputs.append(self.__get(command.value))
+            else:
+                raise EvaluationError(ref="input read")
+
+    def __assign(self, changed_identifier: Identifier, assigned_expression):
+        val1 = self.__get(assigned_expression.val1)
+        if assigned_expression.is_value():
+            value = val1
+        else:
+            val2 = self.__get(assigned_expression.val2)
+            value = LangEvaluator.__operate(val1, val2, assigned_expression.operation)
+            if value.bit_length() > LangEvaluator.VALUE_BIT_LIMIT:
+                raise EvaluationError(ref="value too long")
+        if changed_identifier.offset is None and changed_identifier.name in self.__iterators:
+            raise EvaluationError(ref="iterator assigned")
+        key = self.__key(changed_identifier)
+        if key[1] is not None:
+            try:
+                self.__variable_table.get_address(*key)
+            except (CodeException, KeyError):
+                raise EvaluationError(ref="{} referenced out of bounds".format(key[0]))
+        self.__values[key] = value
+
+    @staticmethod
+    def __operate(val1: int, val2: int, operation: str) -> int:
+        if operation == "+":
+            return val1 + val2
+        elif operation == "-":
+            return max(val1 - val2, 0)
+        elif operation == "*":
+            return val1 * val2
+        elif val2 == 0:
+            return 0
+        elif operation == "/":
+            return val1 // val2
+        else:
+            return val1 % val2
+
+    def __check(self, condition: Condition) -> bool:
+        val1 = self.__get(condition.val1)
+        val2 = self.__get(condition.val2)
+        if condition.comparison == "=":
+            return val1 == val2
+        elif condition.comparison == "!=":
+            return val1 != val2
+        elif condition.comparison == "<":
+            return val1 < val2
+        elif condition.comparison == ">":
+            return val1 > val2
+        elif condition.comparison == "<=":
+            return val1 <= val2
+        else:
+            return val1 >= val2
+
+    # bounds are evaluated once, before the iterator comes into scope; every iteration takes at least a step per
+    # command of the body, so loops which cannot end within the budget are given up before they start
+    def __for(self, idd: str, first: int, last: int, step: int, commands: list):
+        self.__require_steps(max((last - first) * step + 1, 0) * len(commands))
+        iterators = self.__iterators.setdefault(idd, [])
+        iterators.append(first)
+        while first * step <= last * step:
+            iterators[-1] = first
+            self.__execute(commands)
+            first += step
+        iterators.pop()
+        if not iterators:
+            del self.__iterators[idd]
+
+    def __get(self, val: Value) -> int:
+        if val.is_int():
+            return val.core
+        return self.__get_name(*self.__key(val.core))
+
+    def __key(self, idd: Identifier):
+        if idd.offset is None or type(idd.offset) == int:
+            return idd.name, idd.offset
+        return idd.name, self.__get_name(idd.offset)
+
+    def __get_name(self, name: str, offset=None) -> int:
+        if offset is None and self.__iterators.get(name):
+            return self.__iterators[name][-1]
+        value = self.__values.get((name, offset))
+        if value is None:
+            value = self.__variable_table.get_value(name, offset)
+        if value is None:
+            raise EvaluationError(ref="value of {} unknown".format(name))
+        return value
@@ -1,4 +1,6 @@
 from sly import Lexer
+from core.LangTables import LangTables
+from model.errors import BadCharacterError
 
 
 class LangLexer(Lexer):
@@ -67,8 +69,26 @@ class LangLexer(Lexer):
         return t
 
     def error(self, t):
-        print("error at line {}: bad character - {}".format(self.lineno, t.value[0]))
-        exit(1)
+        raise BadCharacterError(ref=t.value[0], lineno=self.lineno)
+
+    # rules checked by sly once are read from the cache afterwards, so that only the master pattern is compiled
+    @classmethod
+    def _build(cls):
+        cls._token_names = set(cls.tokens)
+        cls._collect_rules()
+        patterns = [(name, rule if isinstance(rule, str) else rule.pattern) for name, rule in cls._rules]
+        digest = LangTables.digest(cls.tokens, cls.literals, cls.ignore, cls.reflags, patterns)
+        master_pattern = LangTables.load(cls.__name__, digest)
+        if master_pattern is None:
+            super()._build()
+            LangTables.save(cls.__name__, digest, cls._master_re.pattern)
+            return
+
+        names = [(name[len("ignore_"):] if name.startswith("ignore_") else name, rule) for name, rule in cls._rules]
+        cls._ignored_tokens = {name[len("ignore_"):] for name, rule in cls._rules if name.startswith("ignore_")}
+        cls._token_funcs = {name: rule for name, rule in names if callable(rule)}
+        cls._remapping = dict()
+        cls._master_re = cls.regex_module.compile(master_pattern, cls.reflags)
 
 
 def test():
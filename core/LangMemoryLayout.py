@@ -0,0 +1,131 @@
+from core.GenericTranslator import GenericTranslator
+from core.LangCostModel import LangCostModel
+from model.internal.LangProgram import LangProgram
+from model.nonterminals.Value import Value
+from model.nonterminals.Identifier import Identifier
+from model.commands.Assign import Assign
+from model.commands.DeclareVariable import DeclareVariable
+from model.commands.ForDownto import ForDownto
+from model.commands.ForTo import ForTo
+from model.commands.If import If
+from model.commands.IfElse import IfElse
+from model.commands.Read import Read
+from model.commands.RepeatUntil import RepeatUntil
+from model.commands.While import While
+from model.commands.Write import Write
+
+
+class LangMemoryLayout:
+
+    # a reference inside of a loop is assumed to be executed this many times per execution of the enclosing code
+    LOOP_WEIGHT = 10
+
+    # every FOR loop keeps its iterator and the number of iterations left on the stack of the variable table
+    STACK_CELLS_PER_LOOP = 2
+
+    def __init__(self, program: LangProgram):
+        self.__program = program
+        self.__weights = dict()
+        self.__stack_weights = []
+        self.__count_commands(program.commands, 1, [], None)
+
+    # declarations and stack cells of loops are ordered by references per cell, so that big arrays go last; the
+    # leading single cells get the addresses cheapest to generate, the most referenced first; returns addresses of
+    # declarations and addresses of stack cells in order of loop nesting
+    def arrange(self):
+        items = [(self.__weights.get(d.name, 0), LangMemoryLayout.__size(d), d) for d in self.__program.declarations]
+        items += [(weight, 1, cell) for cell, weight in enumerate(self.__stack_weights)]
+        items.sort(key=lambda item: item[0] / item[1], reverse=True)
+
+        leading_cells = 0
+        while leading_cells < len(items) and items[leading_cells][1] == 1:
+            leading_cells += 1
+        addresses = sorted(range(leading_cells), key=lambda a: (LangMemoryLayout.__address_cost(a), a))
+        address = leading_cells
+        for _, size, _ in items[leading_cells:]:
+            addresses.append(address)
+            address += size
+
+        declaration_addresses = dict()
+        stack_addresses = [None] * len(self.__stack_weights)
+        for (_, _, item), address in zip(items, addresses):
+            if type(item) == int:
+                stack_addresses[item] = address
+            else:
+                declaration_addresses[item] = address
+        return declaration_addresses, stack_addresses
+
+    @staticmethod
+    def __size(declaration) -> int:
+        if type(declaration) == DeclareVariable:
+            return 1
+        return max(declaration.last - declaration.first + 1, 1)
+
+    @staticmethod
+    def __address_cost(address: int) -> int:
+        return LangCostModel.estimate(GenericTranslator.generate_constant(address, "a"))
+
+    # iterators lists iterators of enclosing FOR loops; while the innermost loop is a FOR loop, its iterator and
+    # counter are kept in registers and are stored to the stack only around nested loops
+    def __count_commands(self, commands: list, weight: int, iterators: list, innermost):
+        for command in commands:
+            if type(command) == Assign:
+                self.__count_identifier(command.changed_identifier, weight, iterators, innermost)
+                self.__count_value(command.assigned_expression.val1, weight, iterators, innermost)
+                self.__count_value(command.assigned_expression.val2, weight, iterators, innermost)
+            elif type(command) == If:
+                self.__count_value(command.condition.val1, weight, iterators, innermost)
+                self.__count_value(command.condition.val2, weight, iterators, innermost)
+                self.__count_commands(command.commands, weight, iterators, innermost)
+            elif type(command) == IfElse:
+                self.__count_value(command.condition.val1, weight, iterators, innermost)
+                self.__count_value(command.condition.val2, weight, iterators, innermost)
+                self.__count_commands(command.positive_commands, weight, iterators, innermost)
+                self.__count_commands(command.negative_commands, weight, iterators, innermost)
+            elif type(command) in (While, RepeatUntil, ForTo, ForDownto):
+                if innermost is not None:
+                    self.__count_stack_cells(innermost, weight)
+                if type(command) == While or type(command) == RepeatUntil:
+                    inner_weight = weight * LangMemoryLayout.LOOP_WEIGHT
+                    self.__count_value(command.condition.val1, inner_weight, iterators, None)
+                    self.__count_value(command.condition.val2, inner_weight, iterators, None)
+                    self.__count_commands(command.commands, inner_weight, iterators, None)
+                else:
+                    self.__count_for(command, weight, iterators)
+            elif type(command) == Read:
+                self.__count_identifier(command.idd, weight, iterators, innermost)
+            elif type(command) == Write:
+                self.__count_value(command.value, weight, iterators, innermost)
+
+    def __count_for(self, command, weight: int, iterators: list):
+        self.__count_value(command.from_value, weight, iterators, None)
+        self.__count_value(command.to_value if type(command) == ForTo else command.downto_value, weight, iterators,
+                           None)
+        depth = len(iterators)
+        while len(self.__stack_weights) < LangMemoryLayout.STACK_CELLS_PER_LOOP * (depth + 1):
+            self.__stack_weights.append(0)
+        self.__count_commands(command.commands, weight * LangMemoryLayout.LOOP_WEIGHT, iterators + [command.idd],
+                              depth)
+
+    # cells of the innermost loop are stored before and loaded after a nested loop
+    def __count_stack_cells(self, depth: int, weight: int):
+        first_cell = LangMemoryLayout.STACK_CELLS_PER_LOOP * depth
+        for cell in range(first_cell, first_cell + LangMemoryLayout.STACK_CELLS_PER_LOOP):
+            self.__stack_weights[cell] += 2 * weight
+
+    def __count_value(self, val: Value, weight: int, iterators: list, innermost):
+        if val is not None and not val.is_int():
+            self.__count_identifier(val.core, weight, iterators, innermost)
+
+    def __count_identifier(self, idd: Identifier, weight: int, iterators: list, innermost):
+        self.__count_name(idd.name, weight, iterators, innermost)
+        if idd.offset is not None and type(idd.offset) != int:
+            self.__count_name(idd.offset, weight, iterators, innermost)
+
+    def __count_name(self, name: str, weight: int, iterators: list, innermost):
+        if name not in iterators:
+            self.__weights[name] = self.__weights.get(name, 0) + weight
+            return
+        depth = len(iterators) - 1 - iterators[::-1].index(name)
+        if depth != innermost:
+            self.__stack_weights[LangMemoryLayout.STACK_CELLS_PER_LOOP * depth] += weight
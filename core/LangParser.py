@@ -1,5 +1,7 @@
 from core.LangLexer import LangLexer
+from core.LangTables import LangTables
 from sly import Parser
+from sly.yacc import Grammar, LRTable, ParserMeta, _collect_grammar_rules
 from model.internal.LangProgram import LangProgram
 from model.nonterminals.Identifier import Identifier
 from model.nonterminals.Condition import Condition
@@ -16,6 +18,7 @@ from model.commands.Read import Read
 from model.commands.RepeatUntil import RepeatUntil
 from model.commands.While import While
 from model.commands.Write import Write
+from model.errors import UnexpectedTokenError
 
 
 class LangParser(Parser):
@@ -28,6 +31,33 @@ class LangParser(Parser):
         ('left', "*", "/", "%")
     )
 
+    # LR tables are read from the cache unless the grammar changed since they were built; a grammar met for the first
+    # time is built and checked by sly as usual, on a class which is thrown away afterwards
+    @classmethod
+    def _build(cls, definitions):
+        grammar = Grammar(cls.tokens)
+        for level, (assoc, *terms) in enumerate(cls.precedence, start=1):
+            for term in terms:
+                grammar.set_precedence(term, assoc, level)
+        for name, rule in definitions:
+            if callable(rule) and hasattr(rule, "rules"):
+                for func, file, line, production_name, symbols in _collect_grammar_rules(rule):
+                    grammar.add_production(production_name, symbols, func, file, line)
+        grammar.set_start(getattr(cls, "start", None))
+
+        productions = [(production.name, production.prod) for production in grammar.Productions]
+        digest = LangTables.digest(cls.tokens, cls.precedence, productions)
+        tables = LangTables.load(cls.__name__, digest)
+        if tables is None:
+            built = ParserMeta(cls.__name__, (Parser,), dict([(name, definition) for name, definition in definitions
+                                                              if name != "_build"], _=None))
+            tables = {table: getattr(built._lrtable, table) for table in ("lr_action", "lr_goto", "defaulted_states")}
+            LangTables.save(cls.__name__, digest, tables)
+
+        cls._grammar = grammar
+        cls._lrtable = LRTable.__new__(LRTable)
+        vars(cls._lrtable).update(tables)
+
     @_('DECLARE declarations BEGIN commands END')
     def program(self, t):
         return LangProgram(t[1], t[3])
@@ -37,8 +67,9 @@ class LangParser(Parser):
         return LangProgram([], t[1])
 
     def error(self, t):
-        print("syntax error: \"{}\", at line {}".format(t.value, t.lineno))
-        exit(1)
+        if t is None:
+            raise UnexpectedTokenError("syntax error: unexpected end of file")
+        raise UnexpectedTokenError(ref=t.value, lineno=t.lineno)
 
     @_('declarations "," ID')
     def declarations(self, t):
@@ -0,0 +1,69 @@
+from core.LangCostModel import LangCostModel
+from core.peephole.ConstantDerivation import ConstantDerivation
+from core.peephole.DeadRegisterWriteElimination import DeadRegisterWriteElimination
+from core.peephole.JumpThreading import JumpThreading
+from core.peephole.JumpToNextRemoval import JumpToNextRemoval
+from core.peephole.RedundantConstantElimination import RedundantConstantElimination
+from core.peephole.StoreLoadForwarding import StoreLoadForwarding
+from core.peephole.UnreachableCodeRemoval import UnreachableCodeRemoval
+from model.internal.Code import Code
+from model.internal.Instruction import Instruction
+
+
+class LangPeepholeOptimizer:
+
+    RULES = (
+        JumpThreading,
+        UnreachableCodeRemoval,
+        JumpToNextRemoval,
+        StoreLoadForwarding,
+        RedundantConstantElimination,
+        ConstantDerivation,
+        DeadRegisterWriteElimination
+    )
+
+    # rules are applied in turns until none of them changes the code or the number of passes runs out
+    MAX_PASSES = 4
+
+    def __init__(self, rules=None):
+        self.rules = [rule() for rule in LangPeepholeOptimizer.RULES] if rules is None else rules
+        self.savings = {rule.name: [0, 0] for rule in self.rules}
+
+    # savings of every rule are counted as instructions removed and cycles of a single pass through every instruction
+    def optimize(self, code: Code) -> Code:
+        items = list(code)
+        size = LangPeepholeOptimizer.__size(items)
+        for _ in range(LangPeepholeOptimizer.MAX_PASSES):
+            changed = False
+            for rule in self.rules:
+                optimized_items = rule.apply(items)
+                if len(optimized_items) == len(items) and all(a is b for a, b in zip(items, optimized_items)):
+                    continue
+                changed = True
+                optimized_size = LangPeepholeOptimizer.__size(optimized_items)
+                self.savings[rule.name][0] += size[0] - optimized_size[0]
+                self.savings[rule.name][1] += size[1] - optimized_size[1]
+                items = optimized_items
+                size = optimized_size
+            if not changed:
+                break
+
+        code = Code()
+        for item in items:
+            if type(item) == Instruction:
+                code.place(item)
+            else:
+                code.mark(item)
+        return code
+
+    # number of instructions and cycles they take
+    @staticmethod
+    def __size(items: list):
+        costs = {opcode: LangCostModel.instruction_cost(opcode) for opcode in LangCostModel.INSTRUCTION_COSTS}
+        instructions = 0
+        cycles = 0
+        for item in items:
+            if type(item) == Instruction:
+                instructions += 1
+                cycles += costs[item.opcode]
+        return instructions, cycles
@@ -0,0 +1,61 @@
+from core.LangCostModel import LangCostModel
+from core.LangVirtualMachine import LangVirtualMachine
+
+
+class LangProfiler:
+
+    # the source map has to be emitted together with the assembly, so that it has an entry for every instruction
+    def __init__(self, assembly: str, source_map):
+        self.machine = LangVirtualMachine(assembly)
+        self.source_map = source_map
+        if len(source_map) != len(self.machine):
+            raise ValueError("Source map has {} entries for {} instructions.".format(len(source_map),
+                                                                                      len(self.machine)))
+
+    # rows of source lines and of loops, hottest first; a line is charged for instructions of commands written on it,
+    # not of the commands nested in them, while a loop is charged for everything executed within it, its condition
+    # and nested loops included
+    def profile(self, inputs, seed=0) -> dict:
+        result = self.machine.run(inputs, seed=seed)
+        lines = dict()
+        loops = dict()
+        for k, ((line, construct), entry_loops) in enumerate(self.source_map.entries):
+            LangProfiler.__charge(lines.setdefault(line, LangProfiler.__row(line, construct)), construct,
+                                  self.machine.opcodes[k], self.machine.costs[k], result.hits[k])
+            for loop_line, loop_construct in entry_loops:
+                LangProfiler.__charge(loops.setdefault((loop_line, loop_construct),
+                                                       LangProfiler.__row(loop_line, loop_construct)),
+                                      loop_construct, self.machine.opcodes[k], self.machine.costs[k], result.hits[k])
+        return {
+            "outputs": result.outputs,
+            "t": result.t,
+            "io": result.io,
+            "lines": LangProfiler.__rank(lines.values(), result.t),
+            "loops": LangProfiler.__rank(loops.values(), result.t)
+        }
+
+    @staticmethod
+    def __row(line, construct) -> dict:
+        return {"line": line, "constructs": [construct], "cycles": 0, "io": 0, "instructions": 0, "executed": 0,
+                "loads": 0, "stores": 0}
+
+    @staticmethod
+    def __charge(row: dict, construct, opcode: int, cost: int, hits: int):
+        if construct not in row["constructs"]:
+            row["constructs"].append(construct)
+        row["cycles"] += hits * cost
+        row["instructions"] += 1
+        row["executed"] += hits
+        if opcode in (LangVirtualMachine.GET, LangVirtualMachine.PUT):
+            row["io"] += hits * LangCostModel.IO_COST
+        elif opcode == LangVirtualMachine.LOAD:
+            row["loads"] += hits
+        elif opcode == LangVirtualMachine.STORE:
+            row["stores"] += hits
+
+    @staticmethod
+    def __rank(rows, t: int) -> list:
+        rows = sorted(rows, key=lambda row: (-row["cycles"], -row["executed"], row["line"] is None, row["line"] or 0))
+        for row in rows:
+            row["share"] = row["cycles"] / t if t else 0
+        return rows
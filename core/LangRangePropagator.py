@@ -0,0 +1,153 @@
+from core.LangVariableTable import LangVariableTable
+from core.LangRanges import LangRanges
+from core.ConditionTranslator import ConditionTranslator
+from model.nonterminals.Value import Value
+from model.nonterminals.Identifier import Identifier
+from model.nonterminals.Condition import Condition
+from model.commands.Assign import Assign
+from model.commands.ForDownto import ForDownto
+from model.commands.ForTo import ForTo
+from model.commands.If import If
+from model.commands.IfElse import IfElse
+from model.commands.Read import Read
+from model.commands.RepeatUntil import RepeatUntil
+from model.commands.While import While
+
+
+class LangRangePropagator:
+
+    # passes through a loop after which bounds still moving are given up
+    WIDENING_DELAY = 3
+
+    # a state holds ranges of values of variables and array elements, keyed by pairs of name and index, which is None
+    # for variables; a range covers values left by every path reaching the state, and paths cut off by conditions are
+    # not taken into account; a value is known if its range holds only it; None is the state of code no path reaches
+    def __init__(self, variable_table: LangVariableTable):
+        self.__variable_table = variable_table
+        self.__iterators = list(variable_table.get_iterator_ranges().items())
+
+    # states at the start of every pass through the loop and after leaving it, starting from ranges known to the
+    # variable table; passes are repeated until the state at the start stops changing
+    def propagate_through_loop(self, loop):
+        head, exit_state = self.__loop(loop, self.__variable_table.get_known_ranges())
+        return head, exit_state if exit_state is not None else dict()
+
+    def __execute(self, commands: list, state):
+        for command in commands:
+            if state is None:
+                return None
+            elif type(command) == Assign:
+                self.__assign(command.changed_identifier, command.assigned_expression, state)
+            elif type(command) == If:
+                state = self.__branch(command.condition, command.commands, [], state)
+            elif type(command) == IfElse:
+                state = self.__branch(command.condition, command.positive_commands, command.negative_commands, state)
+            elif type(command) == Read:
+                self.__forget(command.idd, state)
+            elif type(command) in (While, RepeatUntil, ForTo, ForDownto):
+                state = self.__loop(command, state)[1]
+        return state
+
+    def __assign(self, changed_identifier: Identifier, assigned_expression, state: dict):
+        value_range = self.__get(assigned_expression.val1, state)
+        if not assigned_expression.is_value():
+            value_range = LangRanges.operate(value_range, self.__get(assigned_expression.val2, state),
+                                             assigned_expression.operation)
+        key = self.__forget(changed_identifier, state)
+        if key is not None and value_range != LangRanges.UNKNOWN:
+            state[key] = value_range
+
+    # returns the key of the identifier, if it is known
+    def __forget(self, idd: Identifier, state: dict):
+        key = self.__key(idd, state)
+        if key is not None:
+            state.pop(key, None)
+            return key
+        for known_key in [known_key for known_key in state if known_key[0] == idd.name]:
+            del state[known_key]
+
+    def __branch(self, condition: Condition, positive_commands: list, negative_commands: list, state: dict):
+        positive_state = self.__execute(positive_commands, self.__refine(condition, True, dict(state)))
+        negative_state = self.__execute(negative_commands, self.__refine(condition, False, state))
+        return LangRangePropagator.__join(positive_state, negative_state)
+
+    # iterators take values from the range between bounds of the loop
+    def __loop(self, loop, state: dict):
+        if type(loop) == While:
+            head = self.__fixpoint(state, lambda h: self.__execute(loop.commands,
+                                                                   self.__refine(loop.condition, True, dict(h))))
+            return head, self.__refine(loop.condition, False, dict(head))
+        elif type(loop) == RepeatUntil:
+            head = self.__fixpoint(state, lambda h: self.__refine(loop.condition, False,
+                                                                  self.__execute(loop.commands, dict(h))))
+            return head, self.__refine(loop.condition, True, self.__execute(loop.commands, dict(head)))
+        elif type(loop) == ForTo:
+            self.__iterators.append((loop.idd, self.__bounds(loop.from_value, loop.to_value, state)))
+        else:
+            self.__iterators.append((loop.idd, self.__bounds(loop.downto_value, loop.from_value, state)))
+        head = self.__fixpoint(state, lambda h: self.__execute(loop.commands, dict(h)))
+        self.__iterators.pop()
+        return head, head
+
+    # pass gives the state at the end of the loop body, where the loop is entered again
+    def __fixpoint(self, state: dict, run_pass) -> dict:
+        head = state
+        passes = 0
+        while True:
+            new_head = LangRangePropagator.__join(state, run_pass(head))
+            if passes >= LangRangePropagator.WIDENING_DELAY:
+                new_head = {key: LangRanges.widen(head[key], value_range) for key, value_range in new_head.items()
+                            if key in head}
+            if new_head == head:
+                return head
+            head = new_head
+            passes += 1
+
+    # iterator of a loop which is never entered is given its first value
+    def __bounds(self, first: Value, last: Value, state: dict) -> tuple:
+        low = self.__get(first, state)[0]
+        high = self.__get(last, state)[1]
+        return low, high if high is None or high >= low else low
+
+    @staticmethod
+    def __join(state1, state2):
+        if state1 is None:
+            return state2
+        elif state2 is None:
+            return state1
+        joined = {key: LangRanges.join(value_range, state2[key]) for key, value_range in state1.items()
+                  if key in state2}
+        return {key: value_range for key, value_range in joined.items() if value_range != LangRanges.UNKNOWN}
+
+    # state narrowed to values for which the condition is met or not; None if there are none
+    def __refine(self, condition: Condition, met: bool, state):
+        if state is None:
+            return None
+        comparison = condition.comparison if met else ConditionTranslator.NEGATIONS[condition.comparison]
+        refined = LangRanges.refine(self.__get(condition.val1, state), self.__get(condition.val2, state), comparison)
+        if refined is None:
+            return None
+        for val, value_range in zip((condition.val1, condition.val2), refined):
+            key = None if val.is_int() else self.__key(val.core, state)
+            if key is not None and value_range != LangRanges.UNKNOWN:
+                state[key] = value_range
+        return state
+
+    def __get(self, val: Value, state: dict) -> tuple:
+        if val.is_int():
+            return LangRanges.point(val.core)
+        elif val.core.offset is None:
+            for name, value_range in reversed(self.__iterators):
+                if name == val.core.name:
+                    return value_range
+        key = self.__key(val.core, state)
+        return state.get(key, LangRanges.UNKNOWN) if key is not None else LangRanges.UNKNOWN
+
+    # None for elements at indices unknown at compile time and for iterators
+    def __key(self, idd: Identifier, state: dict):
+        if idd.offset is None:
+            return (idd.name, None) if all(name != idd.name for name, _ in self.__iterators) else None
+        elif type(idd.offset) == int:
+            return idd.name, idd.offset
+        offset_range = self.__get(Value(Identifier(idd.offset)), state)
+        return (idd.name, offset_range[0]) if offset_range[0] == offset_range[1] else None
@@ -0,0 +1,101 @@
+class LangRanges:
+
+    # a range is a pair of the least and the greatest value possible; the greatest one is None if it is unbounded
+    UNKNOWN = (0, None)
+
+    @staticmethod
+    def point(value: int) -> tuple:
+        return value, value
+
+    @staticmethod
+    def join(range1: tuple, range2: tuple) -> tuple:
+        high = None if range1[1] is None or range2[1] is None else max(range1[1], range2[1])
+        return min(range1[0], range2[0]), high
+
+    # bounds still moving after a join are given up, so that loops are analysed in a bounded number of passes
+    @staticmethod
+    def widen(old: tuple, new: tuple) -> tuple:
+        low = old[0] if new[0] >= old[0] else 0
+        high = old[1] if old[1] is not None and new[1] is not None and new[1] <= old[1] else None
+        return low, high
+
+    # None if no value fits both ranges
+    @staticmethod
+    def intersect(range1: tuple, range2: tuple):
+        low = max(range1[0], range2[0])
+        high = range1[1] if range2[1] is None else range2[1] if range1[1] is None else min(range1[1], range2[1])
+        return (low, high) if high is None or low <= high else None
+
+    @staticmethod
+    def operate(range1: tuple, range2: tuple, operation: str) -> tuple:
+        (low1, high1), (low2, high2) = range1, range2
+        if operation == "+":
+            return low1 + low2, None if high1 is None or high2 is None else high1 + high2
+        elif operation == "-":
+            return 0 if high2 is None else max(low1 - high2, 0), None if high1 is None else max(high1 - low2, 0)
+        elif operation == "*":
+            if high1 == 0 or high2 == 0:
+                return 0, 0
+            return low1 * low2, None if high1 is None or high2 is None else high1 * high2
+        elif operation == "/":
+            low = 0 if low2 == 0 or high2 is None else low1 // high2
+            return low, None if high1 is None else high1 // max(low2, 1)
+        # remainder is the dividend itself if it is smaller than any divisor, and zero for a zero divisor
+        elif high1 is not None and high1 < low2:
+            return range1
+        bounds = [bound for bound in (high1, None if high2 is None else max(high2 - 1, 0)) if bound is not None]
+        return 0, min(bounds) if bounds else None
+
+    # None if comparison of values from the ranges is not decided
+    @staticmethod
+    def compare(range1: tuple, range2: tuple, comparison: str):
+        (low1, high1), (low2, high2) = range1, range2
+        if comparison in (">", ">="):
+            return LangRanges.compare(range2, range1, "<" if comparison == ">" else "<=")
+        elif comparison == "<":
+            if high1 is not None and high1 < low2:
+                return True
+            elif high2 is not None and low1 >= high2:
+                return False
+        elif comparison == "<=":
+            if high1 is not None and high1 <= low2:
+                return True
+            elif high2 is not None and low1 > high2:
+                return False
+        elif low1 == high1 == low2 == high2:
+            return comparison == "="
+        elif LangRanges.intersect(range1, range2) is None:
+            return comparison == "!="
+        return None
+
+    # ranges narrowed to values for which the comparison is met; None if there are none
+    @staticmethod
+    def refine(range1: tuple, range2: tuple, comparison: str):
+        (low1, high1), (low2, high2) = range1, range2
+        if comparison in (">", ">="):
+            refined = LangRanges.refine(range2, range1, "<" if comparison == ">" else "<=")
+            return None if refined is None else (refined[1], refined[0])
+        elif comparison in ("<", "<="):
+            gap = 1 if comparison == "<" else 0
+            if high2 is not None and high2 < gap:
+                return None
+            refined1 = LangRanges.intersect(range1, (0, None if high2 is None else high2 - gap))
+            refined2 = LangRanges.intersect(range2, (low1 + gap, None))
+            return None if refined1 is None or refined2 is None else (refined1, refined2)
+        elif comparison == "=":
+            common = LangRanges.intersect(range1, range2)
+            return None if common is None else (common, common)
+        elif low1 == high1 == low2 == high2:
+            return None
+        return LangRanges.__exclude(range1, range2), LangRanges.__exclude(range2, range1)
+
+    # bound equal to the only value of the other range is moved past it
+    @staticmethod
+    def __exclude(range1: tuple, range2: tuple) -> tuple:
+        low, high = range1
+        if range2[0] == range2[1]:
+            if low == range2[0]:
+                low += 1
+            elif high == range2[0]:
+                high -= 1
+        return low, high
@@ -9,22 +9,70 @@ class LangRegisterMachine:
         "f"
     ]
 
+    REGISTER_COUNT = len(__registers)
+
+    # registers bound to variables are not handed out as free ones. Loops bind at most two of them. Commands needing
+    # more free registers than left spill the bound ones to memory. Code is generated right into these registers, so
+    # there are no virtual registers to compute liveness of. A variable is thus bound for the whole loop referring to
+    # it. The variables to bind are chosen by the savings the cost model estimates for every loop. A third binding
+    # gains as much in some loops as it loses in others to the spills it causes.
+    MAX_BINDINGS = 2
+
     def __init__(self):
         self.__marker = 0
+        self.__bindings = dict()
+
+    def __free_registers(self):
+        return [r for r in LangRegisterMachine.__registers if r not in self.__bindings.values()]
 
     def fetch_register(self):
-        register = LangRegisterMachine.__registers[self.__marker]
-        self.__marker = (self.__marker + 1) % 6
+        free_registers = self.__free_registers()
+        register = free_registers[self.__marker % len(free_registers)]
+        self.__marker = (self.__marker + 1) % len(free_registers)
 
         return register
 
     def borrow_register(self):
-        return LangRegisterMachine.__registers[self.__marker]
+        free_registers = self.__free_registers()
+        return free_registers[self.__marker % len(free_registers)]
 
     def borrow_registers(self, number: int):
+        free_registers = self.__free_registers()
         ret = []
         i = self.__marker
         for _ in range(number):
-            ret.append(LangRegisterMachine.__registers[i])
-            i = (i + 1) % 6
+            ret.append(free_registers[i % len(free_registers)])
+            i = (i + 1) % len(free_registers)
         return ret
+
+    def get_state(self):
+        return self.__marker
+
+    def set_state(self, state):
+        self.__marker = state
+
+    def free_register_count(self) -> int:
+        return len(self.__free_registers())
+
+    def can_bind(self) -> bool:
+        return len(self.__bindings) < LangRegisterMachine.MAX_BINDINGS
+
+    def bind(self, name: str) -> str:
+        register = self.__free_registers()[-1]
+        self.__bindings[name] = register
+        self.__marker = 0
+        return register
+
+    def unbind(self, name: str):
+        del self.__bindings[name]
+        self.__marker = 0
+
+    def get_binding(self, name: str):
+        return self.__bindings.get(name)
+
+    def get_bindings(self) -> dict:
+        return dict(self.__bindings)
+
+    def set_bindings(self, bindings: dict):
+        self.__bindings = dict(bindings)
+        self.__marker = 0
@@ -0,0 +1,40 @@
+import json
+
+
+class LangSourceMap:
+
+    VERSION = 1
+
+    # every instruction, in the order of the assembly, is mapped to the line and the construct of the innermost command
+    # it was generated for, and to the loops containing that command, outermost first; a loop is a pair of its line and
+    # construct; instructions generated for the program as a whole, like the final HALT, have no line nor construct
+    def __init__(self, entries: list):
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def from_instructions(instructions: list):
+        return LangSourceMap([(LangSourceMap.__locate(instruction.origin),
+                               tuple(LangSourceMap.__locate(loop) for loop in instruction.loops))
+                              for instruction in instructions])
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"version": LangSourceMap.VERSION,
+                       "instructions": [{"line": line, "construct": construct, "loops": [list(loop) for loop in loops]}
+                                        for (line, construct), loops in self.entries]}, f)
+
+    @staticmethod
+    def load(path: str):
+        with open(path, "r") as f:
+            content = json.load(f)
+        if content.get("version") != LangSourceMap.VERSION:
+            raise ValueError("Source map {} has unsupported version {}.".format(path, content.get("version")))
+        return LangSourceMap([((entry["line"], entry["construct"]), tuple(tuple(loop) for loop in entry["loops"]))
+                              for entry in content["instructions"]])
+
+    @staticmethod
+    def __locate(command) -> tuple:
+        return (None, None) if command is None else (command.lineno, type(command).__name__)
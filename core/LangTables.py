@@ -0,0 +1,51 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import sly
+
+
+class LangTables:
+
+    # bumped whenever the layout of cached tables changes
+    FORMAT_VERSION = 1
+
+    CACHE_DIR_VARIABLE = "KOMPILATOR_CACHE_DIR"
+
+    DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__")
+
+    # tables are versioned by a digest of everything they were built from, together with the version of sly building
+    # them and the layout of the cache
+    @staticmethod
+    def digest(*sources) -> str:
+        sources = (LangTables.FORMAT_VERSION, sly.__version__) + sources
+        return hashlib.sha256(repr(sources).encode()).hexdigest()
+
+    # None if the tables were not cached, or were built from something else
+    @staticmethod
+    def load(name: str, digest: str):
+        try:
+            with open(LangTables.__path(name), "rb") as f:
+                cached_digest, tables = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        return tables if cached_digest == digest else None
+
+    # the cache is replaced at once, so that compilers started meanwhile never read it half written; a cache which
+    # cannot be written is not an error, as tables are then built again by the next compiler
+    @staticmethod
+    def save(name: str, digest: str, tables):
+        path = LangTables.__path(name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=name, suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as f:
+                pickle.dump((digest, tables), f)
+            os.replace(temporary_path, path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def __path(name: str) -> str:
+        directory = os.environ.get(LangTables.CACHE_DIR_VARIABLE) or LangTables.DEFAULT_CACHE_DIR
+        return os.path.join(directory, "{}.tables".format(name))
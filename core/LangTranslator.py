@@ -3,7 +3,18 @@ from core.LangRegisterMachine import LangRegisterMachine
 from core.OperationTranslator import OperationTranslator
 from core.ConditionTranslator import ConditionTranslator
 from core.GenericTranslator import GenericTranslator
+from core.LangAssembler import LangAssembler
+from core.LangCostModel import LangCostModel
+from core.LangMemoryLayout import LangMemoryLayout
+from core.LangEvaluator import LangEvaluator
+from core.LangRangePropagator import LangRangePropagator
+from core.LangRanges import LangRanges
+from core.LangPeepholeOptimizer import LangPeepholeOptimizer
+from core.LangSourceMap import LangSourceMap
 from model.internal.LangProgram import LangProgram
+from model.internal.Code import Code
+from model.internal.Instruction import Instruction
+from model.internal.Label import Label
 from model.nonterminals.Expression import Expression
 from model.nonterminals.Value import Value
 from model.nonterminals.Identifier import Identifier
@@ -17,6 +28,7 @@ from model.commands.IfElse import IfElse
 from model.commands.Read import Read
 from model.commands.RepeatUntil import RepeatUntil
 from model.commands.While import While
+from model.commands.Write import Write
 from model.errors import *
 
 
@@ -24,6 +36,25 @@ class LangTranslator:
 
     LOOP_EXPANSION_THRESHOLD = 32
 
+    # loops which are not expanded are unrolled by a power of two up to this factor, as long as the copies of the body
+    # added take at most the budget of instructions
+    MAX_UNROLLING_FACTOR = 4
+    UNROLLING_BUDGET = 128
+
+    # loops are executed by the compiler for at most this many steps, see LangEvaluator
+    EVALUATION_STEP_BUDGET = LangEvaluator.STEP_BUDGET
+
+    # settings which may be overridden for a single translator, with the least value allowed for each of them
+    OPTIONS = {
+        "LOOP_EXPANSION_THRESHOLD": 0,
+        "MAX_UNROLLING_FACTOR": 1,
+        "UNROLLING_BUDGET": 0,
+        "EVALUATION_STEP_BUDGET": 0
+    }
+
+    # commands other than division and modulo of unknown values need at most this many free registers
+    MIN_FREE_REGISTERS = 3
+
     def __init__(self, variable_table: LangVariableTable, register_machine: LangRegisterMachine,
                  operation_translator: OperationTranslator, condition_translator: ConditionTranslator,
                  generic_translator: GenericTranslator):
@@ -32,6 +63,15 @@ class LangTranslator:
         self.operation_translator = operation_translator
         self.condition_translator = condition_translator
         self.generic_translator = generic_translator
+        self.peephole_savings = dict()
+        self.__unevaluated_loops = set()
+        self.record_source_map = False
+        self.source_map = None
+
+    def set_option(self, name: str, value: int):
+        if name not in LangTranslator.OPTIONS or type(value) != int or value < LangTranslator.OPTIONS[name]:
+            raise InvalidOptionError(ref="{}={}".format(name, value))
+        setattr(self, name, value)
 
     def __set_variable_table(self, variable_table: LangVariableTable):
         self.variable_table = variable_table
@@ -45,32 +85,178 @@ class LangTranslator:
         self.condition_translator.register_machine = register_machine
         self.generic_translator.register_machine = register_machine
 
-    def translate_program(self, program: LangProgram):
+    def translate_program(self, program: LangProgram) -> str:
+        addresses, stack_addresses = LangMemoryLayout(program).arrange()
         for declaration in program.get_variable_and_unary_array_declarations():
-            self.__declare(declaration)
+            self.__declare(declaration, addresses[declaration])
         for declaration in program.get_non_unary_array_declarations():
-            self.__declare(declaration)
+            self.__declare(declaration, addresses[declaration])
+        for address in stack_addresses:
+            self.variable_table.add_stack_address(address)
         code = self.__generate_code(program.commands)
-        code += "\nHALT"
-        return code
+        code.add("HALT")
+        optimizer = LangPeepholeOptimizer()
+        code = LangAssembler.unfold_self_jumps(optimizer.optimize(code))
+        self.peephole_savings = optimizer.savings
+        if self.record_source_map:
+            self.source_map = LangSourceMap.from_instructions([item for item in code if type(item) == Instruction])
+        return LangAssembler.assemble(code)
 
-    def __declare(self, declaration):
+    def __declare(self, declaration, address=None):
         try:
             if type(declaration) == DeclareVariable:
-                self.__declare_variable(declaration.name)
+                self.__declare_variable(declaration.name, address)
             else:
-                self.__declare_array(declaration.name, declaration.first, declaration.last)
+                self.__declare_array(declaration.name, declaration.first, declaration.last, address)
         except CodeException as e:
             raise type(e)(e.args[0].format(declaration.lineno))
 
-    def __generate_code(self, commands: list) -> str:
-        command_codes = []
-        for command in commands:
-            command_codes.append(self.__unwrap_command(command))
-        code = "\n".join(command_codes)
+    # division directly followed by modulo of the same operands, or the other way round, is translated along with it
+    def __generate_code(self, commands: list) -> Code:
+        code = Code()
+        spilled = dict()
+        index = 0
+        while index < len(commands):
+            command = commands[index]
+            paired = index + 1 < len(commands) and self.__is_division_with_modulo(command, commands[index + 1])
+            group = commands[index:index + 2] if paired else [command]
+            index += len(group)
+            references = [name for grouped in group for name in self.__referenced_names(grouped)]
+            if spilled:
+                code += self.__reload_bindings(spilled, [name for name in spilled if name in references])
+            if paired:
+                registers_needed = self.operation_translator.division_with_modulo_registers_needed(
+                    self.generic_translator.reflect_on_value(command.assigned_expression.val1),
+                    self.generic_translator.reflect_on_value(command.assigned_expression.val2))
+            else:
+                registers_needed = self.__registers_needed(command)
+            command_code = Code()
+            if registers_needed > self.register_machine.free_register_count():
+                command_code += self.__spill_bindings(references, registers_needed, spilled)
+            if paired:
+                command_code += self.__divide_with_modulo(*group)
+            elif type(command) in (While, RepeatUntil, ForTo, ForDownto):
+                command_code += self.__evaluate_loop(command)
+            else:
+                command_code += self.__unwrap_command(command)
+            if self.record_source_map:
+                LangTranslator.__attribute(command_code, command)
+            code += command_code
+        code += self.__reload_bindings(spilled, list(spilled))
+        return code
+
+    # instructions are attributed to the innermost command they were generated for, which is the first one to claim
+    # them, as code of nested commands is generated first; copies of code share instructions, so every instruction is
+    # attributed once; commands made up by the translator, like assignments of hoisted expressions, have no line and
+    # leave their instructions to the command they were made up for
+    @staticmethod
+    def __attribute(code: Code, command):
+        if command.lineno is None:
+            return
+        is_loop = type(command) in (While, RepeatUntil, ForTo, ForDownto)
+        attributed = set()
+        for item in code:
+            if type(item) != Instruction or id(item) in attributed:
+                continue
+            attributed.add(id(item))
+            if item.origin is None:
+                item.origin = command
+            if is_loop:
+                item.loops = (command,) + item.loops
+
+    # loops bind registers of their own, so variables bound by enclosing loops are kept in memory for the time of them
+    def __registers_needed(self, command) -> int:
+        if type(command) in (While, RepeatUntil, ForTo, ForDownto):
+            return LangRegisterMachine.REGISTER_COUNT
+        elif type(command) == Assign and not command.assigned_expression.is_value():
+            val1 = self.generic_translator.reflect_on_value(command.assigned_expression.val1)
+            val2 = self.generic_translator.reflect_on_value(command.assigned_expression.val2)
+            return self.operation_translator.registers_needed(val1, val2, command.assigned_expression.operation)
+        return 0
+
+    # spilled variables stay in memory until a command refers to them or the end of the block, variables the command
+    # does not refer to are spilled first
+    def __spill_bindings(self, references: list, registers_needed: int, spilled: dict) -> Code:
+        bindings = self.register_machine.get_bindings()
+        reg = self.register_machine.fetch_register()
+        spilled_now = dict()
+        for name in sorted(reversed(list(bindings)), key=lambda n: n in references):
+            if registers_needed <= self.register_machine.free_register_count():
+                break
+            spilled_now[name] = bindings[name]
+            self.register_machine.unbind(name)
+        spilled.update(spilled_now)
+        return self.generic_translator.store_bindings(spilled_now, reg)
+
+    # pointers are referenced along with the array elements they point to
+    def __referenced_names(self, command) -> list:
+        references = self.__count_references([command], dict())[1]
+        pointers = self.generic_translator.get_pointers()
+        return list(references) + [pointers[element] for element in references if element in pointers]
+
+    def __reload_bindings(self, spilled: dict, names: list) -> Code:
+        if not names:
+            return Code()
+        reloaded = {name: spilled.pop(name) for name in names}
+        bindings = self.register_machine.get_bindings()
+        bindings.update(reloaded)
+        self.register_machine.set_bindings(bindings)
+        reg = self.register_machine.fetch_register()
+        return self.generic_translator.load_bindings(reloaded, reg)
+
+    # loops depending only on values known at compile time are executed by the compiler, leaving only their outputs
+    # and stores of the values they change, unless translating them is cheaper; they are translated anyway, to report
+    # errors and initialize variables; loops running out of steps once are not executed again when they are
+    # translated more than once, like bodies of expanded loops
+    def __evaluate_loop(self, command) -> Code:
+        if command in self.__unevaluated_loops:
+            return self.__unwrap_command(command)
+        evaluator = LangEvaluator(self.variable_table, self.EVALUATION_STEP_BUDGET)
+        result = evaluator.evaluate([command])
+        if result is None:
+            if evaluator.out_of_steps:
+                self.__unevaluated_loops.add(command)
+            return self.__unwrap_command(command)
+        outputs, values = result
+        changed_values = {key: value for key, value in values.items() if self.variable_table.get_value(*key) != value}
+
+        # both candidates start from what is known before the loop, and only the chosen one changes it; variables are
+        # initialized as by the translated loop, and values the loop leaves are known whichever code is chosen
+        original_var_table = self.variable_table
+        translated_var_table = original_var_table.clone()
+        evaluated_var_table = original_var_table.clone()
+        candidates = []
+        code = self.generic_translator.choose_cheapest([
+            lambda: self.__translate_candidate(translated_var_table, candidates,
+                                               lambda: self.__unwrap_command(command)),
+            lambda: self.__translate_candidate(evaluated_var_table, candidates,
+                                               lambda: self.__evaluated_loop(outputs, values, changed_values))
+        ])
+        self.__set_variable_table(original_var_table)
+        chosen_var_table = next(var_table for candidate, var_table in candidates if candidate is code)
+        self.variable_table.take_values_from(chosen_var_table, translated_var_table)
+        for (name, offset), value in values.items():
+            self.variable_table.set_value(value, name, offset)
+        return code
+
+    def __translate_candidate(self, var_table: LangVariableTable, candidates: list, translate) -> Code:
+        self.__set_variable_table(var_table)
+        code = translate()
+        candidates.append((code, var_table))
         return code
 
-    def __unwrap_command(self, command) -> str:
+    def __evaluated_loop(self, outputs: list, values: dict, changed_values: dict) -> Code:
+        code = Code()
+        for output in outputs:
+            code += self.__write(Value(output))
+        for (name, offset), value in values.items():
+            if (name, offset) in changed_values:
+                code += self.__assign_value(Identifier(name, offset), Value(value))
+            else:
+                self.variable_table.set_value(value, name, offset)
+        return code
+
+    def __unwrap_command(self, command) -> Code:
         try:
             if type(command) == Assign:
                 return self.__assign(command.changed_identifier, command.assigned_expression)
@@ -93,294 +279,776 @@ class LangTranslator:
         except CodeException as e:
             raise type(e)(e.args[0].format(command.lineno))
 
-    def __declare_variable(self, name):
-        self.variable_table.add_variable(name)
+    def __declare_variable(self, name, address=None):
+        self.variable_table.add_variable(name, address)
 
-    def __declare_array(self, name, first, last):
-        self.variable_table.add_array(name, first, last)
+    def __declare_array(self, name, first, last, address=None):
+        self.variable_table.add_array(name, first, last, address)
 
-    def __assign(self, changed_identifier: Identifier, assigned_expression: Expression) -> str:
+    def __assign(self, changed_identifier: Identifier, assigned_expression: Expression) -> Code:
+        value_range = self.__get_expression_range(assigned_expression)
         if assigned_expression.is_value():
-            return self.__assign_value(changed_identifier, assigned_expression.val1)
+            code = self.__assign_value(changed_identifier, assigned_expression.val1)
         else:
-            return self.__assign_expression(changed_identifier, assigned_expression)
+            code = self.__assign_expression(changed_identifier, assigned_expression)
+        self.__narrow_range(changed_identifier, value_range)
+        return code
 
-    def __assign_value(self, changed_identifier: Identifier, assigned_value: Value) -> str:
-        value_reg = self.register_machine.fetch_register()
-        address_reg = self.register_machine.fetch_register()
+    def __get_expression_range(self, expression: Expression) -> tuple:
+        value_range = self.generic_translator.get_range(expression.val1)
+        if expression.is_value():
+            return value_range
+        return LangRanges.operate(value_range, self.generic_translator.get_range(expression.val2),
+                                  expression.operation)
+
+    # ranges are kept for variables only
+    def __narrow_range(self, changed_identifier: Identifier, value_range: tuple):
+        if changed_identifier.offset is not None:
+            return
+        narrowed = LangRanges.intersect(self.variable_table.get_range(changed_identifier.name), value_range)
+        if narrowed is not None:
+            self.variable_table.set_range(narrowed, changed_identifier.name)
 
+    def __assign_value(self, changed_identifier: Identifier, assigned_value: Value) -> Code:
         val = self.generic_translator.reflect_on_value(assigned_value)
+        bound_reg = self.generic_translator.get_bound_register(changed_identifier)
+        if bound_reg is not None:
+            self.variable_table.get_address(changed_identifier.name, initialize=True)
+            if assigned_value.is_int() or assigned_value.core.offset is None:
+                code = self.generic_translator.put_value_to_register(assigned_value, register=bound_reg)
+            else:
+                # address of an array element may depend on the variable being assigned
+                value_reg = self.register_machine.fetch_register()
+                code = self.generic_translator.put_value_to_register(assigned_value, register=value_reg)
+                code += self.generic_translator.copy_register(source_reg=value_reg, dest_reg=bound_reg)
+            self.variable_table.set_value(val.core if val.is_int() else None, changed_identifier.name)
+            return code
+
+        value_reg = self.register_machine.fetch_register()
+
+        # value is known to the variable only after it is read, as the address read from may depend on the variable
         if val.is_int():
+            code = self.generic_translator.put_value_to_register(assigned_value, register=value_reg,
+                                                                 helper=self.register_machine.borrow_register())
             self.variable_table.set_value(val.core, changed_identifier.name, changed_identifier.offset)
-            code = self.generic_translator.put_value_to_register(assigned_value, register=value_reg)
         else:
-            self.variable_table.set_value(None, changed_identifier.name, changed_identifier.offset)
             code = self.generic_translator.put_value_to_register(assigned_value, register=value_reg)
-        code += "\n" + self.generic_translator.put_address_to_register(changed_identifier, register=address_reg,
-                                                                       initialize=True)
-        code += "\nSTORE {} {}".format(value_reg, address_reg)
+            self.variable_table.set_value(None, changed_identifier.name, changed_identifier.offset)
+        code += self.__store(value_reg, changed_identifier)
         return code
 
-    def __assign_expression(self, changed_identifier: Identifier, assigned_expression: Expression) -> str:
-        address_reg = self.register_machine.fetch_register()
+    # value of an expression still held by a variable is copied from it instead of computing it again, if that is
+    # cheaper; variables assigned expressions not referring to them become their holders
+    def __assign_expression(self, changed_identifier: Identifier, assigned_expression: Expression) -> Code:
+        holder = self.variable_table.get_expression_holder(assigned_expression)
+        if holder is None:
+            code = self.__compute_expression(changed_identifier, assigned_expression)
+        elif changed_identifier == Identifier(holder):
+            return Code()
+        else:
+            code = self.generic_translator.choose_cheapest([
+                lambda: self.__compute_expression(changed_identifier, assigned_expression),
+                lambda: self.__assign_value(changed_identifier, Value(Identifier(holder)))
+            ])
+        self.__hold_expression(changed_identifier, assigned_expression)
+        return code
 
-        code = self.generic_translator.put_address_to_register(changed_identifier, register=address_reg,
-                                                               initialize=True)
+    # an expression is not held if the assignment, or the one overwriting variables after it, changes its operands
+    def __hold_expression(self, changed_identifier: Identifier, assigned_expression: Expression,
+                          overwritten_identifier: Identifier = None):
+        if changed_identifier.offset is not None:
+            return
+        changed_names = [identifier.name for identifier in (changed_identifier, overwritten_identifier)
+                         if identifier is not None]
+        for val in (assigned_expression.val1, assigned_expression.val2):
+            if not val.is_int() and any(name in (val.core.name, val.core.offset) for name in changed_names):
+                return
+        self.variable_table.set_expression_holder(assigned_expression, changed_identifier.name)
+
+    def __compute_expression(self, changed_identifier: Identifier, assigned_expression: Expression) -> Code:
         val1 = self.generic_translator.reflect_on_value(assigned_expression.val1)
         val2 = self.generic_translator.reflect_on_value(assigned_expression.val2)
+        bound_reg = self.generic_translator.get_bound_register(changed_identifier)
+        if bound_reg is not None:
+            self.variable_table.get_address(changed_identifier.name, initialize=True)
+            code = self.operation_translator.perform_operation_in_place(val1, val2, assigned_expression.operation,
+                                                                        changed_identifier, register=bound_reg)
+            if code is not None:
+                return code
+            feedback = self.operation_translator.perform_operation(val1, val2,
+                                                                   operation=assigned_expression.operation,
+                                                                   changed_identifier=changed_identifier)
+            code = feedback.code
+            code += self.generic_translator.copy_register(source_reg=feedback.register, dest_reg=bound_reg)
+            return code
+
+        # address is generated after the operation, so that it does not occupy a register during it
+        if changed_identifier.offset is None:
+            self.variable_table.get_address(changed_identifier.name, initialize=True)
         feedback = self.operation_translator.perform_operation(val1, val2, operation=assigned_expression.operation,
                                                                changed_identifier=changed_identifier)
-        code += "\n" + feedback.code
-        code += "\nSTORE {} {}".format(feedback.register, address_reg)
+        code = feedback.code
+        code += self.__store(feedback.register, changed_identifier)
+        return code
+
+    # kept register holds a value to be stored next
+    def __store(self, value_reg: str, changed_identifier: Identifier, kept_reg=None) -> Code:
+        pointer_reg = self.generic_translator.get_address_register(changed_identifier, initialize=True)
+        if pointer_reg is not None:
+            return Code().add("STORE", value_reg, pointer_reg)
+        # distance of an array from its first index may be generated in a borrowed register, which is not the one
+        # holding the value
+        address_reg = self.register_machine.fetch_register()
+        while address_reg in (value_reg, kept_reg) or self.register_machine.borrow_register() in (value_reg, kept_reg):
+            address_reg = self.register_machine.fetch_register()
+        code = self.generic_translator.put_address_to_register(changed_identifier, register=address_reg,
+                                                               initialize=True)
+        code.add("STORE", value_reg, address_reg)
         return code
 
-    def __if_then_else(self, condition: Condition, positive_commands: list, negative_commands: list) -> str:
+    # the first assignment may not change the operands of the second one, and both have to assign different
+    # variables, as they are stored after both values are computed
+    def __is_division_with_modulo(self, first, second) -> bool:
+        if type(first) != Assign or type(second) != Assign or first.assigned_expression.is_value() or \
+                second.assigned_expression.is_value() or \
+                first.changed_identifier.name == second.changed_identifier.name:
+            return False
+        first_expression, second_expression = first.assigned_expression, second.assigned_expression
+        if {first_expression.operation, second_expression.operation} != {"/", "%"}:
+            return False
+        operand_names = []
+        for first_val, second_val in ((first_expression.val1, second_expression.val1),
+                                      (first_expression.val2, second_expression.val2)):
+            if first_val.is_int() != second_val.is_int() or first_val != second_val:
+                return False
+            if not first_val.is_int():
+                operand_names += [first_val.core.name, first_val.core.offset]
+        if first.changed_identifier.name in operand_names:
+            return False
+        return self.operation_translator.can_divide_with_modulo(
+            self.generic_translator.reflect_on_value(first_expression.val1),
+            self.generic_translator.reflect_on_value(first_expression.val2))
+
+    def __divide_with_modulo(self, first: Assign, second: Assign) -> Code:
+        value_ranges = {command: self.__get_expression_range(command.assigned_expression)
+                        for command in (first, second)}
+        val1 = self.generic_translator.reflect_on_value(first.assigned_expression.val1)
+        val2 = self.generic_translator.reflect_on_value(first.assigned_expression.val2)
+        quotient, remainder = (first, second) if first.assigned_expression.operation == "/" else (second, first)
+        try:
+            if first.changed_identifier.offset is None:
+                self.variable_table.get_address(first.changed_identifier.name, initialize=True)
+            feedback = self.operation_translator.perform_division_with_modulo(val1, val2, quotient.changed_identifier,
+                                                                              remainder.changed_identifier)
+        except CodeException as e:
+            raise type(e)(e.args[0].format(first.lineno))
+        registers = {quotient: feedback.register, remainder: feedback.remainder_register}
+        code = feedback.code
+        for command, kept_reg in ((first, registers[second]), (second, None)):
+            try:
+                bound_reg = self.generic_translator.get_bound_register(command.changed_identifier)
+                if bound_reg is not None:
+                    self.variable_table.get_address(command.changed_identifier.name, initialize=True)
+                    code += self.generic_translator.copy_register(source_reg=registers[command], dest_reg=bound_reg)
+                else:
+                    code += self.__store(registers[command], command.changed_identifier, kept_reg)
+            except CodeException as e:
+                raise type(e)(e.args[0].format(command.lineno))
+            # nothing is known about either variable once both values are computed, so their ranges are set as they
+            # are stored rather than narrowed
+            if command.changed_identifier.offset is None:
+                self.variable_table.set_range(value_ranges[command], command.changed_identifier.name)
+        for command in (first, second):
+            self.__hold_expression(command.changed_identifier, command.assigned_expression, second.changed_identifier)
+        return code
+
+    def __if_then_else(self, condition: Condition, positive_commands: list, negative_commands: list) -> Code:
+        # condition is translated first, as the branches change what is known about variables
+        val1 = self.generic_translator.reflect_on_value(condition.val1)
+        val2 = self.generic_translator.reflect_on_value(condition.val2)
+        negative_branch = Label("else")
+        end = Label("endif")
+        code = self.condition_translator.perform_comparison(val1, val2, condition.comparison, negative_branch)
+
+        met = self.condition_translator.decide(val1, val2, condition.comparison)
         original_var_table = self.variable_table
         branch1_var_table = self.variable_table.clone()
         branch2_var_table = self.variable_table.clone()
         self.__set_variable_table(branch1_var_table)
+        self.__refine(condition, True)
         positive_commands_code = self.__generate_code(positive_commands)
         self.__set_variable_table(branch2_var_table)
+        self.__refine(condition, False)
         negative_commands_code = self.__generate_code(negative_commands)
         self.__set_variable_table(original_var_table)
+
+        # branch not taken is translated only to report errors in it
+        if met is not None:
+            self.variable_table.take_values_from(branch1_var_table if met else branch2_var_table, branch1_var_table)
+            return positive_commands_code if met else negative_commands_code
         self.variable_table.merge_from_two(branch1_var_table, branch2_var_table)
 
+        code += positive_commands_code
+        code.add("JUMP", end)
+        code.mark(negative_branch)
+        code += negative_commands_code
+        code.mark(end)
+        return code
+
+    def __if_then(self, condition: Condition, commands: list) -> Code:
         val1 = self.generic_translator.reflect_on_value(condition.val1)
         val2 = self.generic_translator.reflect_on_value(condition.val2)
+        end = Label("endif")
+        code = self.condition_translator.perform_comparison(val1, val2, condition.comparison, end)
 
-        code = self.condition_translator.perform_comparison(val1, val2, condition.comparison).format(
-            self.generic_translator.line_count(positive_commands_code) + 2)
-        code += "\n" + positive_commands_code
-        code += "\nJUMP {}".format(self.generic_translator.line_count(negative_commands_code) + 1)
-        code += "\n" + negative_commands_code
-        return code
-
-    def __if_then(self, condition: Condition, commands: list) -> str:
+        met = self.condition_translator.decide(val1, val2, condition.comparison)
         original_var_table = self.variable_table
         branch_var_table = self.variable_table.clone()
         self.__set_variable_table(branch_var_table)
+        self.__refine(condition, True)
         commands_code = self.__generate_code(commands)
         self.__set_variable_table(original_var_table)
-        self.variable_table.merge_from_one(branch_var_table)
+        if met is False:
+            return Code()
+        elif met:
+            self.variable_table.take_values_from(branch_var_table)
+            return commands_code
 
-        val1 = self.generic_translator.reflect_on_value(condition.val1)
-        val2 = self.generic_translator.reflect_on_value(condition.val2)
+        # path skipping the branch is narrowed by the condition as well, and stays initialized as before it
+        skip_var_table = self.variable_table.clone()
+        self.__set_variable_table(skip_var_table)
+        self.__refine(condition, False)
+        self.__set_variable_table(original_var_table)
+        self.variable_table.merge_from_two(skip_var_table, branch_var_table)
 
-        code = self.condition_translator.perform_comparison(val1, val2, condition.comparison).format(
-            self.generic_translator.line_count(commands_code) + 1)
-        code += "\n" + commands_code
+        code += commands_code
+        code.mark(end)
         return code
 
-    def __while_do(self, condition: Condition, commands: list) -> str:
-        # code has to be generated before fetching registers because condition check requires registers to be freshly
-        # fetched; in other case borrowed register inside check may be one of assigned registers
+    # loop is rotated, so that an iteration checks the condition once and jumps back only if it is met; guard on
+    # entry uses what is known about variables before the loop
+    def __while_do(self, condition: Condition, commands: list) -> Code:
+        guard_val1 = self.generic_translator.reflect_on_value(condition.val1)
+        guard_val2 = self.generic_translator.reflect_on_value(condition.val2)
+
         changed_identifiers = self.generic_translator.get_changed_identifiers(commands)
-        self.variable_table.unset_from_list(changed_identifiers)
+        changed_names = {idd.name for idd in changed_identifiers}
+        head_ranges, exit_ranges = LangRangePropagator(self.variable_table).propagate_through_loop(
+            While(condition, commands))
+        entry_ranges = self.__condition_ranges(condition)
+        self.variable_table.replace_ranges(changed_names, head_ranges)
+        bindings = self.__bind_hot_variables([condition.val1, condition.val2], commands)
+        end = Label("endwhile")
+        guard_code = self.condition_translator.perform_comparison(guard_val1, guard_val2, condition.comparison, end)
+        self.__refine(condition, True)
+        hoisted_code, helpers = self.__hoist_invariant_expressions(commands, [])
         commands_code = self.__generate_code(commands)
-        self.variable_table.unset_from_list(changed_identifiers)
 
+        # condition is checked at the end of the body, with what is known there; it is translated after the body, so
+        # that registers borrowed by the check are fetched freshly and are not ones the body assigned
         val1 = self.generic_translator.reflect_on_value(condition.val1)
         val2 = self.generic_translator.reflect_on_value(condition.val2)
+        start = Label("while")
+        check_code = self.condition_translator.perform_inverted_comparison(val1, val2, condition.comparison, start)
+        self.__leave_loop(condition, False, changed_names, exit_ranges, entry_ranges)
+        self.__remove_helper_variables(helpers)
 
-        code = self.condition_translator.perform_comparison(val1, val2, condition.comparison).format(
-            self.generic_translator.line_count(commands_code) + 2)
-        code += "\n" + commands_code
-        code += "\nJUMP {}".format(-self.generic_translator.line_count(code))
+        code = self.__load_bound_variables(bindings)
+        code += guard_code
+        code += hoisted_code
+        code.mark(start)
+        code += commands_code
+        code += check_code
+        code += self.__unbind_variables(bindings, changed_identifiers)
+        code.mark(end)
         return code
 
-    def __repeat_until(self, commands: list, condition: Condition) -> str:
+    def __repeat_until(self, commands: list, condition: Condition) -> Code:
         changed_identifiers = self.generic_translator.get_changed_identifiers(commands)
-        self.variable_table.unset_from_list(changed_identifiers)
+        changed_names = {idd.name for idd in changed_identifiers}
+        head_ranges, exit_ranges = LangRangePropagator(self.variable_table).propagate_through_loop(
+            RepeatUntil(commands, condition))
+        entry_ranges = self.__condition_ranges(condition)
+        self.variable_table.replace_ranges(changed_names, head_ranges)
+        bindings = self.__bind_hot_variables([condition.val1, condition.val2], commands)
+        hoisted_code, helpers = self.__hoist_invariant_expressions(commands, [])
         commands_code = self.__generate_code(commands)
-        self.variable_table.unset_from_list(changed_identifiers)
 
         val1 = self.generic_translator.reflect_on_value(condition.val1)
         val2 = self.generic_translator.reflect_on_value(condition.val2)
+        start = Label("repeat")
+        check_code = self.condition_translator.perform_comparison(val1, val2, condition.comparison, start)
+        self.__leave_loop(condition, True, changed_names, exit_ranges, entry_ranges)
+        self.__remove_helper_variables(helpers)
 
-        code = commands_code
-        code += "\n" + self.condition_translator.perform_comparison(val1, val2, condition.comparison)
-        code = code.format(-self.generic_translator.line_count(code) + 1)
+        code = self.__load_bound_variables(bindings)
+        code += hoisted_code
+        code.mark(start)
+        code += commands_code
+        code += check_code
+        code += self.__unbind_variables(bindings, changed_identifiers)
         return code
 
-    def __for_to(self, idd: str, from_value: Value, to_value: Value, commands: list):
+    # variables and iterators compared by a condition, along with their ranges
+    def __condition_ranges(self, condition: Condition) -> dict:
+        return {val.core.name: self.variable_table.get_range(val.core.name) for val in (condition.val1, condition.val2)
+                if not val.is_int() and val.core.offset is None}
+
+    # ranges narrowed to values for which the condition is met or not
+    def __refine(self, condition: Condition, met: bool):
+        comparison = condition.comparison if met else ConditionTranslator.NEGATIONS[condition.comparison]
+        refined = LangRanges.refine(self.generic_translator.get_range(condition.val1),
+                                    self.generic_translator.get_range(condition.val2), comparison)
+        if refined is None:
+            return
+        for val, value_range in zip((condition.val1, condition.val2), refined):
+            if not val.is_int() and val.core.offset is None:
+                self.variable_table.set_range(value_range, val.core.name)
+
+    # loop is left when the condition is met or not; variables it does not change get back ranges they had before
+    # the loop, narrowed by the condition
+    def __leave_loop(self, condition: Condition, met: bool, changed_names: set, exit_ranges: dict,
+                     entry_ranges: dict):
+        self.variable_table.replace_ranges(changed_names, exit_ranges)
+        for name, value_range in entry_ranges.items():
+            if name not in changed_names:
+                self.variable_table.set_range(value_range, name)
+        self.__refine(condition, met)
+
+    # expressions whose operands the loop does not change are computed before it into helper variables, which hold
+    # them for the body, if copying their values costs less than computing them; iterators are changed by the loop
+    def __hoist_invariant_expressions(self, commands: list, iterators: list):
+        excluded_names = {idd.name for idd in self.generic_translator.get_changed_identifiers(commands)}
+        excluded_names.update(iterators)
+        expressions = []
+        self.__collect_expressions(commands, expressions, excluded_names)
+
+        code = Code()
+        helpers = []
+        for expression in expressions:
+            if any(name in excluded_names for name in LangTranslator.__operand_names(expression)) or \
+                    not all(self.__is_readable(val) for val in (expression.val1, expression.val2)) or \
+                    self.variable_table.get_expression_holder(expression) is not None:
+                continue
+            helper = self.variable_table.fetch_random_variable()
+            if not self.__is_worth_holding(expression, helper):
+                self.variable_table.remove_variable(helper)
+                continue
+            code += self.__generate_code([Assign(Identifier(helper), expression)])
+            helpers.append(helper)
+        return code, helpers
+
+    def __remove_helper_variables(self, helpers: list):
+        for helper in reversed(helpers):
+            self.variable_table.remove_variable(helper)
+
+    # iterators of nested loops are collected along with the expressions
+    @staticmethod
+    def __collect_expressions(commands: list, expressions: list, iterators: set):
+        for command in commands:
+            if type(command) == Assign and not command.assigned_expression.is_value():
+                expressions.append(command.assigned_expression)
+            elif type(command) == IfElse:
+                LangTranslator.__collect_expressions(command.positive_commands, expressions, iterators)
+                LangTranslator.__collect_expressions(command.negative_commands, expressions, iterators)
+            elif type(command) in (If, While, RepeatUntil):
+                LangTranslator.__collect_expressions(command.commands, expressions, iterators)
+            elif type(command) in (ForTo, ForDownto):
+                iterators.add(command.idd)
+                LangTranslator.__collect_expressions(command.commands, expressions, iterators)
+
+    @staticmethod
+    def __operand_names(expression: Expression) -> list:
+        names = []
+        for val in (expression.val1, expression.val2):
+            if not val.is_int():
+                names += [val.core.name, val.core.offset]
+        return names
+
+    # hoisted expressions may come from branches not taken, so only values which can be read already are used
+    def __is_readable(self, val: Value) -> bool:
+        if val.is_int():
+            return True
+        idd = val.core
+        if idd.offset is None:
+            return self.variable_table.is_initialized_variable(idd.name)
+        elif not self.variable_table.is_array(idd.name):
+            return False
+        elif type(idd.offset) != int:
+            return self.variable_table.is_initialized_variable(idd.offset)
+        try:
+            self.variable_table.get_address(idd.name, idd.offset)
+        except CodeException:
+            return False
+        return True
+
+    def __is_worth_holding(self, expression: Expression, helper: str) -> bool:
+        val1 = self.generic_translator.reflect_on_value(expression.val1)
+        val2 = self.generic_translator.reflect_on_value(expression.val2)
+        if val1.is_int() and val2.is_int():
+            return False
+        state = self.register_machine.get_state()
+        feedback = self.operation_translator.perform_operation(val1, val2, expression.operation, Identifier(helper))
+        copy_code = self.generic_translator.put_value_to_register(Value(Identifier(helper)), feedback.register)
+        self.register_machine.set_state(state)
+        return LangCostModel.estimate(feedback.code) > LangCostModel.estimate(copy_code)
+
+    # variables referenced in a loop are kept in registers if copying them between registers saves more than keeping
+    # them in memory for the time of commands that need more registers than left free costs
+    def __bind_hot_variables(self, values: list, commands: list) -> dict:
+        references = dict()
+        for val in values:
+            LangTranslator.__count_value_references(val, references)
+        registers_needed, references = self.__count_references(commands, references)
+
+        copy_cost = LangCostModel.estimate(self.generic_translator.copy_register(source_reg="a", dest_reg="b"))
+        savings = dict()
+        for name, count in references.items():
+            if not self.variable_table.is_initialized_variable(name) or \
+                    self.variable_table.get_value(name) is not None:
+                continue
+            address_cost = LangCostModel.estimate(
+                self.generic_translator.generate_constant(self.variable_table.get_address(name), "a"))
+            load_cost = address_cost + LangCostModel.instruction_cost("LOAD")
+            store_cost = address_cost + LangCostModel.instruction_cost("STORE")
+            savings[name] = (count * (load_cost - copy_cost), load_cost + store_cost)
+
+        bindings = dict()
+        for name in sorted(savings, key=lambda n: savings[n][0], reverse=True):
+            if not self.register_machine.can_bind():
+                break
+            free_registers = self.register_machine.free_register_count() - 1
+            spills = len([needed for needed in registers_needed if needed > free_registers])
+            saving, spill_cost = savings[name]
+            if saving > spills * spill_cost:
+                bindings[name] = self.register_machine.bind(name)
+        return bindings
+
+    # references are counted once per pass through the loop body, so bodies of nested loops are skipped; returns the
+    # numbers of registers needed by the commands along with the references
+    def __count_references(self, commands: list, references: dict):
+        registers_needed = []
+        for command in commands:
+            registers_needed.append(self.__registers_needed(command))
+            if type(command) == Assign:
+                LangTranslator.__count_identifier_references(command.changed_identifier, references)
+                LangTranslator.__count_value_references(command.assigned_expression.val1, references)
+                LangTranslator.__count_value_references(command.assigned_expression.val2, references)
+            elif type(command) == If:
+                LangTranslator.__count_value_references(command.condition.val1, references)
+                LangTranslator.__count_value_references(command.condition.val2, references)
+                registers_needed += self.__count_references(command.commands, references)[0]
+            elif type(command) == IfElse:
+                LangTranslator.__count_value_references(command.condition.val1, references)
+                LangTranslator.__count_value_references(command.condition.val2, references)
+                registers_needed += self.__count_references(command.positive_commands, references)[0]
+                registers_needed += self.__count_references(command.negative_commands, references)[0]
+            elif type(command) == Read:
+                LangTranslator.__count_identifier_references(command.idd, references)
+            elif type(command) == Write:
+                LangTranslator.__count_value_references(command.value, references)
+        return registers_needed, references
+
+    @staticmethod
+    def __count_value_references(val: Value, references: dict):
+        if val is not None and not val.is_int():
+            LangTranslator.__count_identifier_references(val.core, references)
+
+    # elements of arrays indexed by variables are counted as pairs of the array and the index as well
+    @staticmethod
+    def __count_identifier_references(idd: Identifier, references: dict):
+        if idd.offset is None:
+            references[idd.name] = references.get(idd.name, 0) + 1
+        elif type(idd.offset) != int:
+            references[idd.offset] = references.get(idd.offset, 0) + 1
+            references[(idd.name, idd.offset)] = references.get((idd.name, idd.offset), 0) + 1
+
+    def __load_bound_variables(self, bindings: dict) -> Code:
+        reg = self.register_machine.fetch_register()
+        return self.generic_translator.load_bindings(bindings, reg)
+
+    # bound variables are written back to memory only if the loop changes them
+    def __unbind_variables(self, bindings: dict, changed_identifiers: list) -> Code:
+        changed_names = [idd.name for idd in changed_identifiers if idd.offset is None]
+        for name in bindings:
+            self.register_machine.unbind(name)
+        reg = self.register_machine.fetch_register()
+        return self.generic_translator.store_bindings(
+            {name: bound_reg for name, bound_reg in bindings.items() if name in changed_names}, reg)
+
+    def __for_to(self, idd: str, from_value: Value, to_value: Value, commands: list) -> Code:
         from_value = self.generic_translator.reflect_on_value(from_value)
         to_value = self.generic_translator.reflect_on_value(to_value)
-        delimiter_has_unknown_value = not to_value.is_int() or \
-            to_value.core > self.generic_translator.KNOWN_VARIABLE_LOAD_THRESHOLD
-        self.variable_table.add_iterator(idd)
-        limit = self.variable_table.fetch_random_variable() if delimiter_has_unknown_value else None
-
-        changed_identifiers = self.generic_translator.get_changed_identifiers(commands)
-        self.variable_table.unset_from_list(changed_identifiers)
-        commands_code = self.__generate_code(commands)
-        self.variable_table.unset_from_list(changed_identifiers)
+        loop_ranges = LangRangePropagator(self.variable_table).propagate_through_loop(
+            ForTo(idd, from_value, to_value, commands))[0]
+        iterator_range = self.__get_iterator_range(from_value, to_value)
+        self.variable_table.add_iterator(idd, iterator_range)
+        iterator_reg = self.register_machine.bind(idd)
+        pointers = self.generic_translator.get_pointers()
 
         if from_value.is_int() and to_value.is_int() and \
-                to_value.core - from_value.core <= LangTranslator.LOOP_EXPANSION_THRESHOLD:
-            code = self.__for_to_expansion(idd, from_value, to_value, commands_code)
+                to_value.core - from_value.core <= self.LOOP_EXPANSION_THRESHOLD:
+            code = self.generic_translator.put_value_to_register(from_value, iterator_reg, ignore_iterator=idd)
+            iterations = to_value.core + 1 - from_value.core
+            hoisted_code, helpers = self.__hoist_invariant_expressions(commands, [idd]) if iterations > 1 \
+                else (Code(), [])
+            code += hoisted_code
+            pointer_bindings, pointers_code = self.__bind_pointers(idd, from_value, True, commands)
+            code += pointers_code
+            commands_code = self.__generate_loop_body(commands, loop_ranges)
+            code += self.__expand_loop(commands_code, iterations, "INC",
+                                       [iterator_reg] + list(pointer_bindings.values()))
+            self.__unbind_pointers(pointer_bindings, pointers)
+            self.__remove_helper_variables(helpers)
         else:
-            code = self.__for_to_no_expansion(idd, from_value, to_value, delimiter_has_unknown_value, limit,
-                                              commands_code)
+            counter = self.variable_table.fetch_random_variable()
+            counter_reg = self.register_machine.bind(counter)
+            code = self.generic_translator.put_value_to_register(from_value, iterator_reg, ignore_iterator=idd)
+            iterations = to_value.core + 1 - from_value.core if from_value.is_int() and to_value.is_int() else None
+            if iterations is None:
+                code += self.generic_translator.put_value_to_register(to_value, counter_reg, ignore_iterator=idd)
+                code.add("INC", counter_reg)
+                code.add("SUB", counter_reg, iterator_reg)
+            hoisted_code, helpers = self.__hoist_invariant_expressions(commands, [idd])
+            pointer_bindings, pointers_code = self.__bind_pointers(idd, from_value, True, commands)
+            commands_code = self.__generate_loop_body(commands, loop_ranges)
+            code += self.__count_down_loop(commands_code, "INC", [iterator_reg] + list(pointer_bindings.values()),
+                                           counter_reg, hoisted_code, pointers_code, iterations, iterator_range)
+            self.__unbind_pointers(pointer_bindings, pointers)
+            self.__remove_helper_variables(helpers)
+            self.register_machine.unbind(counter)
+            self.variable_table.remove_variable(counter)
 
+        self.register_machine.unbind(idd)
         self.variable_table.remove_iterator(idd)
         return code
 
-    def __for_to_expansion(self, idd: str, from_value: Value, to_value: Value, commands_code: str):
-        iterator = from_value
-
-        reg1 = self.register_machine.fetch_register()
-        reg2 = self.register_machine.fetch_register()
-
-        pre_run_code = self.generic_translator.put_value_to_register(from_value, reg1, ignore_iterator=idd)
-        pre_run_code += "\n" + self.generic_translator.put_address_to_register(Identifier(idd), reg2)
-        pre_run_code += "\nSTORE {} {}".format(reg1, reg2)
-
-        code = ""
-        while to_value.core - iterator.core >= 0:
-            code += "\n" + commands_code if code else commands_code
-            code += "\n" + self.generic_translator.put_address_to_register(Identifier(idd), reg2)
-            code += "\nLOAD {} {}".format(reg1, reg2)
-            code += "\nINC {}".format(reg1)
-            code += "\nSTORE {} {}".format(reg1, reg2)
-            iterator.core += 1
-
-        return pre_run_code + "\n" + code if code else pre_run_code
-
-    def __for_to_no_expansion(self, idd: str, from_value: Value, to_value: Value, delimiter_has_unknown_value: bool,
-                              limit: str, commands_code: str):
-        reg1 = self.register_machine.fetch_register()
-        reg2 = self.register_machine.fetch_register()
-        reg3 = self.register_machine.fetch_register()
-
-        pre_run_code = self.generic_translator.put_value_to_register(from_value, reg1, ignore_iterator=idd)
-        pre_run_code += "\n" + self.generic_translator.put_address_to_register(Identifier(idd), reg2)
-        pre_run_code += "\nSTORE {} {}".format(reg1, reg2)
-        if delimiter_has_unknown_value:
-            pre_run_code += "\n" + self.generic_translator.put_value_to_register(to_value, reg2,
-                                                                                 ignore_iterator=idd)
-            pre_run_code += "\nINC {}".format(reg2)
-            pre_run_code += "\n" + self.generic_translator.put_address_to_register(Identifier(limit), reg3)
-            pre_run_code += "\nSTORE {} {}".format(reg2, reg3)
-        else:
-            to_value.core += 1
-            pre_run_code += "\n" + self.generic_translator.put_value_to_register(to_value, reg2)
-        pre_run_code += "\nSUB {} {}".format(reg2, reg1)
-
-        code = "JZERO {}".format(reg2) + " {}"
-        code += "\n" + commands_code
-        code += "\n" + self.generic_translator.put_address_to_register(Identifier(idd), reg2)
-        code += "\nLOAD {} {}".format(reg1, reg2)
-        code += "\nINC {}".format(reg1)
-        code += "\nSTORE {} {}".format(reg1, reg2)
-        if delimiter_has_unknown_value:
-            code += "\n" + self.generic_translator.put_address_to_register(Identifier(limit), reg3)
-            code += "\nLOAD {} {}".format(reg2, reg3)
-        else:
-            code += "\n" + self.generic_translator.put_value_to_register(to_value, reg2)
-        code += "\nSUB {} {}".format(reg2, reg1)
-        code += "\nJUMP {}".format(-self.generic_translator.line_count(code))
-        code = code.format(self.generic_translator.line_count(code))
-
-        if delimiter_has_unknown_value:
-            self.variable_table.remove_variable(limit)
-        return pre_run_code + "\n" + code if code else pre_run_code
-
-    def __for_downto(self, idd: str, from_value: Value, downto_value: Value, commands: list):
+    def __for_downto(self, idd: str, from_value: Value, downto_value: Value, commands: list) -> Code:
         from_value = self.generic_translator.reflect_on_value(from_value)
         downto_value = self.generic_translator.reflect_on_value(downto_value)
-        delimiter_has_unknown_value = not downto_value.is_int() or \
-            downto_value.core > self.generic_translator.KNOWN_VARIABLE_LOAD_THRESHOLD
-        self.variable_table.add_iterator(idd)
-        limit = self.variable_table.fetch_random_variable() if delimiter_has_unknown_value else None
-
-        changed_identifiers = self.generic_translator.get_changed_identifiers(commands)
-        self.variable_table.unset_from_list(changed_identifiers)
-        commands_code = self.__generate_code(commands)
-        self.variable_table.unset_from_list(changed_identifiers)
+        loop_ranges = LangRangePropagator(self.variable_table).propagate_through_loop(
+            ForDownto(idd, from_value, downto_value, commands))[0]
+        iterator_range = self.__get_iterator_range(downto_value, from_value)
+        self.variable_table.add_iterator(idd, iterator_range)
+        iterator_reg = self.register_machine.bind(idd)
+        pointers = self.generic_translator.get_pointers()
 
         if from_value.is_int() and downto_value.is_int() and \
-                from_value.core - downto_value.core <= LangTranslator.LOOP_EXPANSION_THRESHOLD:
-            code = self.__for_downto_expansion(idd, from_value, downto_value, commands_code)
+                from_value.core - downto_value.core <= self.LOOP_EXPANSION_THRESHOLD:
+            code = self.generic_translator.put_value_to_register(from_value, iterator_reg, ignore_iterator=idd)
+            iterations = from_value.core + 1 - downto_value.core
+            hoisted_code, helpers = self.__hoist_invariant_expressions(commands, [idd]) if iterations > 1 \
+                else (Code(), [])
+            code += hoisted_code
+            pointer_bindings, pointers_code = self.__bind_pointers(idd, from_value, False, commands)
+            code += pointers_code
+            commands_code = self.__generate_loop_body(commands, loop_ranges)
+            code += self.__expand_loop(commands_code, iterations, "DEC",
+                                       [iterator_reg] + list(pointer_bindings.values()))
+            self.__unbind_pointers(pointer_bindings, pointers)
+            self.__remove_helper_variables(helpers)
         else:
-            code = self.__for_downto_no_expansion(idd, from_value, downto_value, delimiter_has_unknown_value, limit,
-                                                  commands_code)
+            counter = self.variable_table.fetch_random_variable()
+            counter_reg = self.register_machine.bind(counter)
+            code = self.generic_translator.put_value_to_register(from_value, iterator_reg, ignore_iterator=idd)
+            iterations = from_value.core + 1 - downto_value.core if from_value.is_int() and downto_value.is_int() \
+                else None
+            if iterations is None:
+                reg = self.register_machine.fetch_register()
+                code += self.generic_translator.copy_register(source_reg=iterator_reg, dest_reg=counter_reg)
+                code.add("INC", counter_reg)
+                code += self.generic_translator.put_value_to_register(downto_value, reg, ignore_iterator=idd)
+                code.add("SUB", counter_reg, reg)
+            hoisted_code, helpers = self.__hoist_invariant_expressions(commands, [idd])
+            pointer_bindings, pointers_code = self.__bind_pointers(idd, from_value, False, commands)
+            commands_code = self.__generate_loop_body(commands, loop_ranges)
+            code += self.__count_down_loop(commands_code, "DEC", [iterator_reg] + list(pointer_bindings.values()),
+                                           counter_reg, hoisted_code, pointers_code, iterations, iterator_range)
+            self.__unbind_pointers(pointer_bindings, pointers)
+            self.__remove_helper_variables(helpers)
+            self.register_machine.unbind(counter)
+            self.variable_table.remove_variable(counter)
 
+        self.register_machine.unbind(idd)
         self.variable_table.remove_iterator(idd)
         return code
 
-    def __for_downto_expansion(self, idd: str, from_value: Value, downto_value: Value, commands_code: str):
-        iterator = from_value
-
-        reg1 = self.register_machine.fetch_register()
-        reg2 = self.register_machine.fetch_register()
-
-        pre_run_code = self.generic_translator.put_value_to_register(from_value, reg1, ignore_iterator=idd)
-        pre_run_code += "\n" + self.generic_translator.put_address_to_register(Identifier(idd), reg2)
-        pre_run_code += "\nSTORE {} {}".format(reg1, reg2)
-
-        code = ""
-        while iterator.core - downto_value.core >= 0:
-            code += "\n" + commands_code if code else commands_code
-            code += "\n" + self.generic_translator.put_address_to_register(Identifier(idd), reg2)
-            code += "\nLOAD {} {}".format(reg1, reg2)
-            code += "\nDEC {}".format(reg1)
-            code += "\nSTORE {} {}".format(reg1, reg2)
-            iterator.core -= 1
-
-        return pre_run_code + "\n" + code if code else pre_run_code
-
-    def __for_downto_no_expansion(self, idd: str, from_value: Value, downto_value: Value,
-                                  delimiter_has_unknown_value: bool, limit: str, commands_code: str):
-        reg1 = self.register_machine.fetch_register()
-        reg2 = self.register_machine.fetch_register()
-        reg3 = self.register_machine.fetch_register()
-        reg4 = self.register_machine.fetch_register()
-
-        pre_run_code = self.generic_translator.put_value_to_register(downto_value, reg1, ignore_iterator=idd)
-        if delimiter_has_unknown_value:
-            pre_run_code += "\n" + self.generic_translator.put_address_to_register(Identifier(limit), reg3)
-            pre_run_code += "\nSTORE {} {}".format(reg1, reg3)
-        pre_run_code += "\n" + self.generic_translator.put_value_to_register(from_value, reg2, ignore_iterator=idd)
-        pre_run_code += "\nINC {}".format(reg2)
-        pre_run_code += "\n" + self.generic_translator.copy_register(source_reg=reg2, dest_reg=reg4)
-        pre_run_code += "\n" + self.generic_translator.put_address_to_register(Identifier(idd), reg3)
-        pre_run_code += "\nSUB {} {}".format(reg2, reg1)
-
-        code = "JZERO {}".format(reg2) + " {}"
-        code += "\nDEC {}".format(reg4)
-        code += "\nSTORE {} {}".format(reg4, reg3)
-        code += "\n" + commands_code
-        code += "\n" + self.generic_translator.put_address_to_register(Identifier(idd), reg3)
-        code += "\nLOAD {} {}".format(reg2, reg3)
-        code += "\n" + self.generic_translator.copy_register(source_reg=reg2, dest_reg=reg4)
-        if delimiter_has_unknown_value:
-            code += "\n" + self.generic_translator.put_value_to_register(Value(Identifier(limit)), reg1)
+    # elements of arrays indexed by the iterator are accessed through pointers stepped along with it, if computing
+    # their addresses in every pass costs more; a pointer below zero would saturate, so arrays placed below their first
+    # index get one in ascending loops only if the first value of the iterator keeps it in range
+    def __bind_pointers(self, idd: str, from_value: Value, ascending: bool, commands: list):
+        registers_needed, references = self.__count_references(commands, dict())
+        step_cost = LangCostModel.instruction_cost("INC")
+        savings = dict()
+        for element, count in references.items():
+            if type(element) != tuple or element[1] != idd:
+                continue
+            array = Identifier(element[0], idd)
+            if self.generic_translator.get_address_register(array) is not None:
+                continue
+            distance = self.variable_table.get_address(element[0], self.variable_table.get_bias(element[0])) - \
+                self.variable_table.get_bias(element[0])
+            if distance < 0 and ascending and (not from_value.is_int() or from_value.core + distance < 0):
+                continue
+            address_cost = LangCostModel.estimate(self.generic_translator.put_address_to_register(array, "a"))
+            savings[element] = count * address_cost - step_cost
+
+        pointers = self.generic_translator.get_pointers()
+        bindings = dict()
+        code = Code()
+        for element in sorted(savings, key=lambda e: savings[e], reverse=True):
+            free_registers = self.register_machine.free_register_count() - 1
+            if free_registers < LangTranslator.MIN_FREE_REGISTERS:
+                break
+            spills = len([needed for needed in registers_needed if needed > free_registers])
+            pointer = self.variable_table.fetch_random_variable()
+            address_cost = LangCostModel.estimate(
+                self.generic_translator.generate_constant(self.variable_table.get_address(pointer), "a"))
+            spill_cost = 2 * address_cost + LangCostModel.instruction_cost("LOAD") + \
+                LangCostModel.instruction_cost("STORE")
+            if savings[element] <= spills * spill_cost:
+                self.variable_table.remove_variable(pointer)
+                break
+            pointer_reg = self.register_machine.bind(pointer)
+            code += self.generic_translator.put_address_to_register(Identifier(element[0], idd), pointer_reg)
+            bindings[pointer] = pointer_reg
+            pointers[element] = pointer
+        self.generic_translator.set_pointers(pointers)
+        return bindings, code
+
+    def __unbind_pointers(self, bindings: dict, pointers: dict):
+        for pointer in reversed(list(bindings)):
+            self.register_machine.unbind(pointer)
+            self.variable_table.remove_variable(pointer)
+        self.generic_translator.set_pointers(pointers)
+
+    # iterator takes values between the least first value and the greatest last one, or only the first value if the
+    # loop is never entered
+    def __get_iterator_range(self, first: Value, last: Value) -> tuple:
+        low = self.generic_translator.get_range(first)[0]
+        high = self.generic_translator.get_range(last)[1]
+        return low, high if high is None or high >= low else low
+
+    # ranges known at the start of every pass hold after the loop as well, as it is left only from there
+    def __generate_loop_body(self, commands: list, loop_ranges: dict) -> Code:
+        changed_names = {idd.name for idd in self.generic_translator.get_changed_identifiers(commands)}
+        self.variable_table.replace_ranges(changed_names, loop_ranges)
+        commands_code = self.__generate_code(commands)
+        self.variable_table.replace_ranges(changed_names, loop_ranges)
+        return commands_code
+
+    # iterator lives in its register only; memory cell of it is written when the register is spilled
+    @staticmethod
+    def __expand_loop(commands_code: Code, iterations: int, step_opcode: str, step_registers: list) -> Code:
+        code = Code()
+        iteration_code = commands_code
+        for iteration in range(iterations):
+            code += iteration_code
+            if iteration < iterations - 1:
+                for reg in step_registers:
+                    code.add(step_opcode, reg)
+            iteration_code = commands_code.clone()
+        return code
+
+    # counter holds the number of iterations left, which spares comparing the iterator with the limit; hoisted code is
+    # skipped along with the loop if there are no iterations; a known number of iterations is not counted at runtime,
+    # as the counter is given the number of passes through the unrolled body right away
+    def __count_down_loop(self, commands_code: Code, step_opcode: str, step_registers: list, counter_reg: str,
+                          hoisted_code: Code, pointers_code: Code, iterations=None,
+                          iterator_range=LangRanges.UNKNOWN) -> Code:
+        start = Label("for")
+        end = Label("endfor")
+        iteration_code = Code()
+        iteration_code += commands_code
+        for reg in step_registers:
+            iteration_code.add(step_opcode, reg)
+        max_iterations = iterations if iterations is not None or iterator_range[1] is None else \
+            iterator_range[1] + 1 - iterator_range[0]
+        factor = self.__choose_unrolling_factor(len(iteration_code), max_iterations)
+
+        code = Code()
+        if iterations is not None:
+            code += GenericTranslator.generate_constant(iterations // factor, counter_reg)
+        if len(hoisted_code):
+            if iterations is None:
+                code.add("JZERO", counter_reg, end)
+            code += hoisted_code
+        code += pointers_code
+        if iterations is not None:
+            code += LangTranslator.__repeat(iteration_code, iterations % factor)
         else:
-            code += "\n" + self.generic_translator.put_value_to_register(downto_value, reg1)
-        code += "\nSUB {} {}".format(reg2, reg1)
-        code += "\nJUMP {}".format(-self.generic_translator.line_count(code))
-        code = code.format(self.generic_translator.line_count(code))
+            code += LangTranslator.__count_down_remainder(iteration_code, counter_reg, factor)
+        code.mark(start)
+        code.add("JZERO", counter_reg, end)
+        code += LangTranslator.__repeat(iteration_code, factor)
+        code.add("DEC", counter_reg)
+        code.add("JUMP", start)
+        code.mark(end)
+        return code
+
+    # greatest power of two whose copies of the body fit in the budget, along with the blocks running the remainder;
+    # unrolling a loop which may never get through all the copies would only add checks of the remainder
+    def __choose_unrolling_factor(self, iteration_size: int, max_iterations) -> int:
+        factor = 1
+        while factor < self.MAX_UNROLLING_FACTOR and \
+                (4 * factor - 2) * iteration_size <= self.UNROLLING_BUDGET and \
+                (max_iterations is None or 2 * factor <= max_iterations):
+            factor *= 2
+        return factor
 
-        if delimiter_has_unknown_value:
-            self.variable_table.remove_variable(limit)
-        return pre_run_code + "\n" + code if code else pre_run_code
+    # iterations for the bits of the counter below the factor are made in blocks of one, two, four... iterations,
+    # shifting the bits out, which leaves the number of passes through the unrolled body in the counter
+    @staticmethod
+    def __count_down_remainder(iteration_code: Code, counter_reg: str, factor: int) -> Code:
+        code = Code()
+        block = 1
+        while block < factor:
+            block_start = Label("for_block")
+            block_end = Label("endfor_block")
+            code.add("JODD", counter_reg, block_start)
+            code.add("JUMP", block_end)
+            code.mark(block_start)
+            code += LangTranslator.__repeat(iteration_code, block)
+            code.mark(block_end)
+            code.add("SHR", counter_reg)
+            block *= 2
+        return code
+
+    @staticmethod
+    def __repeat(iteration_code: Code, count: int) -> Code:
+        code = Code()
+        for _ in range(count):
+            code += iteration_code.clone()
+        return code
 
-    def __read(self, idd: Identifier) -> str:
+    def __read(self, idd: Identifier) -> Code:
         self.variable_table.set_value(None, idd.name, idd.offset)
         reg = self.register_machine.fetch_register()
+        pointer_reg = self.generic_translator.get_address_register(idd, initialize=True)
+        if pointer_reg is not None:
+            return Code().add("GET", pointer_reg)
         code = self.generic_translator.put_address_to_register(idd, register=reg, initialize=True)
-        code += "\nGET {}".format(reg)
+        code.add("GET", reg)
+        bound_reg = self.generic_translator.get_bound_register(idd)
+        if bound_reg is not None:
+            code.add("LOAD", bound_reg, reg)
         return code
 
-    def __write(self, val: Value) -> str:
+    def __write(self, val: Value) -> Code:
         reg = self.register_machine.fetch_register()
         if val.is_int():
             reg2 = self.register_machine.fetch_register()
-            code = self.generic_translator.put_value_to_register(val, register=reg)
-            code += "\n" + self.generic_translator.generate_constant(self.variable_table.get_marker(), reg2)
-            code += "\nSTORE {} {}".format(reg, reg2)
-            code += "\nPUT {}".format(reg2)
+            code = self.generic_translator.put_value_to_register(val, register=reg, helper=reg2)
+            code += self.generic_translator.generate_constant(self.variable_table.get_free_address(), reg2)
+            code.add("STORE", reg, reg2)
+            code.add("PUT", reg2)
         else:
+            pointer_reg = self.generic_translator.get_address_register(val.core)
+            if pointer_reg is not None:
+                return Code().add("PUT", pointer_reg)
             code = self.generic_translator.put_address_to_register(val.core, register=reg)
-            code += "\nPUT {}".format(reg)
+            bound_reg = self.generic_translator.get_bound_register(val.core)
+            if bound_reg is not None:
+                code.add("STORE", bound_reg, reg)
+            code.add("PUT", reg)
         return code
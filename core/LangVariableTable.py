@@ -2,6 +2,9 @@ from model.errors import *
 from model.internal.LangInt import LangInt
 from model.internal.LangArray import LangArray
 from model.internal.Stack import Stack
+from model.internal.LayeredDict import LayeredDict
+from core.LangRanges import LangRanges
+from model.nonterminals.Expression import Expression
 from copy import deepcopy
 
 
@@ -9,43 +12,70 @@ class LangVariableTable:
 
     def __init__(self):
         self.__stack = Stack()
-        self.__table = dict()
+        self.__table = LayeredDict()
         self.__marker = 0
+        self.__stack_addresses = []
+        self.__depth = 0
+        self.__expressions = dict()
 
-    def add_variable(self, name):
+    def add_variable(self, name, address=None):
         if name in self.__table:
             raise SecondDeclarationError(ref=name)
-        self.__table[name] = LangInt(name, self.__marker)
-        self.__marker += 1
+        self.__table[name] = LangInt(name, self.__place(address, 1))
 
-    def add_array(self, name, first, last):
+    def add_array(self, name, first, last, address=None):
         if name in self.__table:
             raise SecondDeclarationError(ref=name)
-        arr = LangArray(name, first, last, self.__marker)
+        arr = LangArray(name, first, last, self.__marker if address is None else address)
         self.__table[name] = arr
-        self.__marker += len(arr)
-
-    def add_iterator(self, name):
-        iterator = LangInt(name, self.__marker)
+        self.__place(address, len(arr))
+
+    # addresses reserved for iterators and helper variables of loops, taken in order of loop nesting
+    def add_stack_address(self, address):
+        self.__stack_addresses.append(self.__place(address, 1))
+
+    def __place(self, address, size):
+        if address is None:
+            address = self.__marker
+        self.__marker = max(self.__marker, address + size)
+        return address
+
+    def __push_address(self):
+        address = self.get_free_address()
+        if self.__depth >= len(self.__stack_addresses):
+            self.__marker += 1
+        self.__depth += 1
+        return address
+
+    def __pop_address(self):
+        self.__depth -= 1
+        if self.__depth >= len(self.__stack_addresses):
+            self.__marker -= 1
+
+    def add_iterator(self, name, value_range=LangRanges.UNKNOWN):
+        iterator = LangInt(name, self.__push_address())
         iterator.initialize()
-        self.__marker += 1
+        iterator.set_range(value_range)
         self.__stack.insert(name, iterator)
+        self.__forget_expressions(name)
 
     def remove_iterator(self, name):
         self.__stack.pop(name)
-        self.__marker -= 1
+        self.__pop_address()
+        self.__forget_expressions(name)
 
     def fetch_random_variable(self):
-        name = str(self.__marker)
-        var = LangInt(name, self.__marker)
+        address = self.__push_address()
+        name = str(address)
+        var = LangInt(name, address)
         var.initialize()
-        self.__marker += 1
         self.__table[name] = var
         return name
 
     def remove_variable(self, name):
-        self.__marker -= 1
+        self.__pop_address()
         del self.__table[name]
+        self.__forget_expressions(name)
 
     def get_address(self, name, offset=None, initialize=False, ignore_iterator=None):
         try:
@@ -55,7 +85,8 @@ class LangVariableTable:
                     raise IteratorAssignmentError(ref=name)
             else:
                 var = self.__table[name]
-                if initialize:
+                if initialize and not var.is_initialized():
+                    var = self.__own(name)
                     var.initialize()
             return var.get_address(offset)
         except (VariableUnitilializedError, VariableAsArrayReferenceError, ArrayAsVariableReferenceError) as e:
@@ -63,10 +94,22 @@ class LangVariableTable:
         except KeyError:
             raise VariableUndeclaredError(ref=name)
 
+    def is_initialized_variable(self, name):
+        if name in self.__stack:
+            return True
+        var = self.__table.get(name)
+        return type(var) == LangInt and var.is_initialized()
+
+    def is_array(self, name):
+        return name not in self.__stack and type(self.__table.get(name)) == LangArray
+
     def get_bias(self, name):
         return self.__table[name].get_bias()
 
-    def get_marker(self):
+    # first cell not taken by any variable
+    def get_free_address(self):
+        if self.__depth < len(self.__stack_addresses):
+            return self.__stack_addresses[self.__depth]
         return self.__marker
 
     def get_value(self, name, offset=None):
@@ -81,35 +124,132 @@ class LangVariableTable:
             pass    # it's an exception, but it will be handled later
 
     def set_value(self, value, name, offset=None):
+        self.__forget_expressions(name)
         if name in self.__stack:
             pass
         else:
             try:
-                var = self.__table[name]
+                var = self.__own(name)
                 if offset is not None and type(offset) != int:
                     offset = self.get_value(offset)
                 var.set_value(value, offset)
             except KeyError:
                 pass    # it's an exception, but it will be handled later
 
+    # bounds of values of variables and iterators; elements of arrays are bound only by values known for them
+    def get_range(self, name, offset=None):
+        if name in self.__stack:
+            return self.__stack.get(name).get_range() if offset is None else LangRanges.UNKNOWN
+        var = self.__table.get(name)
+        if type(var) == LangInt and offset is None:
+            return var.get_range()
+        value = self.get_value(name, offset)
+        return LangRanges.point(value) if value is not None else LangRanges.UNKNOWN
+
+    # bounds found out for a value which does not change, so expressions held by the variable stay
+    def set_range(self, value_range, name):
+        if name in self.__stack:
+            self.__stack.get(name).set_range(value_range)
+        elif type(self.__table.get(name)) == LangInt:
+            self.__own(name).set_range(value_range)
+
+    # entries shared with the table this one was cloned from are copied before they change
+    def __own(self, name):
+        var = self.__table[name]
+        if not self.__table.is_local(name):
+            var = deepcopy(var)
+            self.__table[name] = var
+        return var
+
+    # ranges known for variables and array elements, keyed by pairs of name and index, which is None for variables;
+    # variables hidden by iterators are left out
+    def get_known_ranges(self):
+        ranges = dict()
+        for name, var in self.__table.items():
+            if name in self.__stack:
+                continue
+            elif type(var) == LangInt:
+                if var.get_range() != LangRanges.UNKNOWN:
+                    ranges[(name, None)] = var.get_range()
+            else:
+                ranges.update({(name, offset): LangRanges.point(value)
+                               for offset, value in var.get_known_values().items()})
+        return ranges
+
+    def get_iterator_ranges(self):
+        return {name: self.__stack.get(name).get_range() for name in self.__stack.keys()}
+
+    # variables holding values of expressions computed earlier; an expression stays available until its operands or
+    # the variable holding it change
+    def get_expression_holder(self, expression: Expression):
+        return self.__expressions.get(LangVariableTable.__expression_key(expression))
+
+    def set_expression_holder(self, expression: Expression, name):
+        self.__expressions[LangVariableTable.__expression_key(expression)] = name
+
+    def __forget_expressions(self, name):
+        self.__expressions = {key: holder for key, holder in self.__expressions.items()
+                              if holder != name and name not in key[1] + key[2]}
+
+    # operands of commutative operations are ordered
+    @staticmethod
+    def __expression_key(expression: Expression):
+        operands = []
+        for val in (expression.val1, expression.val2):
+            operands.append((val.core,) if val.is_int() else (val.core.name, val.core.offset))
+        if expression.operation in ("+", "*"):
+            operands.sort(key=str)
+        return expression.operation, operands[0], operands[1]
+
+    # clone shares entries with this table until either of them changes, so this table may not change while the clone
+    # is in use; merging touches only entries changed by the clones
     def clone(self):
         var_table = LangVariableTable()
         var_table.__stack = self.__stack.clone()
-        var_table.__table = deepcopy(self.__table)
+        var_table.__table = self.__table.derive()
         var_table.__marker = self.__marker
+        var_table.__stack_addresses = self.__stack_addresses
+        var_table.__depth = self.__depth
+        var_table.__expressions = dict(self.__expressions)
         return var_table
 
-    def merge_from_one(self, other):
-        for name in self.__table.keys():
-            self.__table[name] = self.__table[name].merge(other.__table[name])
-
     def merge_from_two(self, other1, other2):
-        for name in self.__table.keys():
+        for name in self.__changed_names(other1, other2):
             self.__table[name] = other1.__table[name].merge(other2.__table[name])
-
-    def unset_from_list(self, identifier_list):
-        for idd in identifier_list:
-            try:
-                self.set_value(None, idd.name, idd.offset)
-            except KeyError:
-                self.set_value(None, idd.name, None)
+        self.__merge_iterator_ranges(other1, other2)
+        self.__expressions = {key: holder for key, holder in other1.__expressions.items()
+                              if other2.__expressions.get(key) == holder}
+
+    # iterators do not change in branches, but their ranges may be narrowed by conditions
+    def __merge_iterator_ranges(self, other1, other2):
+        for name in self.__stack.keys():
+            self.__stack.get(name).set_range(LangRanges.join(other1.__stack.get(name).get_range(),
+                                                             other2.__stack.get(name).get_range()))
+
+    # branch taken is known at compile time, so values are the ones it leaves, while variables stay initialized as
+    # merged from the branches, which is as in the first branch, or as before the branch if there is only one
+    def take_values_from(self, other, first=None):
+        initialized = self if first is None else first
+        for name in self.__changed_names(other, initialized):
+            self.__table[name] = other.__table[name].with_initialization_of(initialized.__table[name])
+        self.__expressions = dict(other.__expressions)
+
+    # variables and arrays of this table changed by the clones
+    def __changed_names(self, *others):
+        names = set()
+        for other in others:
+            if other is not self:
+                names |= other.__table.changed_keys()
+        return [name for name in names if name in self.__table and all(name in other.__table for other in others)]
+
+    # ranges of the variables and arrays named are replaced with the given ones, keyed by pairs of name and index
+    def replace_ranges(self, names, ranges):
+        for name in names:
+            self.set_value(None, name)
+        for (name, offset), value_range in ranges.items():
+            if name not in names:
+                continue
+            elif offset is None:
+                self.set_range(value_range, name)
+            elif value_range[0] == value_range[1]:
+                self.set_value(value_range[0], name, offset)
@@ -0,0 +1,190 @@
+import random
+import re
+from core.LangCostModel import LangCostModel
+from model.errors import MachineError
+from model.internal.ExecutionResult import ExecutionResult
+from model.internal.LangMemory import LangMemory
+
+
+class LangVirtualMachine:
+
+    GET, PUT, LOAD, STORE, ADD, SUB, RESET, INC, DEC, SHR, SHL, JUMP, JZERO, JODD, HALT, FAULT = range(16)
+
+    __opcodes = {
+        "GET": GET,
+        "PUT": PUT,
+        "LOAD": LOAD,
+        "STORE": STORE,
+        "ADD": ADD,
+        "SUB": SUB,
+        "RESET": RESET,
+        "INC": INC,
+        "DEC": DEC,
+        "SHR": SHR,
+        "SHL": SHL,
+        "JUMP": JUMP,
+        "JZERO": JZERO,
+        "JODD": JODD,
+        "HALT": HALT
+    }
+
+    __registers = {
+        "a": 0,
+        "b": 1,
+        "c": 2,
+        "d": 3,
+        "e": 4,
+        "f": 5
+    }
+
+    # a jump by 0 is a jump onto itself, looping for good unless a conditional one is not taken
+    __label_pattern = re.compile(r"0|-?[1-9][0-9]*")
+
+    def __init__(self, assembly: str):
+        self.opcodes = []
+        self.operands = []
+        self.targets = []
+        self.costs = []
+        self.__decode(assembly)
+
+    def __decode(self, assembly: str):
+        words = re.sub(r"\([^)]*\)", " ", assembly).split()
+        program = []
+        i = 0
+        while i < len(words):
+            opcode = LangVirtualMachine.__opcodes.get(words[i])
+            if opcode is None:
+                raise MachineError("machine error: unknown instruction {}", ref=words[i])
+            arity = 0 if opcode == LangVirtualMachine.HALT else 1 if opcode in (
+                LangVirtualMachine.GET, LangVirtualMachine.PUT, LangVirtualMachine.RESET, LangVirtualMachine.INC,
+                LangVirtualMachine.DEC, LangVirtualMachine.SHR, LangVirtualMachine.SHL, LangVirtualMachine.JUMP) \
+                else 2
+            if i + arity >= len(words):
+                raise MachineError("machine error: missing operand of instruction {}", ref=len(program))
+            program.append((opcode, words[i + 1:i + 1 + arity]))
+            self.costs.append(LangCostModel.INSTRUCTION_COSTS[words[i]])
+            i += 1 + arity
+
+        # jump targets are resolved to absolute indices here; every target outside of the program gets its own
+        # FAULT instruction appended, so the dispatch loop never has to check the program counter
+        faults = []
+        for index, (opcode, args) in enumerate(program):
+            register = 0
+            target = index + 1
+            operand = 0
+            if opcode in (LangVirtualMachine.JUMP, LangVirtualMachine.JZERO, LangVirtualMachine.JODD):
+                if opcode != LangVirtualMachine.JUMP:
+                    register = self.__decode_register(args[0])
+                if not LangVirtualMachine.__label_pattern.fullmatch(args[-1]):
+                    raise MachineError("machine error: invalid jump offset in instruction {}", ref=index)
+                target = index + int(args[-1])
+            elif opcode != LangVirtualMachine.HALT:
+                register = self.__decode_register(args[0])
+                if len(args) == 2:
+                    operand = self.__decode_register(args[1])
+            if not 0 <= target < len(program):
+                faults.append(target)
+                target = len(program) + len(faults) - 1
+            self.opcodes.append(opcode)
+            self.operands.append((register, operand))
+            self.targets.append(target)
+
+        for fault in faults:
+            self.opcodes.append(LangVirtualMachine.FAULT)
+            self.operands.append((0, 0))
+            self.targets.append(fault)
+
+    @staticmethod
+    def __decode_register(name: str) -> int:
+        register = LangVirtualMachine.__registers.get(name)
+        if register is None:
+            raise MachineError("machine error: unknown register {}", ref=name)
+        return register
+
+    def __len__(self):
+        return len([opcode for opcode in self.opcodes if opcode != LangVirtualMachine.FAULT])
+
+    def run(self, inputs, seed=None, strict=False, max_jumps=None) -> ExecutionResult:
+        GET, PUT, LOAD, STORE, ADD, SUB, RESET, INC, DEC, SHR, SHL, JUMP, JZERO, JODD, HALT, FAULT = range(16)
+        opcodes = self.opcodes
+        operands = self.operands
+        targets = self.targets
+        hits = [0] * len(opcodes)
+        inputs = iter(inputs)
+        outputs = []
+        memory = LangMemory(strict)
+        generator = random.Random(seed)
+        r = [generator.randrange(2 ** 31) for _ in range(6)]
+        # straight-line code always terminates, so the budget is only charged on executed jumps
+        jumps_left = -1 if max_jumps is None else max_jumps
+        k = 0
+
+        while True:
+            op = opcodes[k]
+            hits[k] += 1
+            if op == LOAD:
+                x, y = operands[k]
+                r[x] = memory[r[y]]
+                k += 1
+            elif op == STORE:
+                x, y = operands[k]
+                memory[r[y]] = r[x]
+                k += 1
+            elif op == JZERO:
+                k = targets[k] if r[operands[k][0]] == 0 else k + 1
+                if not jumps_left:
+                    raise MachineError("machine error: limit of {} jumps exceeded", ref=max_jumps)
+                jumps_left -= 1
+            elif op == INC:
+                r[operands[k][0]] += 1
+                k += 1
+            elif op == JUMP:
+                k = targets[k]
+                if not jumps_left:
+                    raise MachineError("machine error: limit of {} jumps exceeded", ref=max_jumps)
+                jumps_left -= 1
+            elif op == ADD:
+                x, y = operands[k]
+                r[x] += r[y]
+                k += 1
+            elif op == SUB:
+                x, y = operands[k]
+                r[x] = r[x] - r[y] if r[x] >= r[y] else 0
+                k += 1
+            elif op == SHL:
+                r[operands[k][0]] <<= 1
+                k += 1
+            elif op == SHR:
+                r[operands[k][0]] >>= 1
+                k += 1
+            elif op == JODD:
+                k = targets[k] if r[operands[k][0]] & 1 else k + 1
+                if not jumps_left:
+                    raise MachineError("machine error: limit of {} jumps exceeded", ref=max_jumps)
+                jumps_left -= 1
+            elif op == RESET:
+                r[operands[k][0]] = 0
+                k += 1
+            elif op == DEC:
+                x = operands[k][0]
+                if r[x]:
+                    r[x] -= 1
+                k += 1
+            elif op == GET:
+                try:
+                    memory[r[operands[k][0]]] = int(next(inputs))
+                except StopIteration:
+                    raise MachineError("machine error: input exhausted at instruction {}", ref=k)
+                k += 1
+            elif op == PUT:
+                outputs.append(memory[r[operands[k][0]]])
+                k += 1
+            elif op == HALT:
+                break
+            else:
+                raise MachineError("machine error: call of nonexistent instruction {}", ref=targets[k])
+
+        hits = hits[:len(self)]
+        t = sum(h * cost for h, cost in zip(hits, self.costs))
+        io = sum(h for h, opcode in zip(hits, opcodes) if opcode in (GET, PUT)) * LangCostModel.IO_COST
+        return ExecutionResult(outputs, t, io, hits)
@@ -1,9 +1,14 @@
 from core.LangVariableTable import LangVariableTable
 from core.LangRegisterMachine import LangRegisterMachine
 from core.GenericTranslator import GenericTranslator
+from core.LangCostModel import LangCostModel
+from core.LangRanges import LangRanges
 from model.nonterminals.Value import Value
 from model.nonterminals.Identifier import Identifier
 from model.internal.Feedback import Feedback
+from model.internal.DivisionFeedback import DivisionFeedback
+from model.internal.Code import Code
+from model.internal.Label import Label
 
 
 def is_power_of_two(num: int) -> bool:
@@ -27,10 +32,6 @@ def log(num: int) -> int:
 
 class OperationTranslator:
 
-    ADDITION_SWITCH_THRESHOLD = 10
-    MULTIPLICATION_BY_TWOS_SWITCH_THRESHOLD = 1_000_000
-    MULTIPLICATION_BY_CONST_SWITCH_THRESHOLD = 1_000_000
-
     def __init__(self, variable_table: LangVariableTable, register_machine: LangRegisterMachine,
                  generic_translator: GenericTranslator):
         self.variable_table = variable_table
@@ -39,6 +40,112 @@ class OperationTranslator:
 
     def perform_operation(self, left_val: Value, right_val: Value, operation: str,
                           changed_identifier: Identifier) -> Feedback:
+        if not left_val.is_int() or not right_val.is_int() or (left_val.origin is None and right_val.origin is None):
+            return self.__perform(left_val, right_val, operation, changed_identifier)
+
+        # folded result may be more expensive to generate than computing it from the operands kept in memory
+        candidates = []
+        for left in OperationTranslator.__unfoldings(left_val):
+            for right in OperationTranslator.__unfoldings(right_val):
+                candidates.append(lambda l=left, r=right: self.__perform(l, r, operation, changed_identifier))
+        feedback = self.generic_translator.choose_cheapest(candidates)
+        self.variable_table.set_value(OperationTranslator.fold(left_val.core, right_val.core, operation),
+                                      changed_identifier.name, changed_identifier.offset)
+        return feedback
+
+    # variable kept in a register is changed in place when it is the left operand of addition or subtraction;
+    # returns None for other operations
+    def perform_operation_in_place(self, left_val: Value, right_val: Value, operation: str,
+                                   changed_identifier: Identifier, register) -> Code:
+        if left_val.is_int() or left_val.core != changed_identifier:
+            if operation != "+" or right_val.is_int() or right_val.core != changed_identifier:
+                return None
+            left_val, right_val = right_val, left_val
+        elif operation not in ("+", "-"):
+            return None
+
+        self.variable_table.set_value(None, changed_identifier.name, changed_identifier.offset)
+        step_opcode, combining_opcode = ("INC", "ADD") if operation == "+" else ("DEC", "SUB")
+        if right_val.is_int() and OperationTranslator.__is_chain_cheaper(right_val.core, step_opcode,
+                                                                          combining_opcode):
+            code = Code()
+            for _ in range(right_val.core):
+                code.add(step_opcode, register)
+            return code
+        elif not right_val.is_int() and right_val.core == changed_identifier:
+            return Code().add("SHL" if operation == "+" else "RESET", register)
+        reg = self.register_machine.fetch_register()
+        code = self.generic_translator.put_value_to_register(right_val, reg)
+        code.add(combining_opcode, register, reg)
+        return code
+
+    # division by values unknown at compile time keeps five values in registers at once, modulo by them, division by
+    # constants and modulo by even ones keep four, other operations keep at most three
+    def registers_needed(self, left_val: Value, right_val: Value, operation: str) -> int:
+        if not left_val.is_int() or not right_val.is_int():
+            candidates = [(left_val, right_val)]
+        else:
+            candidates = [(left, right) for left in OperationTranslator.__unfoldings(left_val)
+                          for right in OperationTranslator.__unfoldings(right_val)]
+        return max(OperationTranslator.__registers_needed(left, right, operation) for left, right in candidates)
+
+    @staticmethod
+    def __registers_needed(left_val: Value, right_val: Value, operation: str) -> int:
+        if operation not in ("/", "%") or (left_val.is_int() and right_val.is_int()):
+            return 3
+        elif right_val.is_int():
+            num = right_val.core
+            if num == 0 or is_power_of_two(num) or (operation == "%" and num % 2):
+                return 3
+            return 4
+        elif not left_val.is_int() and left_val == right_val:
+            return 3
+        return 5 if operation == "/" else 4
+
+    # both the quotient and the remainder are computed by a single long division if it is not replaced by cheaper code
+    # for either of them
+    @staticmethod
+    def can_divide_with_modulo(left_val: Value, right_val: Value) -> bool:
+        if left_val.is_int() and right_val.is_int():
+            return False
+        elif right_val.is_int():
+            return right_val.core > 2 and not is_power_of_two(right_val.core)
+        return left_val.is_int() or left_val != right_val
+
+    # one more register than modulo keeps the quotient
+    @staticmethod
+    def division_with_modulo_registers_needed(left_val: Value, right_val: Value) -> int:
+        return OperationTranslator.__registers_needed(left_val, right_val, "%") + 1
+
+    def perform_division_with_modulo(self, left_val: Value, right_val: Value, quotient_identifier: Identifier,
+                                     remainder_identifier: Identifier) -> DivisionFeedback:
+        self.variable_table.set_value(None, quotient_identifier.name, quotient_identifier.offset)
+        self.variable_table.set_value(None, remainder_identifier.name, remainder_identifier.offset)
+        quotient_reg = self.register_machine.fetch_register()
+        if right_val.is_int():
+            feedback = self.__perform_modulo_by_constant(left_val, right_val.core, quotient_reg)
+        else:
+            feedback = self.__perform_modulo_2i(left_val, right_val, quotient_reg)
+        return DivisionFeedback(feedback.code, quotient_reg, feedback.register)
+
+    @staticmethod
+    def __unfoldings(val: Value) -> list:
+        return [val] if val.origin is None else [val, Value(val.origin)]
+
+    @staticmethod
+    def fold(left: int, right: int, operation: str) -> int:
+        if operation == "+":
+            return left + right
+        elif operation == "-":
+            return max(left - right, 0)
+        elif operation == "*":
+            return left * right
+        elif operation == "/":
+            return left // right if right != 0 else 0
+        else:
+            return left % right if right != 0 else 0
+
+    def __perform(self, left_val: Value, right_val: Value, operation: str, changed_identifier: Identifier) -> Feedback:
         if operation == "+":
             return self.__perform_addition(left_val, right_val, changed_identifier)
         elif operation == "-":
@@ -50,6 +157,14 @@ class OperationTranslator:
         else:
             return self.__perform_modulo(left_val, right_val, changed_identifier)
 
+    # a chain of num single steps against generating num in a second register and combining it with the value;
+    # both variants load the value itself the same way
+    @staticmethod
+    def __is_chain_cheaper(num: int, step_opcode: str, combining_opcode: str) -> bool:
+        return num * LangCostModel.instruction_cost(step_opcode) <= \
+            LangCostModel.estimate(GenericTranslator.generate_constant(num, "a")) + \
+            LangCostModel.instruction_cost(combining_opcode)
+
     def __perform_addition(self, left_val: Value, right_val: Value, changed_identifier: Identifier) -> Feedback:
         if left_val.is_int() and right_val.is_int():
             result = left_val.core + right_val.core
@@ -65,19 +180,19 @@ class OperationTranslator:
             else:
                 num = right_val.core
                 val = left_val
-            if num > OperationTranslator.ADDITION_SWITCH_THRESHOLD:
+            if not OperationTranslator.__is_chain_cheaper(num, "INC", "ADD"):
                 return self.__perform_addition_2i(left_val, right_val)
             reg = self.register_machine.fetch_register()
             code = self.generic_translator.put_value_to_register(val, reg)
-            if num > 0:
-                code += "\n" + "\n".join(["INC {}".format(reg) for _ in range(num)])
+            for _ in range(num):
+                code.add("INC", reg)
             return Feedback(code, reg)
         else:
             self.variable_table.set_value(None, changed_identifier.name, changed_identifier.offset)
             if left_val == right_val:
                 reg = self.register_machine.fetch_register()
                 code = self.generic_translator.put_value_to_register(left_val, reg)
-                code += "\nSHL {}".format(reg)
+                code.add("SHL", reg)
                 return Feedback(code, reg)
             else:
                 return self.__perform_addition_2i(left_val, right_val)
@@ -87,13 +202,13 @@ class OperationTranslator:
         reg2 = self.register_machine.fetch_register()
 
         code = self.generic_translator.put_value_to_register(left_val, reg1)
-        code += "\n" + self.generic_translator.put_value_to_register(right_val, reg2)
-        code += "\nADD {} {}".format(reg1, reg2)
+        code += self.generic_translator.put_value_to_register(right_val, reg2)
+        code.add("ADD", reg1, reg2)
         return Feedback(code, reg1)
 
     def __perform_subtraction(self, left_val: Value, right_val: Value, changed_identifier: Identifier) -> Feedback:
         if left_val.is_int() and right_val.is_int():
-            result = abs(left_val.core - right_val.core)
+            result = max(left_val.core - right_val.core, 0)
             self.variable_table.set_value(result, changed_identifier.name, changed_identifier.offset)
             reg = self.register_machine.fetch_register()
             code = self.generic_translator.generate_constant(result, reg)
@@ -101,18 +216,18 @@ class OperationTranslator:
         elif right_val.is_int():
             self.variable_table.set_value(None, changed_identifier.name, changed_identifier.offset)
             num = right_val.core
-            if num > OperationTranslator.ADDITION_SWITCH_THRESHOLD:
+            if not OperationTranslator.__is_chain_cheaper(num, "DEC", "SUB"):
                 return self.__perform_subtraction_2i(left_val, right_val)
             reg = self.register_machine.fetch_register()
             code = self.generic_translator.put_value_to_register(left_val, reg)
-            if num > 0:
-                code += "\n" + "\n".join(["DEC {}".format(reg) for _ in range(num)])
+            for _ in range(num):
+                code.add("DEC", reg)
             return Feedback(code, reg)
         else:
             if not left_val.is_int() and left_val == right_val:
                 self.variable_table.set_value(0, changed_identifier.name, changed_identifier.offset)
                 reg = self.register_machine.fetch_register()
-                code = "RESET {}".format(reg)
+                code = Code().add("RESET", reg)
                 return Feedback(code, reg)
             else:
                 self.variable_table.set_value(None, changed_identifier.name, changed_identifier.offset)
@@ -123,8 +238,8 @@ class OperationTranslator:
         reg2 = self.register_machine.fetch_register()
 
         code = self.generic_translator.put_value_to_register(left_val, reg1)
-        code += "\n" + self.generic_translator.put_value_to_register(right_val, reg2)
-        code += "\nSUB {} {}".format(reg1, reg2)
+        code += self.generic_translator.put_value_to_register(right_val, reg2)
+        code.add("SUB", reg1, reg2)
         return Feedback(code, reg1)
 
     def __perform_multiplication(self, left_val: Value, right_val: Value, changed_identifier: Identifier) -> Feedback:
@@ -144,60 +259,103 @@ class OperationTranslator:
                 val = left_val
             if num == 0:
                 reg = self.register_machine.fetch_register()
-                code = "RESET {}".format(reg)
-                return Feedback(code, reg)
-            elif num < OperationTranslator.MULTIPLICATION_BY_TWOS_SWITCH_THRESHOLD and is_power_of_two(num):
-                reg = self.register_machine.fetch_register()
-                code = self.generic_translator.put_value_to_register(val, reg)
-                if num > 1:
-                    code += "\n" + "\n".join(["SHL {}".format(reg) for _ in range(log(num))])
+                code = Code().add("RESET", reg)
                 return Feedback(code, reg)
-            elif num < OperationTranslator.MULTIPLICATION_BY_CONST_SWITCH_THRESHOLD:
-                return self.__perform_multiplication_1i_1v(val, num)
-            else:
-                return self.__perform_multiplication_2i(left_val, right_val)
+            # the multiplication loop runs over bits of the smaller factor, spending more than shifting and adding
+            # per bit, so with a constant factor only straight-line candidates are considered
+            candidates = [lambda: self.__perform_multiplication_1i_1v(val, num)]
+            if is_power_of_two(num):
+                candidates.append(lambda: self.__perform_multiplication_by_shifts(val, num))
+            return self.generic_translator.choose_cheapest(candidates)
         else:
             self.variable_table.set_value(None, changed_identifier.name, changed_identifier.offset)
             return self.__perform_multiplication_2i(left_val, right_val)
 
+    def __perform_multiplication_by_shifts(self, val: Value, num: int) -> Feedback:
+        reg = self.register_machine.fetch_register()
+        code = self.generic_translator.put_value_to_register(val, reg)
+        for _ in range(log(num)):
+            code.add("SHL", reg)
+        return Feedback(code, reg)
+
+    # loop runs over bits of the smaller factor; if ranges tell which one it is, factors are not compared at runtime
     def __perform_multiplication_2i(self, left_val: Value, right_val: Value) -> Feedback:
+        right_smaller = LangRanges.compare(self.generic_translator.get_range(right_val),
+                                           self.generic_translator.get_range(left_val), "<=")
+        if right_smaller is not None:
+            return self.__perform_ordered_multiplication(*((left_val, right_val) if right_smaller
+                                                           else (right_val, left_val)))
+
         reg1 = self.register_machine.fetch_register()
         reg2 = self.register_machine.fetch_register()
         helper_reg = self.register_machine.borrow_register()
+        right_smaller = Label("mul_right_smaller")
+        odd_step = Label("mul_odd_step")
+        loop = Label("mul_loop")
+        end = Label("mul_end")
 
         code = self.generic_translator.put_value_to_register(left_val, reg1)
-        code += "\n" + self.generic_translator.put_value_to_register(right_val, reg2)
-        code += "\n" + self.generic_translator.copy_register(source_reg=reg2, dest_reg=helper_reg)
-        code += "\nSUB {} {}".format(helper_reg, reg1)
-        code += "\nJZERO {} 7".format(helper_reg)
-        code += "\n" + self.generic_translator.copy_register(source_reg=reg2, dest_reg=helper_reg)
-        code += "\n" + self.generic_translator.copy_register(source_reg=reg1, dest_reg=reg2)
-        code += "\nRESET {}".format(reg1)
-        code += "\nJUMP 6"
-        code += "\nADD {} {}".format(helper_reg, reg1)
-        code += "\nRESET {}".format(reg1)
-        code += "\nJUMP 3"
-        code += "\nADD {} {}".format(reg1, helper_reg)
-        code += "\nDEC {}".format(reg2)
-        code += "\nJZERO {} 5".format(reg2)
-        code += "\nJODD {} -3".format(reg2)
-        code += "\nSHR {}".format(reg2)
-        code += "\nSHL {}".format(helper_reg)
-        code += "\nJUMP -4"
+        code += self.generic_translator.put_value_to_register(right_val, reg2)
+        code += self.generic_translator.copy_register(source_reg=reg2, dest_reg=helper_reg)
+        code.add("SUB", helper_reg, reg1)
+        code.add("JZERO", helper_reg, right_smaller)
+        code += self.generic_translator.copy_register(source_reg=reg2, dest_reg=helper_reg)
+        code += self.generic_translator.copy_register(source_reg=reg1, dest_reg=reg2)
+        code.add("RESET", reg1)
+        code.add("JUMP", loop)
+        code.mark(right_smaller)
+        code.add("ADD", helper_reg, reg1)
+        code.add("RESET", reg1)
+        code.add("JUMP", loop)
+        code.mark(odd_step)
+        code.add("ADD", reg1, helper_reg)
+        code.add("DEC", reg2)
+        code.mark(loop)
+        code.add("JZERO", reg2, end)
+        code.add("JODD", reg2, odd_step)
+        code.add("SHR", reg2)
+        code.add("SHL", helper_reg)
+        code.add("JUMP", loop)
+        code.mark(end)
+        return Feedback(code, reg1)
+
+    def __perform_ordered_multiplication(self, multiplicand: Value, multiplier: Value) -> Feedback:
+        reg1 = self.register_machine.fetch_register()
+        reg2 = self.register_machine.fetch_register()
+        helper_reg = self.register_machine.borrow_register()
+        odd_step = Label("mul_odd_step")
+        loop = Label("mul_loop")
+        end = Label("mul_end")
+
+        code = self.generic_translator.put_value_to_register(multiplicand, reg1)
+        code += self.generic_translator.put_value_to_register(multiplier, reg2)
+        code += self.generic_translator.copy_register(source_reg=reg1, dest_reg=helper_reg)
+        code.add("RESET", reg1)
+        code.add("JUMP", loop)
+        code.mark(odd_step)
+        code.add("ADD", reg1, helper_reg)
+        code.add("DEC", reg2)
+        code.mark(loop)
+        code.add("JZERO", reg2, end)
+        code.add("JODD", reg2, odd_step)
+        code.add("SHR", reg2)
+        code.add("SHL", helper_reg)
+        code.add("JUMP", loop)
+        code.mark(end)
         return Feedback(code, reg1)
 
     def __perform_multiplication_1i_1v(self, val: Value, num: int) -> Feedback:
         reg = self.register_machine.fetch_register()
-        helper_reg = self.register_machine.borrow_register()
+        helper_reg = self.register_machine.fetch_register()
 
         code = self.generic_translator.put_value_to_register(val, helper_reg)
-        code += "\nRESET {}".format(reg)
+        code.add("RESET", reg)
         while num > 0:
             if num % 2:
-                code += "\nADD {} {}".format(reg, helper_reg)
+                code.add("ADD", reg, helper_reg)
                 num -= 1
             else:
-                code += "\nSHL {}".format(helper_reg)
+                code.add("SHL", helper_reg)
                 num //= 2
         return Feedback(code, reg)
 
@@ -213,25 +371,27 @@ class OperationTranslator:
             num = right_val.core
             if num == 0:
                 reg = self.register_machine.fetch_register()
-                code = "RESET {}".format(reg)
+                code = Code().add("RESET", reg)
                 return Feedback(code, reg)
-            elif num < OperationTranslator.MULTIPLICATION_BY_TWOS_SWITCH_THRESHOLD and is_power_of_two(num):
+            elif is_power_of_two(num):
                 reg = self.register_machine.fetch_register()
                 code = self.generic_translator.put_value_to_register(left_val, reg)
-                if num > 1:
-                    code += "\n" + "\n".join(["SHR {}".format(reg) for _ in range(log(num))])
+                for _ in range(log(num)):
+                    code.add("SHR", reg)
                 return Feedback(code, reg)
             else:
-                return self.__perform_division_2i(left_val, right_val)
+                return self.__perform_division_by_constant(left_val, num)
         else:
             self.variable_table.set_value(None, changed_identifier.name, changed_identifier.offset)
             if not left_val.is_int() and left_val == right_val:
                 reg = self.register_machine.fetch_register()
                 helper_reg = self.register_machine.fetch_register()
                 code = self.generic_translator.put_value_to_register(left_val, helper_reg)
-                code += "\nRESET {}".format(reg)
-                code += "\nJZERO {} 2".format(helper_reg)
-                code += "\nINC {}".format(reg)
+                end = Label("div_end")
+                code.add("RESET", reg)
+                code.add("JZERO", helper_reg, end)
+                code.add("INC", reg)
+                code.mark(end)
                 return Feedback(code, reg)
             else:
                 return self.__perform_division_2i(left_val, right_val)
@@ -240,48 +400,74 @@ class OperationTranslator:
         reg1 = self.register_machine.fetch_register()
         reg2 = self.register_machine.fetch_register()
         check_reg, mult_reg, dividend_reg = self.register_machine.borrow_registers(3)
+        divisor_fits = Label("div_divisor_fits")
+        scale_loop = Label("div_scale_loop")
+        reduce_loop = Label("div_reduce_loop")
+        reduce_step = Label("div_reduce_step")
+        end = Label("div_end")
 
         code = self.generic_translator.put_value_to_register(right_val, reg2)
-        code += "\nRESET {}".format(reg1)
-        code += "\nJZERO {}".format(reg2)                       # END
-        snippet = self.generic_translator.put_value_to_register(left_val, dividend_reg)
-        code += " {}".format(31 + self.generic_translator.line_count(snippet))
-        code += "\n" + snippet
-        code += "\nRESET {}".format(mult_reg)
-        code += "\nINC {}".format(mult_reg)
-        code += "\n" + self.generic_translator.copy_register(reg2, check_reg)
-        code += "\nSUB {} {}".format(check_reg, dividend_reg)
-        code += "\nJZERO {} 2".format(check_reg)
-        code += "\nJUMP 24"                                     # END
-        code += "\nINC {}".format(reg1)
+        code.add("RESET", reg1)
+        code.add("JZERO", reg2, end)
+        code += self.generic_translator.put_value_to_register(left_val, dividend_reg)
+        code.add("RESET", mult_reg)
+        code.add("INC", mult_reg)
+        code += self.generic_translator.copy_register(reg2, check_reg)
+        code.add("SUB", check_reg, dividend_reg)
+        code.add("JZERO", check_reg, divisor_fits)
+        code.add("JUMP", end)
+        code.mark(divisor_fits)
+        code.add("INC", reg1)
         # beginning of 1st loop
-        code += "\nSHL {}".format(mult_reg)
-        code += "\nSHL {}".format(reg2)
-        code += "\nSHL {}".format(reg1)
-        code += "\nADD {} {}".format(check_reg, reg2)
-        code += "\nSUB {} {}".format(check_reg, dividend_reg)
-        code += "\nJZERO {} -5".format(check_reg)
+        code.mark(scale_loop)
+        code.add("SHL", mult_reg)
+        code.add("SHL", reg2)
+        code.add("SHL", reg1)
+        code.add("ADD", check_reg, reg2)
+        code.add("SUB", check_reg, dividend_reg)
+        code.add("JZERO", check_reg, scale_loop)
         # end of the loop
-        code += "\nSHR {}".format(reg2)
-        code += "\nSHR {}".format(mult_reg)
-        code += "\nSHR {}".format(reg1)
-        code += "\nSUB {} {}".format(dividend_reg, reg2)
-        code += "\nRESET {}".format(check_reg)
-        code += "\nJUMP 3"
+        code.add("SHR", reg2)
+        code.add("SHR", mult_reg)
+        code.add("SHR", reg1)
+        code.add("SUB", dividend_reg, reg2)
+        code.add("RESET", check_reg)
+        code.add("JUMP", reduce_step)
         # beginning of 2nd loop
-        code += "\nADD {} {}".format(reg1, mult_reg)
-        code += "\nSUB {} {}".format(dividend_reg, reg2)
-        code += "\nSHR {}".format(mult_reg)
-        code += "\nJZERO {} 7".format(mult_reg)                 # END
-        code += "\nSHR {}".format(reg2)
-        code += "\nADD {} {}".format(check_reg, reg2)
-        code += "\nSUB {} {}".format(check_reg, dividend_reg)
-        code += "\nJZERO {} -7".format(check_reg)
-        code += "\nRESET {}".format(check_reg)
-        code += "\nJUMP -7"
+        code.mark(reduce_loop)
+        code.add("ADD", reg1, mult_reg)
+        code.add("SUB", dividend_reg, reg2)
+        code.mark(reduce_step)
+        code.add("SHR", mult_reg)
+        code.add("JZERO", mult_reg, end)
+        code.add("SHR", reg2)
+        code.add("ADD", check_reg, reg2)
+        code.add("SUB", check_reg, dividend_reg)
+        code.add("JZERO", check_reg, reduce_loop)
+        code.add("RESET", check_reg)
+        code.add("JUMP", reduce_step)
+        code.mark(end)
 
         return Feedback(code, reg1)
 
+    # divisor known at compile time is split into its odd factor and a power of two, by which the dividend is shifted
+    # beforehand
+    def __perform_division_by_constant(self, val: Value, num: int) -> Feedback:
+        reg = self.register_machine.fetch_register()
+        dividend_reg = self.register_machine.fetch_register()
+        spare_reg, divisor_reg = self.register_machine.borrow_registers(2)
+        end = Label("div_end")
+
+        code = self.generic_translator.put_value_to_register(val, dividend_reg)
+        while num % 2 == 0:
+            code.add("SHR", dividend_reg)
+            num //= 2
+        code.add("RESET", reg)
+        code += self.__reduce_by_constant(num, dividend_reg, spare_reg, divisor_reg, (end, end, end), quotient_reg=reg)
+        code.mark(end)
+
+        return Feedback(code, reg)
+
     def __perform_modulo(self, left_val: Value, right_val: Value, changed_identifier: Identifier) -> Feedback:
         if left_val.is_int() and right_val.is_int():
             result = left_val.core % right_val.core if right_val.core != 0 else 0
@@ -294,72 +480,199 @@ class OperationTranslator:
             num = right_val.core
             if num == 0 or num == 1:
                 reg = self.register_machine.fetch_register()
-                code = "RESET {}".format(reg)
+                code = Code().add("RESET", reg)
                 return Feedback(code, reg)
             elif num == 2:
                 reg = self.register_machine.fetch_register()
+                odd = Label("mod_odd")
+                end = Label("mod_end")
                 code = self.generic_translator.put_value_to_register(left_val, reg)
-                code += "\nJODD {} 3".format(reg)
-                code += "\nRESET {}".format(reg)
-                code += "\nJUMP 3"
-                code += "\nRESET {}".format(reg)
-                code += "\nINC {}".format(reg)
+                code.add("JODD", reg, odd)
+                code.add("RESET", reg)
+                code.add("JUMP", end)
+                code.mark(odd)
+                code.add("RESET", reg)
+                code.add("INC", reg)
+                code.mark(end)
                 return Feedback(code, reg)
+            elif is_power_of_two(num):
+                return self.__perform_modulo_by_power_of_two(left_val, num)
             else:
-                return self.__perform_modulo_2i(left_val, right_val)
+                return self.__perform_modulo_by_constant(left_val, num)
         else:
             if not left_val.is_int() and left_val == right_val:
                 self.variable_table.set_value(0, changed_identifier.name, changed_identifier.offset)
                 reg = self.register_machine.fetch_register()
-                code = "RESET {}".format(reg)
+                code = Code().add("RESET", reg)
                 return Feedback(code, reg)
             else:
                 self.variable_table.set_value(None, changed_identifier.name, changed_identifier.offset)
                 return self.__perform_modulo_2i(left_val, right_val)
 
-    def __perform_modulo_2i(self, left_val: Value, right_val: Value) -> Feedback:
+    # quotient is computed along only if a register is given for it
+    def __perform_modulo_2i(self, left_val: Value, right_val: Value, quotient_reg=None) -> Feedback:
         reg1 = self.register_machine.fetch_register()
         reg2 = self.register_machine.fetch_register()
-        check_reg, mult_reg, division_result_reg = self.register_machine.borrow_registers(3)
+        check_reg, mult_reg = self.register_machine.borrow_registers(2)
+        divisor_fits = Label("mod_divisor_fits")
+        scale_loop = Label("mod_scale_loop")
+        reduce_loop = Label("mod_reduce_loop")
+        reduce_step = Label("mod_reduce_step")
+        zero_divisor = Label("mod_zero_divisor")
+        end = Label("mod_end")
 
         code = self.generic_translator.put_value_to_register(right_val, reg2)
-        code += "\nRESET {}".format(division_result_reg)
-        code += "\nJZERO {}".format(reg2)  # END
-        snippet = self.generic_translator.put_value_to_register(left_val, reg1)
-        code += " {}".format(31 + self.generic_translator.line_count(snippet))
-        code += "\n" + snippet
-        code += "\nRESET {}".format(mult_reg)
-        code += "\nINC {}".format(mult_reg)
-        code += "\n" + self.generic_translator.copy_register(reg2, check_reg)
-        code += "\nSUB {} {}".format(check_reg, reg1)
-        code += "\nJZERO {} 2".format(check_reg)
-        code += "\nJUMP 25"  # END
-        code += "\nINC {}".format(division_result_reg)
+        if quotient_reg is not None:
+            code.add("RESET", quotient_reg)
+        code.add("JZERO", reg2, zero_divisor)
+        code += self.generic_translator.put_value_to_register(left_val, reg1)
+        code.add("RESET", mult_reg)
+        code.add("INC", mult_reg)
+        code += self.generic_translator.copy_register(reg2, check_reg)
+        code.add("SUB", check_reg, reg1)
+        code.add("JZERO", check_reg, divisor_fits)
+        code.add("JUMP", end)
+        code.mark(divisor_fits)
+        if quotient_reg is not None:
+            code.add("INC", quotient_reg)
         # beginning of 1st loop
-        code += "\nSHL {}".format(mult_reg)
-        code += "\nSHL {}".format(reg2)
-        code += "\nSHL {}".format(division_result_reg)
-        code += "\nADD {} {}".format(check_reg, reg2)
-        code += "\nSUB {} {}".format(check_reg, reg1)
-        code += "\nJZERO {} -5".format(check_reg)
+        code.mark(scale_loop)
+        code.add("SHL", mult_reg)
+        code.add("SHL", reg2)
+        if quotient_reg is not None:
+            code.add("SHL", quotient_reg)
+        code.add("ADD", check_reg, reg2)
+        code.add("SUB", check_reg, reg1)
+        code.add("JZERO", check_reg, scale_loop)
         # end of the loop
-        code += "\nSHR {}".format(reg2)
-        code += "\nSHR {}".format(mult_reg)
-        code += "\nSHR {}".format(division_result_reg)
-        code += "\nSUB {} {}".format(reg1, reg2)
-        code += "\nRESET {}".format(check_reg)
-        code += "\nJUMP 3"
+        code.add("SHR", reg2)
+        code.add("SHR", mult_reg)
+        if quotient_reg is not None:
+            code.add("SHR", quotient_reg)
+        code.add("SUB", reg1, reg2)
+        code.add("RESET", check_reg)
+        code.add("JUMP", reduce_step)
         # beginning of 2nd loop
-        code += "\nADD {} {}".format(division_result_reg, mult_reg)
-        code += "\nSUB {} {}".format(reg1, reg2)
-        code += "\nSHR {}".format(mult_reg)
-        code += "\nJZERO {} 8".format(mult_reg)  # END
-        code += "\nSHR {}".format(reg2)
-        code += "\nADD {} {}".format(check_reg, reg2)
-        code += "\nSUB {} {}".format(check_reg, reg1)
-        code += "\nJZERO {} -7".format(check_reg)
-        code += "\nRESET {}".format(check_reg)
-        code += "\nJUMP -7"
-        code += "\nRESET {}".format(reg1)
+        code.mark(reduce_loop)
+        if quotient_reg is not None:
+            code.add("ADD", quotient_reg, mult_reg)
+        code.add("SUB", reg1, reg2)
+        code.mark(reduce_step)
+        code.add("SHR", mult_reg)
+        code.add("JZERO", mult_reg, end)
+        code.add("SHR", reg2)
+        code.add("ADD", check_reg, reg2)
+        code.add("SUB", check_reg, reg1)
+        code.add("JZERO", check_reg, reduce_loop)
+        code.add("RESET", check_reg)
+        code.add("JUMP", reduce_step)
+        code.mark(zero_divisor)
+        code.add("RESET", reg1)
+        code.mark(end)
 
         return Feedback(code, reg1)
+
+    def __perform_modulo_by_power_of_two(self, val: Value, num: int) -> Feedback:
+        reg = self.register_machine.fetch_register()
+        helper_reg = self.register_machine.borrow_register()
+
+        code = self.generic_translator.put_value_to_register(val, reg)
+        code += self.generic_translator.copy_register(source_reg=reg, dest_reg=helper_reg)
+        for _ in range(log(num)):
+            code.add("SHR", helper_reg)
+        for _ in range(log(num)):
+            code.add("SHL", helper_reg)
+        code.add("SUB", reg, helper_reg)
+        return Feedback(code, reg)
+
+    # an even divisor is not split like in division, as the bits shifted out of the dividend would have to be kept;
+    # quotient is computed along only if a register is given for it
+    def __perform_modulo_by_constant(self, val: Value, num: int, quotient_reg=None) -> Feedback:
+        reg = self.register_machine.fetch_register()
+        counter_reg = self.register_machine.fetch_register() if num % 2 == 0 else None
+        spare_reg, divisor_reg = self.register_machine.borrow_registers(2)
+        remainder_moved = Label("mod_remainder_moved")
+        remainder_kept = Label("mod_remainder_kept")
+        end = Label("mod_end")
+
+        code = self.generic_translator.put_value_to_register(val, reg)
+        if quotient_reg is not None:
+            code.add("RESET", quotient_reg)
+        code += self.__reduce_by_constant(num, reg, spare_reg, divisor_reg, (end, remainder_kept, remainder_moved),
+                                          quotient_reg=quotient_reg, counter_reg=counter_reg)
+        code.mark(remainder_moved)
+        code += self.generic_translator.copy_register(source_reg=spare_reg, dest_reg=reg)
+        code.mark(remainder_kept)
+        code.add("DEC", reg)
+        code.mark(end)
+        return Feedback(code, reg)
+
+    # long division by a constant: the divisor is generated at compile time and doubled until it exceeds the dividend,
+    # then halved back, which ends once an odd divisor is odd again, or once the counter doubled along with an even one
+    # is; the dividend is increased by one first, so that it is copied to the other register and decreased by the
+    # divisor to compare them, and the copy is kept if the divisor fits; ends are jumped to when the dividend is smaller
+    # than the divisor, and when the remainder increased by one is left in the dividend register or in the spare one
+    def __reduce_by_constant(self, num: int, dividend_reg, spare_reg, divisor_reg, ends, quotient_reg=None,
+                             counter_reg=None) -> Code:
+        smaller_end, dividend_end, spare_end = ends
+        scale_loop = Label("div_scale_loop")
+        dividend_step = Label("div_dividend_step")
+        dividend_kept = Label("div_dividend_kept")
+        spare_step = Label("div_spare_step")
+        spare_kept = Label("div_spare_kept")
+
+        code = self.generic_translator.generate_constant(num, divisor_reg)
+        if counter_reg is not None:
+            code.add("RESET", counter_reg)
+            code.add("INC", counter_reg)
+        odd_reg = divisor_reg if counter_reg is None else counter_reg
+        code.add("RESET", spare_reg)
+        code.add("ADD", spare_reg, divisor_reg)
+        code.add("SUB", spare_reg, dividend_reg)
+        code.add("JZERO", spare_reg, scale_loop)
+        code.add("JUMP", smaller_end)
+        # beginning of 1st loop
+        code.mark(scale_loop)
+        code.add("SHL", divisor_reg)
+        if counter_reg is not None:
+            code.add("SHL", counter_reg)
+        code.add("ADD", spare_reg, divisor_reg)
+        code.add("SUB", spare_reg, dividend_reg)
+        code.add("JZERO", spare_reg, scale_loop)
+        # end of the loop
+        code.add("INC", dividend_reg)
+        # beginning of 2nd loop, the dividend alternates between the two registers
+        code.mark(dividend_step)
+        code.add("SHR", divisor_reg)
+        if counter_reg is not None:
+            code.add("SHR", counter_reg)
+        if quotient_reg is not None:
+            code.add("SHL", quotient_reg)
+        code += self.generic_translator.copy_register(source_reg=dividend_reg, dest_reg=spare_reg)
+        code.add("SUB", spare_reg, divisor_reg)
+        code.add("JZERO", spare_reg, dividend_kept)
+        if quotient_reg is not None:
+            code.add("INC", quotient_reg)
+        code.add("JODD", odd_reg, spare_end)
+        code.mark(spare_step)
+        code.add("SHR", divisor_reg)
+        if counter_reg is not None:
+            code.add("SHR", counter_reg)
+        if quotient_reg is not None:
+            code.add("SHL", quotient_reg)
+        code += self.generic_translator.copy_register(source_reg=spare_reg, dest_reg=dividend_reg)
+        code.add("SUB", dividend_reg, divisor_reg)
+        code.add("JZERO", dividend_reg, spare_kept)
+        if quotient_reg is not None:
+            code.add("INC", quotient_reg)
+        code.add("JODD", odd_reg, dividend_end)
+        code.add("JUMP", dividend_step)
+        code.mark(dividend_kept)
+        code.add("JODD", odd_reg, dividend_end)
+        code.add("JUMP", dividend_step)
+        code.mark(spare_kept)
+        code.add("JODD", odd_reg, spare_end)
+        code.add("JUMP", spare_step)
+        # end of the loop
+
+        return code
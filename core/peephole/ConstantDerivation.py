@@ -0,0 +1,77 @@
+from core.LangCostModel import LangCostModel
+from core.peephole.PeepholeRule import PeepholeRule
+from model.internal.Label import Label
+
+
+class ConstantDerivation(PeepholeRule):
+
+    name = "constant derivation"
+
+    # constant generated from RESET is derived instead from a value known to be in the register already or copied from
+    # another register, whichever is cheapest; contents of the six registers are tracked from the last label some jump
+    # refers to
+    def apply(self, items: list) -> list:
+        referenced_labels = PeepholeRule.referenced_labels(items)
+        copy_cost = LangCostModel.instruction_cost("RESET") + LangCostModel.instruction_cost("ADD")
+        constants = dict()
+        result = []
+        index = 0
+        while index < len(items):
+            item = items[index]
+            index += 1
+            if type(item) == Label:
+                if item in referenced_labels:
+                    constants = dict()
+                result.append(item)
+                continue
+            if item.opcode == "RESET" and constants:
+                register = item.args[0]
+                end, value = PeepholeRule.generated_constant(items, index, register)
+                cost = end - index + 1
+                best = None
+                if register in constants:
+                    steps = ConstantDerivation.__derive(constants[register], value, cost - 1)
+                    if steps is not None:
+                        best = [item.derive(opcode, register) for opcode in steps]
+                        cost = len(steps)
+                for source, source_value in constants.items():
+                    if source == register or copy_cost >= cost:
+                        continue
+                    steps = ConstantDerivation.__derive(source_value, value, cost - copy_cost - 1)
+                    if steps is not None:
+                        best = [item.derive("RESET", register), item.derive("ADD", register, source)] + \
+                               [item.derive(opcode, register) for opcode in steps]
+                        cost = copy_cost + len(steps)
+                if best is not None:
+                    for instruction in best:
+                        PeepholeRule.update_constants(constants, instruction)
+                        result.append(instruction)
+                    index = end
+                    continue
+            PeepholeRule.update_constants(constants, item)
+            result.append(item)
+        return result
+
+    # value is built from a prefix of its binary form, reached from the known value with INC or DEC and followed by SHL
+    # and INC for every remaining bit; returns the cheapest steps not longer than the limit
+    @staticmethod
+    def __derive(known: int, value: int, limit: int):
+        best = None
+        for shift in range(value.bit_length() + 1):
+            if shift > limit:
+                break
+            prefix = value >> shift
+            remaining_bits = value & ((1 << shift) - 1)
+            length = abs(prefix - known) + shift + bin(remaining_bits).count("1")
+            if length <= limit:
+                best = (shift, prefix)
+                limit = length - 1
+        if best is None:
+            return None
+        shift, prefix = best
+        steps = ["INC" if prefix > known else "DEC"] * abs(prefix - known)
+        for bit in range(shift - 1, -1, -1):
+            steps.append("SHL")
+            if value >> bit & 1:
+                steps.append("INC")
+        return steps
@@ -0,0 +1,74 @@
+from core.peephole.PeepholeRule import PeepholeRule
+from model.internal.Label import Label
+
+
+class DeadRegisterWriteElimination(PeepholeRule):
+
+    name = "dead register write"
+
+    # instructions changing only a register, that is written again or not read at all on every path following them
+    WITHOUT_SIDE_EFFECTS = ("LOAD", "ADD", "SUB", "RESET", "INC", "DEC", "SHR", "SHL")
+
+    __bits = {register: 1 << bit for bit, register in enumerate("abcdef")}
+
+    # registers live at instructions are kept as bit masks and computed with a worklist going backwards; registers read
+    # only by instructions to be removed are not live, so chains of them are removed at once
+    def apply(self, items: list) -> list:
+        instructions, positions = PeepholeRule.split(items)
+        count = len(instructions)
+        successors = [PeepholeRule.successors(instructions, positions, index) for index in range(count)]
+        predecessors = [[] for _ in range(count)]
+        reads = []
+        writes = []
+        removable = []
+        masks = dict()
+        for index, instruction in enumerate(instructions):
+            for successor in successors[index]:
+                predecessors[successor].append(index)
+            key = (instruction.opcode,) + instruction.args
+            if key not in masks:
+                masks[key] = (DeadRegisterWriteElimination.__mask(PeepholeRule.reads(instruction)),
+                              DeadRegisterWriteElimination.__mask(PeepholeRule.writes(instruction)))
+            reads.append(masks[key][0])
+            writes.append(masks[key][1])
+            removable.append(instruction.opcode in DeadRegisterWriteElimination.WITHOUT_SIDE_EFFECTS)
+
+        live_in = [0] * count
+        live_out = [0] * count
+        pending = list(range(count))
+        queued = [True] * count
+        while pending:
+            index = pending.pop()
+            queued[index] = False
+            live = 0
+            for successor in successors[index]:
+                live |= live_in[successor]
+            live_out[index] = live
+            if removable[index] and not writes[index] & live:
+                live = live & ~writes[index]
+            else:
+                live = reads[index] | (live & ~writes[index])
+            if live != live_in[index]:
+                live_in[index] = live
+                for predecessor in predecessors[index]:
+                    if not queued[predecessor]:
+                        queued[predecessor] = True
+                        pending.append(predecessor)
+
+        result = []
+        index = 0
+        for item in items:
+            if type(item) == Label:
+                result.append(item)
+                continue
+            if not removable[index] or writes[index] & live_out[index]:
+                result.append(item)
+            index += 1
+        return result
+
+    @staticmethod
+    def __mask(registers: set) -> int:
+        mask = 0
+        for register in registers:
+            mask |= DeadRegisterWriteElimination.__bits[register]
+        return mask
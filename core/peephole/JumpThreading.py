@@ -0,0 +1,39 @@
+from core.peephole.PeepholeRule import PeepholeRule
+from model.internal.Instruction import Instruction
+from model.internal.Label import Label
+
+
+class JumpThreading(PeepholeRule):
+
+    name = "jump threading"
+
+    # jumps landing on an unconditional jump are redirected to its target; unconditional jumps landing on HALT halt;
+    # a jump is never redirected onto itself, which would leave a loop of jumps without an instruction to jump to
+    def apply(self, items: list) -> list:
+        first_instructions = dict()
+        pending = []
+        for item in items:
+            if type(item) == Label:
+                pending.append(item)
+            else:
+                for label in pending:
+                    first_instructions[label] = item
+                pending = []
+
+        result = []
+        for item in items:
+            if type(item) == Instruction and item.is_jump():
+                label = item.get_label()
+                visited = {label}
+                target = first_instructions.get(label)
+                while target is not None and target.opcode == "JUMP" and target.get_label() not in visited and \
+                        first_instructions.get(target.get_label()) is not item:
+                    label = target.get_label()
+                    visited.add(label)
+                    target = first_instructions.get(label)
+                if item.opcode == "JUMP" and target is not None and target.opcode == "HALT":
+                    item = item.derive("HALT")
+                elif label != item.get_label():
+                    item = item.with_label(label)
+            result.append(item)
+        return result
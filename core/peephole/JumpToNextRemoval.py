@@ -0,0 +1,27 @@
+from core.peephole.PeepholeRule import PeepholeRule
+from model.internal.Instruction import Instruction
+from model.internal.Label import Label
+
+
+class JumpToNextRemoval(PeepholeRule):
+
+    name = "jump to next instruction"
+
+    # jumps to the instruction following them, like the ones left by conditions known at compile time, do nothing
+    def apply(self, items: list) -> list:
+        result = []
+        for index, item in enumerate(items):
+            if type(item) == Instruction and item.is_jump() and \
+                    item.get_label() in JumpToNextRemoval.__following_labels(items, index):
+                continue
+            result.append(item)
+        return result
+
+    @staticmethod
+    def __following_labels(items: list, index: int) -> list:
+        labels = []
+        index += 1
+        while index < len(items) and type(items[index]) == Label:
+            labels.append(items[index])
+            index += 1
+        return labels
@@ -0,0 +1,124 @@
+from model.internal.Instruction import Instruction
+from model.internal.Label import Label
+
+
+class PeepholeRule:
+
+    name = "rule"
+
+    STEPS = ("INC", "DEC", "SHL", "SHR")
+
+    # registers read and written by instructions; GET writes to memory only, jumps write nothing
+    __reads = {
+        "GET": (0,),
+        "PUT": (0,),
+        "LOAD": (1,),
+        "STORE": (0, 1),
+        "ADD": (0, 1),
+        "SUB": (0, 1),
+        "RESET": (),
+        "INC": (0,),
+        "DEC": (0,),
+        "SHR": (0,),
+        "SHL": (0,),
+        "JUMP": (),
+        "JZERO": (0,),
+        "JODD": (0,),
+        "HALT": ()
+    }
+
+    __writes = {
+        "LOAD": (0,),
+        "ADD": (0,),
+        "SUB": (0,),
+        "RESET": (0,),
+        "INC": (0,),
+        "DEC": (0,),
+        "SHR": (0,),
+        "SHL": (0,)
+    }
+
+    # items are instructions and labels of the whole program; returns rewritten items
+    def apply(self, items: list) -> list:
+        raise NotImplementedError
+
+    @staticmethod
+    def reads(instruction: Instruction) -> set:
+        return {instruction.args[i] for i in PeepholeRule.__reads[instruction.opcode]}
+
+    @staticmethod
+    def writes(instruction: Instruction) -> set:
+        return {instruction.args[i] for i in PeepholeRule.__writes.get(instruction.opcode, ())}
+
+    @staticmethod
+    def written_register(instruction: Instruction):
+        written = PeepholeRule.__writes.get(instruction.opcode)
+        return instruction.args[0] if written else None
+
+    @staticmethod
+    def referenced_labels(items: list) -> set:
+        return {item.get_label() for item in items if type(item) == Instruction and item.is_jump()}
+
+    # indices of instructions among instructions only, with labels resolved to the index of the instruction they mark
+    @staticmethod
+    def split(items: list):
+        instructions = []
+        positions = dict()
+        for item in items:
+            if type(item) == Label:
+                positions[item] = len(instructions)
+            else:
+                instructions.append(item)
+        return instructions, positions
+
+    @staticmethod
+    def successors(instructions: list, positions: dict, index: int) -> list:
+        instruction = instructions[index]
+        if instruction.opcode == "HALT":
+            return []
+        successors = [] if instruction.opcode == "JUMP" else [index + 1]
+        if instruction.is_jump():
+            successors.append(positions[instruction.get_label()])
+        return [successor for successor in successors if successor < len(instructions)]
+
+    # steps applied to a register right after its RESET, returns the index following them and the value generated
+    @staticmethod
+    def generated_constant(items: list, index: int, register: str):
+        value = 0
+        while index < len(items) and type(items[index]) == Instruction and \
+                items[index].opcode in PeepholeRule.STEPS and items[index].args[0] == register:
+            opcode = items[index].opcode
+            if opcode == "INC":
+                value += 1
+            elif opcode == "DEC":
+                value = max(value - 1, 0)
+            elif opcode == "SHL":
+                value *= 2
+            else:
+                value //= 2
+            index += 1
+        return index, value
+
+    # values of registers known within a basic block are updated by an instruction
+    @staticmethod
+    def update_constants(constants: dict, instruction: Instruction):
+        register = PeepholeRule.written_register(instruction)
+        if register is None:
+            return
+        value = constants.pop(register, None)
+        opcode = instruction.opcode
+        if opcode == "RESET":
+            constants[register] = 0
+        elif value is None:
+            return
+        elif opcode == "INC":
+            constants[register] = value + 1
+        elif opcode == "DEC":
+            constants[register] = max(value - 1, 0)
+        elif opcode == "SHL":
+            constants[register] = value * 2
+        elif opcode == "SHR":
+            constants[register] = value // 2
+        elif opcode in ("ADD", "SUB") and (instruction.args[1] == register or instruction.args[1] in constants):
+            other = value if instruction.args[1] == register else constants[instruction.args[1]]
+            constants[register] = value + other if opcode == "ADD" else max(value - other, 0)
@@ -0,0 +1,34 @@
+from core.peephole.PeepholeRule import PeepholeRule
+from model.internal.Label import Label
+
+
+class RedundantConstantElimination(PeepholeRule):
+
+    name = "redundant constant"
+
+    # constant generated into a register already holding it is dropped along with the RESET starting it; values of
+    # registers are known from the last label some jump refers to
+    def apply(self, items: list) -> list:
+        referenced_labels = PeepholeRule.referenced_labels(items)
+        constants = dict()
+        result = []
+        index = 0
+        while index < len(items):
+            item = items[index]
+            index += 1
+            if type(item) == Label:
+                if item in referenced_labels:
+                    constants = dict()
+                result.append(item)
+                continue
+            if item.opcode == "RESET" and item.args[0] in constants:
+                register = item.args[0]
+                end, value = PeepholeRule.generated_constant(items, index, register)
+                if constants[register] == value:
+                    index = end
+                    continue
+                elif constants[register] == 0:
+                    continue
+            PeepholeRule.update_constants(constants, item)
+            result.append(item)
+        return result
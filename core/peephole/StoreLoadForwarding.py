@@ -0,0 +1,66 @@
+from core.peephole.PeepholeRule import PeepholeRule
+from model.internal.Label import Label
+from model.internal.Instruction import Instruction
+
+
+class StoreLoadForwarding(PeepholeRule):
+
+    name = "store-load forwarding"
+
+    # a cell is known to hold the value of a register after the register is stored to it or loaded from it, until
+    # either the register or the cell may change; loading the cell again is replaced by a copy of the register or
+    # dropped, if it is loaded into the same register; cells are told apart by the constant address in the register
+    # or, if it is not known, by the register itself
+    def apply(self, items: list) -> list:
+        referenced_labels = PeepholeRule.referenced_labels(items)
+        constants = dict()
+        cells = dict()
+        result = []
+        for item in items:
+            if type(item) == Label:
+                if item in referenced_labels:
+                    constants = dict()
+                    cells = dict()
+                result.append(item)
+                continue
+
+            if item.opcode == "LOAD":
+                cell = StoreLoadForwarding.__cell(constants, item.args[1])
+                source = cells.get(cell)
+                if source == item.args[0]:
+                    continue
+                elif source is not None:
+                    for instruction in (item.derive("RESET", item.args[0]), item.derive("ADD", item.args[0], source)):
+                        StoreLoadForwarding.__update(constants, cells, instruction)
+                        result.append(instruction)
+                    continue
+                StoreLoadForwarding.__update(constants, cells, item)
+                if type(cell) == int or cell[1] != item.args[0]:
+                    cells[cell] = item.args[0]
+            elif item.opcode in ("STORE", "GET"):
+                cell = StoreLoadForwarding.__cell(constants, item.args[-1])
+                for other in list(cells):
+                    if other == cell or type(other) != int or type(cell) != int:
+                        del cells[other]
+                if item.opcode == "STORE":
+                    cells[cell] = item.args[0]
+            else:
+                StoreLoadForwarding.__update(constants, cells, item)
+            result.append(item)
+        return result
+
+    @staticmethod
+    def __cell(constants: dict, register: str):
+        value = constants.get(register)
+        return value if value is not None else ("register", register)
+
+    # cells known through a register, either holding their value or their address, are forgotten when it is written
+    @staticmethod
+    def __update(constants: dict, cells: dict, instruction: Instruction):
+        written = PeepholeRule.written_register(instruction)
+        if written is None:
+            return
+        for cell, register in list(cells.items()):
+            if register == written or (type(cell) != int and cell[1] == written):
+                del cells[cell]
+        PeepholeRule.update_constants(constants, instruction)
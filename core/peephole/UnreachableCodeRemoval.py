@@ -0,0 +1,22 @@
+from core.peephole.PeepholeRule import PeepholeRule
+from model.internal.Instruction import Instruction
+
+
+class UnreachableCodeRemoval(PeepholeRule):
+
+    name = "unreachable code"
+
+    # instructions following JUMP or HALT are reachable only through a label some jump refers to
+    def apply(self, items: list) -> list:
+        referenced_labels = PeepholeRule.referenced_labels(items)
+        result = []
+        reachable = True
+        for item in items:
+            if type(item) == Instruction:
+                if reachable:
+                    result.append(item)
+                reachable = reachable and item.opcode not in ("JUMP", "HALT")
+            else:
+                reachable = reachable or item in referenced_labels
+                result.append(item)
+        return result
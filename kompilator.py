@@ -1,26 +1,143 @@
-from core.LangLexer import LangLexer
-from core.LangParser import LangParser
-from core.LangTranslator import LangTranslator
-from core.LangRegisterMachine import LangRegisterMachine
-from core.LangVariableTable import LangVariableTable
-from core.GenericTranslator import GenericTranslator
-from core.OperationTranslator import OperationTranslator
-from core.ConditionTranslator import ConditionTranslator
+import os
+import signal
 import sys
+import time
 from model.errors import CodeException
 
 
+def serve(socket_path: str):
+    from core.LangCompileServer import LangCompileServer
+    with LangCompileServer(socket_path) as server:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        print("Compile server listening on {}.".format(socket_path), flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def print_result(result: dict):
+    if result["ok"]:
+        print("ok   {} -> {} ({} ms, {} instructions{})".format(
+            result["source"], result["destination"], result["compile_ms"], result["instructions"],
+            ", cached" if result["cached"] else ""), flush=True)
+    else:
+        print("FAIL {}: {}".format(result["source"], result["error"]), flush=True)
+
+
+def print_summary(results: list, wall_time: float, jobs: int):
+    width = max([len("source")] + [len(result["source"]) for result in results])
+    print()
+    print("{:<{}} {:>6} {:>11} {:>7} {:>8}  {}".format("source", width, "status", "compile ms", "instr", "bytes",
+                                                      "error"))
+    for result in results:
+        print("{:<{}} {:>6} {:>11} {:>7} {:>8}  {}".format(
+            result["source"], width, "ok" if result["ok"] else "FAIL", result["compile_ms"],
+            result["instructions"] or "-", result["bytes"] or "-", result["error"] or "").rstrip())
+    failures = sum(not result["ok"] for result in results)
+    print("{} compiled, {} failed in {:.0f} ms ({} job(s)); {} taken from the compile cache.".format(
+        len(results) - failures, failures, wall_time * 1000, jobs, sum(result["cached"] for result in results)))
+
+
+def print_cache_stats():
+    from core.LangCompilationCache import LangCompilationCache
+    cache = LangCompilationCache.from_environment()
+    if cache is None:
+        print("No compile cache is set; its directory is given by {}.".format(LangCompilationCache.DIR_VARIABLE))
+        exit(1)
+    stats = cache.get_stats()
+    lookups = stats["hits"] + stats["misses"]
+    print("directory: {}".format(cache.directory))
+    print("size: {} of {} bytes".format(stats["size"], cache.max_size))
+    print("hits: {}, misses: {} ({:.1%} hit rate)".format(stats["hits"], stats["misses"],
+                                                         stats["hits"] / lookups if lookups else 0))
+    print("stored: {}, evicted: {}".format(stats["stored"], stats["evicted"]))
+
+
+# destination files are the same whatever the number of jobs, as every file is compiled by a translator of its own
+def batch(arguments: list):
+    from core.LangBatchCompiler import LangBatchCompiler
+    jobs = os.cpu_count() or 1
+    output_dir = None
+    sources = []
+    for argument in arguments:
+        if argument.startswith("--jobs="):
+            jobs = int(argument[len("--jobs="):]) if argument[len("--jobs="):].isdigit() else 0
+            if jobs < 1:
+                print("Invalid number of jobs.")
+                exit(1)
+        elif argument.startswith("--out-dir="):
+            output_dir = argument[len("--out-dir="):]
+        else:
+            sources.append(argument)
+
+    try:
+        files = LangBatchCompiler.collect_files(sources, output_dir)
+    except OSError as e:
+        print("Manifest cannot be read: {}".format(e))
+        exit(1)
+    if not files:
+        print("No source files given.")
+        exit(1)
+    destinations = [os.path.abspath(destination_file) for _, destination_file in files]
+    if len(set(destinations)) != len(destinations):
+        print("Two source files are to be compiled into the same destination file.")
+        exit(1)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    results = LangBatchCompiler(jobs).compile(files, print_result)
+    print_summary(results, time.perf_counter() - start, jobs)
+    if any(not result["ok"] for result in results):
+        exit(1)
+
+
+# source maps are not kept in the compile cache, so programs are always compiled again
+def compile_with_source_map(source: str, destination_file: str):
+    from core.LangCompiler import LangCompiler
+    try:
+        assembly, source_map = LangCompiler().compile_with_source_map(source)
+        with open(destination_file, "w") as f:
+            f.write(assembly)
+        source_map.dump(destination_file + ".map")
+    except CodeException as e:
+        print(e)
+        exit(1)
+
+
 def main(argv):
     if len(argv) == 1:
         print("""Usage:
-kompilator source_file destination_file
-The compiler will compile source code from source_file into assembly form and put it into destination_file.""")
+kompilator source_file destination_file [--source-map]
+The compiler will compile source code from source_file into assembly form and put it into destination_file; with
+--source-map, the source line of every instruction is put into destination_file.map (see profiler.py).
+kompilator --serve socket_file
+The compiler will keep running, compiling programs sent to the unix socket socket_file (see kompilator_client.py).
+kompilator --batch [--jobs=N] [--out-dir=directory] source ...
+The compiler will compile every source - a source file, a directory of .imp files or @manifest listing source files -
+using N processes, into .mr files put next to the sources or into the directory given.
+kompilator --cache-stats
+The compiler will print statistics of the compile cache kept in the directory given by KOMPILATOR_COMPILE_CACHE.""")
         exit(0)
 
-    if len(argv) != 3:
+    if argv[1] == "--batch":
+        batch(argv[2:])
+        return
+
+    if argv[1:] == ["--cache-stats"]:
+        print_cache_stats()
+        return
+
+    source_map = argv[3:] == ["--source-map"]
+    if len(argv) != 3 and not source_map:
         print("Invalid number of arguments.")
         exit(1)
 
+    if argv[1] == "--serve" and not source_map:
+        serve(argv[2])
+        return
+
     try:
         with open(argv[1], "r") as f:
             source = f.read()
@@ -28,21 +145,21 @@ The compiler will compile source code from source_file into assembly form and pu
         print("Source file does not exist.")
         exit(1)
 
-    lexer = LangLexer()
-    parser = LangParser()
-
-    variable_table = LangVariableTable()
-    register_machine = LangRegisterMachine()
-    generic_translator = GenericTranslator(variable_table, register_machine)
-    operation_translator = OperationTranslator(variable_table, register_machine, generic_translator)
-    condition_translator = ConditionTranslator(variable_table, register_machine, generic_translator)
-    lang_translator = LangTranslator(variable_table, register_machine, operation_translator, condition_translator,
-                                     generic_translator)
+    if source_map:
+        compile_with_source_map(source, argv[2])
+        return
 
-    tokens = lexer.tokenize(source)
-    program = parser.parse(tokens)
+    # programs compiled before are taken from the compile cache, if there is one, without loading the compiler at all
+    from core.LangCompilationCache import LangCompilationCache
+    cache = LangCompilationCache.from_environment()
+    key = LangCompilationCache.key(source) if cache is not None else None
+    assembly = cache.get(key) if cache is not None else None
     try:
-        assembly = lang_translator.translate_program(program)
+        if assembly is None:
+            from core.LangCompiler import LangCompiler
+            assembly = LangCompiler().compile(source)
+            if cache is not None:
+                cache.put(key, assembly)
         with open(argv[2], "w") as f:
             f.write(assembly)
     except CodeException as e:
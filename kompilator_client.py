@@ -0,0 +1,52 @@
+import sys
+from core.LangCompileClient import LangCompileClient
+
+
+# options are given as NAME=VALUE, with names from LangTranslator.OPTIONS
+def parse_options(arguments: list) -> dict:
+    options = dict()
+    for argument in arguments:
+        name, _, value = argument.partition("=")
+        if not value.isdigit():
+            print("Invalid option {}.".format(argument))
+            exit(1)
+        options[name] = int(value)
+    return options
+
+
+def main(argv):
+    if len(argv) == 1:
+        print("""Usage:
+kompilator_client socket_file source_file destination_file [option=value ...]
+The compile server listening on socket_file (started with kompilator --serve socket_file) will compile source code
+from source_file into assembly form, which will be put into destination_file.""")
+        exit(0)
+
+    if len(argv) < 4:
+        print("Invalid number of arguments.")
+        exit(1)
+
+    options = parse_options(argv[4:])
+    try:
+        with open(argv[2], "r") as f:
+            source = f.read()
+    except FileNotFoundError:
+        print("Source file does not exist.")
+        exit(1)
+
+    try:
+        with LangCompileClient(argv[1]) as client:
+            response = client.compile(source, options)
+    except OSError:
+        print("Compile server is not running.")
+        exit(1)
+
+    if not response["ok"]:
+        print(response["error"]["message"])
+        exit(1)
+    with open(argv[3], "w") as f:
+        f.write(response["assembly"])
+
+
+if __name__ == "__main__":
+    main(sys.argv)
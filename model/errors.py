@@ -78,3 +78,48 @@ class IteratorAssignmentError(CodeException):
             super().__init__(msg)
         else:
             super().__init__(msg.format(ref) + " at line {}")
+
+
+class BadCharacterError(CodeException):
+
+    def __init__(self, msg="error at line {}: bad character - {}", ref=None, lineno=None):
+        if ref is None:
+            super().__init__(msg)
+        else:
+            super().__init__(msg.format(lineno, ref))
+
+
+class UnexpectedTokenError(CodeException):
+
+    def __init__(self, msg="syntax error: \"{}\", at line {}", ref=None, lineno=None):
+        if ref is None:
+            super().__init__(msg)
+        else:
+            super().__init__(msg.format(ref, lineno))
+
+
+class InvalidOptionError(CodeException):
+
+    def __init__(self, msg="error: invalid compiler option {}", ref=None):
+        if ref is None:
+            super().__init__(msg)
+        else:
+            super().__init__(msg.format(ref))
+
+
+class MachineError(Exception):
+
+    def __init__(self, msg="machine error: {}", ref=None):
+        if ref is None:
+            super().__init__(msg)
+        else:
+            super().__init__(msg.format(ref))
+
+
+class EvaluationError(Exception):
+
+    def __init__(self, msg="evaluation error: {}", ref=None):
+        if ref is None:
+            super().__init__(msg)
+        else:
+            super().__init__(msg.format(ref))
@@ -0,0 +1,58 @@
+from model.internal.Instruction import Instruction
+from model.internal.Label import Label
+
+
+class Code:
+
+    # appending another Code only links it, so code of nested constructs is not copied on every level of nesting;
+    # the stream is flattened once, when it is iterated
+    def __init__(self):
+        self.__parts = []
+
+    def __iter__(self):
+        stack = [iter(self.__parts)]
+        while stack:
+            for part in stack[-1]:
+                if type(part) == Code:
+                    stack.append(iter(part.__parts))
+                    break
+                yield part
+            else:
+                stack.pop()
+
+    def __iadd__(self, other):
+        self.__parts.append(other)
+        return self
+
+    def __len__(self):
+        return sum(1 for item in self if type(item) == Instruction)
+
+    def __str__(self):
+        return "\n".join(str(item) for item in self)
+
+    def add(self, opcode: str, *args):
+        self.__parts.append(Instruction(opcode, *args))
+        return self
+
+    # instruction built elsewhere is placed as it is, so that it keeps the command it was generated for
+    def place(self, instruction: Instruction):
+        self.__parts.append(instruction)
+        return self
+
+    def mark(self, label: Label):
+        self.__parts.append(label)
+        return self
+
+    def clone(self):
+        # labels marked inside the stream are replaced by fresh ones, so the copy can be placed next to the original
+        items = list(self)
+        fresh_labels = {item: Label(item.name) for item in items if type(item) == Label}
+        code = Code()
+        for item in items:
+            if type(item) == Label:
+                code.mark(fresh_labels[item])
+            elif item.is_jump() and item.get_label() in fresh_labels:
+                code.__parts.append(item.with_label(fresh_labels[item.get_label()]))
+            else:
+                code.__parts.append(item)
+        return code
@@ -0,0 +1,9 @@
+from model.internal.Code import Code
+from model.internal.Feedback import Feedback
+
+
+class DivisionFeedback(Feedback):
+
+    def __init__(self, code: Code, quotient_register: str, remainder_register: str):
+        super().__init__(code, quotient_register)
+        self.remainder_register = remainder_register
@@ -0,0 +1,10 @@
+class ExecutionResult:
+
+    def __init__(self, outputs: list, t: int, io: int, hits: list):
+        self.outputs = outputs
+        self.t = t
+        self.io = io
+        self.hits = hits
+
+    def get_cost(self) -> int:
+        return self.t + self.io
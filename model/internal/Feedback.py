@@ -1,5 +1,8 @@
+from model.internal.Code import Code
+
+
 class Feedback:
 
-    def __init__(self, code: str, register: str):
+    def __init__(self, code: Code, register: str):
         self.code = code
         self.register = register
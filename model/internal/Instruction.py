@@ -0,0 +1,41 @@
+from model.internal.Label import Label
+
+
+class Instruction:
+
+    JUMPS = ("JUMP", "JZERO", "JODD")
+
+    # origin is the command the instruction was generated for and loops are the loops containing it, outermost first;
+    # they are recorded only for source maps
+    def __init__(self, opcode: str, *args):
+        self.opcode = opcode
+        self.args = args
+        self.origin = None
+        self.loops = ()
+
+    def __str__(self):
+        return " ".join([self.opcode] + [str(arg) for arg in self.args])
+
+    def __repr__(self):
+        return str(self)
+
+    def is_jump(self) -> bool:
+        return self.opcode in Instruction.JUMPS
+
+    def get_label(self) -> Label:
+        return self.args[-1]
+
+    def with_label(self, label: Label):
+        return self.derive(self.opcode, *self.args[:-1], label)
+
+    # instruction taking the place of this one, generated for the same command
+    def derive(self, opcode: str, *args):
+        instruction = Instruction(opcode, *args)
+        instruction.origin = self.origin
+        instruction.loops = self.loops
+        return instruction
+
+    def to_assembly(self, offset: int = None) -> str:
+        if offset is None:
+            return str(self)
+        return " ".join([self.opcode] + [str(arg) for arg in self.args[:-1]] + [str(offset)])
@@ -0,0 +1,10 @@
+class Label:
+
+    def __init__(self, name: str = "L"):
+        self.name = name
+
+    def __str__(self):
+        return "{}@{}".format(self.name, hex(id(self)))
+
+    def __repr__(self):
+        return str(self)
@@ -67,5 +67,13 @@ class LangArray:
     def merge(self, other):
         new = LangArray(self.__name, self.__bias, self.__bias + self.__length - 1, self.__address)
         for k in self.__values.keys():
-            new.__values[k] = new.__values[k] if new.__values[k] == other.__values[k] else None
+            new.__values[k] = self.__values[k] if self.__values[k] == other.__values[k] else None
         return new
+
+    # arrays are initialized on declaration
+    def with_initialization_of(self, other):
+        return self.merge(self)
+
+    # known values of elements keyed by their indices
+    def get_known_values(self):
+        return {self.__bias + k: self.__values[k] for k in self.__values.keys() if self.__values[k] is not None}
@@ -8,6 +8,7 @@ class LangInt:
         self.__address = adr
         self.__initialized = False
         self.__value = None
+        self.__range = None
 
     def __str__(self):
         val_str = str(self.__value) if self.__value is not None else "?"
@@ -44,9 +45,31 @@ class LangInt:
         if offset is not None:
             return None     # it's an exception, but it will be handled later
         self.__value = value
+        self.__range = None
+
+    # bounds of the value, as a pair of the least and the greatest one, which is None if it is unbounded
+    def get_range(self):
+        if self.__value is not None:
+            return self.__value, self.__value
+        return self.__range if self.__range is not None else (0, None)
+
+    def set_range(self, value_range):
+        if value_range[0] == value_range[1]:
+            self.__value, self.__range = value_range[0], None
+        else:
+            self.__value, self.__range = None, value_range
 
     def merge(self, other):
         new = LangInt(self.__name, self.__address)
         new.__initialized = self.__initialized
-        new.__value = self.__value if self.__value == other.__value else None
+        (low1, high1), (low2, high2) = self.get_range(), other.get_range()
+        new.set_range((min(low1, low2), None if high1 is None or high2 is None else max(high1, high2)))
+        return new
+
+    # value of this variable along with initialization of the other one
+    def with_initialization_of(self, other):
+        new = LangInt(self.__name, self.__address)
+        new.__initialized = other.__initialized
+        new.__value = self.__value
+        new.__range = self.__range
         return new
@@ -0,0 +1,15 @@
+from model.errors import MachineError
+
+
+class LangMemory(dict):
+
+    def __init__(self, strict: bool):
+        super().__init__()
+        self.strict = strict
+
+    # unset cells read as 0, just like in the reference machine; the specification leaves them undefined though,
+    # so in strict mode such a read is reported
+    def __missing__(self, address):
+        if self.strict:
+            raise MachineError("machine error: read of uninitialized memory cell {}", ref=address)
+        return 0
@@ -0,0 +1,56 @@
+class LayeredDict:
+
+    # a layer derived from another one keeps only entries written to it and names removed from it, reading the rest
+    # from the layer below; the layer below may not change while layers derived from it are in use
+    def __init__(self, parent=None):
+        self.__parent = parent
+        self.__entries = dict()
+        self.__removed = set()
+
+    def __contains__(self, key):
+        if key in self.__entries:
+            return True
+        elif key in self.__removed or self.__parent is None:
+            return False
+        return key in self.__parent
+
+    def __getitem__(self, key):
+        if key in self.__entries:
+            return self.__entries[key]
+        elif key in self.__removed or self.__parent is None:
+            raise KeyError(key)
+        return self.__parent[key]
+
+    def __setitem__(self, key, value):
+        self.__entries[key] = value
+        self.__removed.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.__entries.pop(key, None)
+        if self.__parent is not None and key in self.__parent:
+            self.__removed.add(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        if self.__parent is None:
+            return list(self.__entries.keys())
+        keys = [key for key in self.__parent.keys() if key not in self.__entries and key not in self.__removed]
+        return keys + list(self.__entries.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def derive(self):
+        return LayeredDict(self)
+
+    # whether the entry was written to this layer, rather than read from the one below
+    def is_local(self, key):
+        return key in self.__entries or self.__parent is None
+
+    # names written to or removed from this layer
+    def changed_keys(self):
+        return set(self.__entries.keys()) | self.__removed
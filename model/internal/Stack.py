@@ -9,6 +9,9 @@ class Stack:
     def __contains__(self, item):
         return item in self.contents.keys()
 
+    def keys(self):
+        return list(self.contents.keys())
+
     def insert(self, key, element):
         if key in self.contents.keys():
             self.contents[key].append(element)
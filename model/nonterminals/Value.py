@@ -1,7 +1,9 @@
 class Value:
 
-    def __init__(self, core):
+    # origin is the identifier a known value was reflected from; it still holds the value, so it can be loaded
+    def __init__(self, core, origin=None):
         self.core = core
+        self.origin = origin
 
     def __str__(self):
         return str(self.core)
@@ -0,0 +1,66 @@
+import sys
+from core.LangCompiler import LangCompiler
+from core.LangProfiler import LangProfiler
+from model.errors import CodeException, MachineError
+
+ROW_FORMAT = "{:>5} {:<20} {:>12} {:>7} {:>8} {:>11} {:>10} {:>10} {:>8}  {}"
+
+
+def print_rows(title: str, rows: list, source_lines: list, limit: int):
+    print(title)
+    print(ROW_FORMAT.format("line", "construct", "cycles", "%", "instr", "executed", "loads", "stores", "io",
+                            "source"))
+    for row in rows[:limit]:
+        line = row["line"]
+        text = source_lines[line - 1].strip() if line is not None and 0 < line <= len(source_lines) else ""
+        print(ROW_FORMAT.format(
+            "-" if line is None else line, ",".join(construct or "-" for construct in row["constructs"]),
+            row["cycles"], "{:.1%}".format(row["share"]), row["instructions"], row["executed"], row["loads"],
+            row["stores"], row["io"], text).rstrip())
+    print()
+
+
+def main(argv):
+    arguments = [argument for argument in argv[1:] if not argument.startswith("--top=")]
+    limits = [argument[len("--top="):] for argument in argv[1:] if argument.startswith("--top=")]
+    if not 1 <= len(arguments) <= 2 or any(not limit.isdigit() for limit in limits):
+        print("""Usage:
+profiler source_file [input_file] [--top=N]
+The program in source_file is compiled and run on the virtual machine, with numbers read from input_file, or from the
+standard input, as its input; cycles, instructions and LOAD/STORE traffic are then reported per source line and per
+loop, the N hottest of each first.""")
+        exit(1)
+    limit = int(limits[-1]) if limits else None
+
+    try:
+        with open(arguments[0], "r") as f:
+            source = f.read()
+        if len(arguments) == 2:
+            with open(arguments[1], "r") as f:
+                inputs = [int(word) for word in f.read().split()]
+        else:
+            inputs = [int(word) for word in sys.stdin.read().split()]
+    except OSError as e:
+        print("File cannot be read: {}".format(e))
+        exit(1)
+    except ValueError:
+        print("Input is not a list of numbers.")
+        exit(1)
+
+    try:
+        assembly, source_map = LangCompiler().compile_with_source_map(source)
+        profile = LangProfiler(assembly, source_map).profile(inputs)
+    except (CodeException, MachineError) as e:
+        print(e)
+        exit(1)
+
+    print("outputs: {}".format(" ".join(str(output) for output in profile["outputs"])))
+    print("cycles: {}, io: {}, instructions: {}".format(profile["t"], profile["io"], len(source_map)))
+    print()
+    source_lines = source.split("\n")
+    print_rows("Source lines", profile["lines"], source_lines, limit)
+    print_rows("Loops", profile["loops"], source_lines, limit)
+
+
+if __name__ == "__main__":
+    main(sys.argv)